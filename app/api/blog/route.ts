@@ -242,7 +242,7 @@ export async function POST(request: NextRequest) {
 
                     if (mlResponse.ok) {
                         const mlApiResult = await mlResponse.json()
-                        console.log(`ML API: Blog embedded, ${mlApiResult.recommendations_updated} recommendations updated`)
+                        console.log(`ML API: Blog queued for embedding (job ${mlApiResult.job_id})`)
                     } else {
                         console.error('ML API error:', await mlResponse.text())
                     }
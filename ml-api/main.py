@@ -3,26 +3,63 @@ FastAPI Backend for Blog Recommendation System
 Deployed on Render (free tier)
 
 Endpoints:
-- POST /embed-blog: Generate embedding for a new blog and update recommendations
+- POST /embed-blog: Queue embedding of a new blog and a recommendation update (202 + job ID)
+- GET /jobs/{job_id}: Status of a queued job
 - POST /update-all: Recompute all recommendations (manual trigger)
+- GET /recommendations/{slug}: Precomputed recommendations (in-memory)
+- POST /recommendations/batch: Precomputed recommendations for many slugs
 - GET /health: Health check
+- GET /metrics: Prometheus metrics (request and pipeline stage latency, cache hits, retries)
 """
 
 import os
+import sys
+import json
 import time
-from typing import List, Dict, Any, Optional
+import threading
+import functools
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterator, Callable
 from datetime import datetime
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Header
+import anyio
+from fastapi import FastAPI, HTTPException, Header, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne
 from pinecone import Pinecone, ServerlessSpec
-from google import genai
-import markdown
-from bs4 import BeautifulSoup
-import re
+
+# Share the ML utilities with the training scripts in ../ml
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "ml"))
+
+from utils.similarity import (
+    overlay_vectors,
+    compute_recommendations_from_vectors,
+    insert_neighbour,
+    merge_new_neighbour,
+)
+from utils.vector_store import (
+    get_index,
+    close_index,
+    fetch_all_vectors,
+    build_metadata,
+    upsert_chunk_vectors,
+)
+from utils.config import VECTOR_STORE_BACKEND, MONGODB_BACKEND, EMBEDDING_PROVIDER
+from utils.offline import get_memory_mongo_client
+from utils.preprocessing import (
+    preprocess_blog,
+    clean_text,
+    has_outdated_preprocessing,
+    PREPROCESSING_VERSION,
+)
+from utils.embeddings import generate_query_embedding, embed_documents
+from utils.query_cache import get_query_cache, get_search_cache
+from utils.chunking import get_embedding_layout, has_outdated_embedding
+from utils.concurrency import map_concurrently
+from utils.job_queue import get_job_queue, JobWorkerPool
+from utils.metrics import get_registry, time_stage
 
 
 # ============================================================
@@ -35,8 +72,25 @@ GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
 API_SECRET = os.getenv("API_SECRET", "your-secret-key")  # For webhook auth
 
 PINECONE_INDEX_NAME = "portfolio-blog-embedding"
+PINECONE_MAX_TOP_K = 10000  # Largest top_k Pinecone allows without metadata
 EMBEDDING_DIMENSION = 768
 MONGODB_DATABASE = "portfolio-blogs"
+MONGO_BULK_BATCH_SIZE = int(os.getenv("MONGO_BULK_BATCH_SIZE", "500"))
+# Reload the in-memory recommendation table after this long, to pick up
+# lists written by ml/scripts (writes through this API apply immediately)
+RECOMMENDATIONS_TTL_SECONDS = float(os.getenv("RECOMMENDATIONS_TTL_SECONDS", "600"))
+RECOMMENDATIONS_LOOKUP_FILE = Path(__file__).resolve().parent.parent / "ml" / "data" / "recommendations_lookup.json"
+# An incremental update recomputes lists the edited blog dropped out of one
+# query each; past this many it does a single in-memory pass over all vectors
+INCREMENTAL_STALE_LIMIT = int(os.getenv("INCREMENTAL_STALE_LIMIT", "8"))
+# Worker threads for blocking client calls (pymongo, Pinecone, google-genai).
+# Admin endpoints get their own small pool so a full scan can't starve /search.
+API_IO_THREADS = int(os.getenv("API_IO_THREADS", "16"))
+API_ADMIN_THREADS = int(os.getenv("API_ADMIN_THREADS", "2"))
+# /stats serves cached numbers: counts are re-read after STATS_TTL_SECONDS, the
+# full slug listings (kept current by this process's writes) after STATS_SLUGS_TTL_SECONDS
+STATS_TTL_SECONDS = float(os.getenv("STATS_TTL_SECONDS", "60"))
+STATS_SLUGS_TTL_SECONDS = float(os.getenv("STATS_SLUGS_TTL_SECONDS", "900"))
 
 
 # ============================================================
@@ -59,11 +113,17 @@ class RecommendationItem(BaseModel):
     score: float
 
 
-class EmbedResponse(BaseModel):
+class RecommendationsBatchRequest(BaseModel):
+    slugs: List[str]
+
+
+class EmbedJobResponse(BaseModel):
     success: bool
     message: str
     slug: str
-    recommendations_updated: int
+    job_id: str
+    status: str
+    coalesced: bool
 
 
 # ============================================================
@@ -72,21 +132,32 @@ class EmbedResponse(BaseModel):
 
 mongo_client: Optional[MongoClient] = None
 pinecone_index = None
-genai_client = None
+# Handlers call the getters from worker threads; create each client once
+_client_lock = threading.Lock()
 
 
 def get_mongo_db():
     """Get MongoDB database connection."""
     global mongo_client
-    if mongo_client is None:
-        mongo_client = MongoClient(MONGODB_URI)
+    with _client_lock:
+        if mongo_client is None and MONGODB_BACKEND == "memory":
+            mongo_client = get_memory_mongo_client()
+        elif mongo_client is None:
+            mongo_client = MongoClient(MONGODB_URI)
     return mongo_client[MONGODB_DATABASE]
 
 
 def get_pinecone_index():
-    """Get Pinecone index."""
+    """Get Pinecone index (or the local/in-memory index for VECTOR_STORE_BACKEND=local/memory)."""
+    with _client_lock:
+        return _get_pinecone_index()
+
+
+def _get_pinecone_index():
     global pinecone_index
-    if pinecone_index is None:
+    if pinecone_index is None and VECTOR_STORE_BACKEND in ("local", "memory"):
+        pinecone_index = get_index()
+    elif pinecone_index is None:
         pc = Pinecone(api_key=PINECONE_API_KEY)
         
         # Check if index exists
@@ -103,80 +174,24 @@ def get_pinecone_index():
     return pinecone_index
 
 
-def get_genai_client():
-    """Get Google AI client."""
-    global genai_client
-    if genai_client is None:
-        genai_client = genai.Client(api_key=GOOGLE_API_KEY)
-    return genai_client
+# Thread limiters, created in lifespan (they belong to the running event loop)
+io_limiter: Optional[anyio.CapacityLimiter] = None
+admin_limiter: Optional[anyio.CapacityLimiter] = None
 
 
-# ============================================================
-# Text Processing
-# ============================================================
-
-def markdown_to_plain_text(md_content: str) -> str:
-    """Convert markdown to plain text."""
-    html = markdown.markdown(md_content)
-    soup = BeautifulSoup(html, "html.parser")
-    return soup.get_text(separator=" ", strip=True)
-
-
-def remove_code_blocks(content: str) -> str:
-    """Remove code blocks from content."""
-    content = re.sub(r"```[\s\S]*?```", " [code] ", content)
-    content = re.sub(r"`[^`]+`", " [code] ", content)
-    return content
-
-
-def clean_text(text: str) -> str:
-    """Clean and normalize text."""
-    text = re.sub(r"http[s]?://\S+", "", text)
-    text = re.sub(r"[^\w\s.,!?-]", " ", text)
-    text = re.sub(r"\s+", " ", text)
-    return text.strip()
-
-
-def preprocess_blog(blog: Dict[str, Any]) -> str:
-    """Preprocess blog content for embedding."""
-    content = remove_code_blocks(blog.get("content", ""))
-    plain_text = markdown_to_plain_text(content)
-    clean_content = clean_text(plain_text)
-    
-    tags_text = ", ".join(blog.get("tags", []))
-    
-    processed = f"""
-    Title: {blog.get('title', '')}
-    Summary: {blog.get('description', '')}
-    Topics: {tags_text}
-    Content: {clean_content[:2000]}
+async def run_blocking(func: Callable[..., Any], *args, admin: bool = False, **kwargs) -> Any:
     """
+    Run a blocking call on a worker thread so the event loop stays free.
     
-    return processed.strip()
-
-
-# ============================================================
-# Embedding Generation
-# ============================================================
-
-def generate_embedding(text: str) -> List[float]:
-    """Generate embedding for text using Google AI."""
-    client = get_genai_client()
-    
-    # Truncate if too long
-    if len(text) > 8000:
-        text = text[:8000]
-    
-    result = client.models.embed_content(
-        model="gemini-embedding-001",
-        contents=text,
-        config={
-            "task_type": "RETRIEVAL_DOCUMENT",
-            "output_dimensionality": EMBEDDING_DIMENSION,# 768
-        }
-    )
+    Args:
+        func: Blocking function to call
+        admin: Use the small pool reserved for slow admin endpoints
     
-    return list(result.embeddings[0].values)
+    Returns:
+        Whatever func returns (exceptions propagate)
+    """
+    limiter = admin_limiter if admin else io_limiter
+    return await anyio.to_thread.run_sync(functools.partial(func, *args, **kwargs), limiter=limiter)
 
 
 # ============================================================
@@ -184,21 +199,22 @@ def generate_embedding(text: str) -> List[float]:
 # ============================================================
 
 def upsert_embedding(slug: str, embedding: List[float], metadata: Dict[str, Any]):
-    """Upsert a single embedding to Pinecone."""
+    """Upsert a single embedding to Pinecone and drop cached search results."""
     index = get_pinecone_index()
     
-    clean_metadata = {
-        "title": str(metadata.get("title", ""))[:200],
-        "description": str(metadata.get("description", ""))[:500],
-        "tags": metadata.get("tags", []),
-        "is_starred": bool(metadata.get("is_starred", False)),
-    }
+    # Same metadata as ml/scripts, including the content hash and
+    # preprocessing version update.py uses to detect stale vectors
+    clean_metadata = build_metadata(metadata)
+    
+    with time_stage("vector_upsert"):
+        index.upsert(vectors=[{
+            "id": slug,
+            "values": embedding,
+            "metadata": clean_metadata
+        }])
     
-    index.upsert(vectors=[{
-        "id": slug,
-        "values": embedding,
-        "metadata": clean_metadata
-    }])
+    get_search_cache().invalidate()
+    system_stats.record_indexed(slug)
 
 
 def find_similar_blogs(slug: str, top_k: int = 3) -> List[Dict[str, Any]]:
@@ -213,11 +229,12 @@ def find_similar_blogs(slug: str, top_k: int = 3) -> List[Dict[str, Any]]:
     query_embedding = result.vectors[slug].values
     
     # Query for similar
-    results = index.query(
-        vector=query_embedding,
-        top_k=top_k + 1,
-        include_metadata=True
-    )
+    with time_stage("vector_query"):
+        results = index.query(
+            vector=query_embedding,
+            top_k=top_k + 1,
+            include_metadata=True
+        )
     
     similar = []
     for match in results.matches:
@@ -232,6 +249,44 @@ def find_similar_blogs(slug: str, top_k: int = 3) -> List[Dict[str, Any]]:
     return similar[:top_k]
 
 
+def compute_all_recommendations(
+    top_k: int = 3,
+    embedded_blogs: Optional[List[Dict[str, Any]]] = None,
+    index_state: Optional[tuple] = None
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Compute recommendations for every vector in Pinecone.
+    Loads all vectors once and scores every pair in memory instead of
+    running a fetch + query per slug.
+    
+    Args:
+        top_k: Number of recommendations per blog
+        embedded_blogs: Freshly embedded blogs to overlay on the stored vectors
+        index_state: (ids, vectors, metadata) already loaded with fetch_all_vectors
+    """
+    if index_state is None:
+        index_state = fetch_all_vectors(index=get_pinecone_index())
+    ids, vectors, metadata = index_state
+    ids, vectors, metadata = overlay_vectors(ids, vectors, metadata, embedded_blogs or [])
+    return compute_recommendations_from_vectors(ids, vectors, metadata, top_k=top_k)
+
+
+def score_against_all(embedding: List[float]) -> Dict[str, float]:
+    """
+    Score a vector against every stored vector with a single Pinecone query.
+    Corpora larger than PINECONE_MAX_TOP_K only get their closest matches scored.
+    """
+    index = get_pinecone_index()
+    
+    results = index.query(
+        vector=embedding,
+        top_k=PINECONE_MAX_TOP_K,
+        include_metadata=False
+    )
+    
+    return {match.id: float(match.score) for match in results.matches}
+
+
 def get_all_slugs_from_pinecone() -> List[str]:
     """Get all slugs from Pinecone."""
     index = get_pinecone_index()
@@ -254,88 +309,390 @@ def update_recommendations_in_mongo(slug: str, recommendations: List[Dict]):
     """Update recommendations for a blog in MongoDB."""
     db = get_mongo_db()
     
-    db.recommendations.update_one(
-        {"blogSlug": slug},
-        {
-            "$set": {
-                "recommendations": recommendations,
-                "updatedAt": datetime.utcnow()
+    with time_stage("mongo_write"):
+        result = db.recommendations.update_one(
+            {"blogSlug": slug},
+            {
+                "$set": {
+                    "recommendations": recommendations,
+                    "updatedAt": datetime.utcnow()
+                },
+                "$setOnInsert": {
+                    "createdAt": datetime.utcnow()
+                }
             },
-            "$setOnInsert": {
-                "createdAt": datetime.utcnow()
-            }
-        },
-        upsert=True
+            upsert=True
+        )
+    
+    recommendation_table.update({slug: recommendations})
+    if result.upserted_id is not None:
+        system_stats.record_recommendations_added(1)
+
+
+class RecommendationBulkWriter:
+    """
+    Collects recommendation upserts and flushes them as unordered bulk writes.
+    
+    Usage:
+        with RecommendationBulkWriter() as writer:
+            for slug, recs in all_recs.items():
+                writer.add(slug, recs)
+        print(writer.counts())
+    """
+    
+    def __init__(self, batch_size: int = MONGO_BULK_BATCH_SIZE):
+        self.batch_size = max(1, batch_size)
+        self._operations: List[UpdateOne] = []
+        self._pending: Dict[str, List[Dict]] = {}
+        self.matched = 0
+        self.modified = 0
+        self.upserted = 0
+    
+    def add(self, slug: str, recommendations: List[Dict]):
+        """Queue an upsert for one blog, flushing when the batch is full."""
+        now = datetime.utcnow()
+        self._operations.append(UpdateOne(
+            {"blogSlug": slug},
+            {
+                "$set": {
+                    "recommendations": recommendations,
+                    "updatedAt": now
+                },
+                "$setOnInsert": {
+                    "createdAt": now
+                }
+            },
+            upsert=True
+        ))
+        
+        self._pending[slug] = recommendations
+        
+        if len(self._operations) >= self.batch_size:
+            self.flush()
+    
+    def flush(self):
+        """Send all queued upserts in a single bulk_write."""
+        if not self._operations:
+            return
+        
+        db = get_mongo_db()
+        with time_stage("mongo_write"):
+            result = db.recommendations.bulk_write(self._operations, ordered=False)
+        self._operations = []
+        
+        # Serve the new lists right away
+        recommendation_table.update(self._pending)
+        self._pending = {}
+        system_stats.record_recommendations_added(result.upserted_count)
+        
+        self.matched += result.matched_count
+        self.modified += result.modified_count
+        self.upserted += result.upserted_count
+    
+    def counts(self) -> Dict[str, int]:
+        """Matched, modified and upserted document counts so far."""
+        return {
+            "matched": self.matched,
+            "modified": self.modified,
+            "upserted": self.upserted,
+        }
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+        return False
+
+
+def write_recommendations_to_mongo(recommendations: Dict[str, List[Dict]]) -> Dict[str, int]:
+    """Upsert many blogs' recommendations with batched bulk writes."""
+    with RecommendationBulkWriter() as writer:
+        for slug, recs in recommendations.items():
+            writer.add(slug, recs)
+    
+    return writer.counts()
+
+
+def get_all_recommendations_from_mongo() -> Dict[str, List[Dict]]:
+    """Get the current recommendation list of every blog from MongoDB."""
+    db = get_mongo_db()
+    
+    docs = db.recommendations.find(
+        {},
+        {"_id": 0, "blogSlug": 1, "recommendations": 1}
     )
+    
+    return {doc["blogSlug"]: doc.get("recommendations", []) for doc in docs}
+
+
+class RecommendationTable:
+    """
+    In-memory slug -> recommendations table for O(1) reads.
+    
+    Loaded from MongoDB (or ml/data/recommendations_lookup.json when MongoDB
+    is unreachable), updated in place by every recommendation write in this
+    process, and reloaded after RECOMMENDATIONS_TTL_SECONDS.
+    """
+    
+    def __init__(self, ttl_seconds: float = RECOMMENDATIONS_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.source: Optional[str] = None
+        self._table: Dict[str, List[Dict]] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+    
+    def reload(self) -> Dict[str, List[Dict]]:
+        """Load every list from MongoDB (falling back to the lookup file)."""
+        try:
+            table = get_all_recommendations_from_mongo()
+            source = "mongodb"
+        except Exception as e:
+            if not RECOMMENDATIONS_LOOKUP_FILE.exists():
+                raise
+            print(f"⚠️ Could not load recommendations from MongoDB ({e}), using {RECOMMENDATIONS_LOOKUP_FILE.name}")
+            with open(RECOMMENDATIONS_LOOKUP_FILE, encoding="utf-8") as f:
+                table = json.load(f)
+            source = "lookup_file"
+        
+        with self._lock:
+            self._table = table
+            self.source = source
+            self._loaded_at = time.monotonic()
+        return dict(table)
+    
+    def _ensure_fresh(self):
+        loaded_at = self._loaded_at
+        if loaded_at is None:
+            self.reload()
+        elif self.ttl_seconds and time.monotonic() - loaded_at > self.ttl_seconds:
+            try:
+                self.reload()
+            except Exception as e:
+                # Keep serving the last table; retry after another TTL
+                print(f"⚠️ Could not refresh recommendations: {e}")
+                self._loaded_at = time.monotonic()
+    
+    def snapshot(self) -> Dict[str, List[Dict]]:
+        """Every list, reloading only if never loaded or past the TTL."""
+        self._ensure_fresh()
+        return self._table
+    
+    def get(self, slug: str) -> Optional[List[Dict]]:
+        """Recommendations for one blog, or None if it has none stored."""
+        self._ensure_fresh()
+        return self._table.get(slug)
+    
+    def get_many(self, slugs: List[str]) -> Dict[str, List[Dict]]:
+        """Recommendations for every known slug in slugs."""
+        self._ensure_fresh()
+        table = self._table
+        return {slug: table[slug] for slug in slugs if slug in table}
+    
+    def update(self, recommendations: Dict[str, List[Dict]]):
+        """Apply freshly written lists (no-op until the table is loaded)."""
+        with self._lock:
+            if self._loaded_at is not None:
+                self._table = {**self._table, **recommendations}
+    
+    def stats(self) -> Dict[str, Any]:
+        loaded_at = self._loaded_at
+        return {
+            "entries": len(self._table),
+            "source": self.source,
+            "age_seconds": round(time.monotonic() - loaded_at, 1) if loaded_at is not None else None,
+        }
+
+
+recommendation_table = RecommendationTable()
 
 
-def get_all_blogs_from_mongo() -> List[Dict]:
-    """Get all published blogs from MongoDB."""
+BLOG_FIELDS = {"slug": 1, "title": 1, "description": 1, "content": 1, "tags": 1, "isStarred": 1}
+
+
+def iter_blogs_from_mongo(
+    query: Optional[Dict[str, Any]] = None,
+    projection: Optional[Dict[str, int]] = None,
+    batch_size: int = MONGO_BULK_BATCH_SIZE
+) -> Iterator[Dict]:
+    """
+    Stream published blogs from MongoDB without loading them all at once.
+    
+    Args:
+        query: Extra filter merged into {"published": True}
+        projection: Fields to return (default: everything needed for embedding)
+        batch_size: Documents fetched per cursor round trip
+    """
     db = get_mongo_db()
     
-    blogs = list(db.blogs.find(
-        {"published": True},
-        {"slug": 1, "title": 1, "description": 1, "content": 1, "tags": 1, "isStarred": 1}
-    ))
+    cursor = db.blogs.find(
+        {"published": True, **(query or {})},
+        projection or BLOG_FIELDS
+    ).batch_size(batch_size)
     
-    return blogs
+    with cursor:
+        yield from cursor
+
+
+def iter_published_slugs() -> Iterator[str]:
+    """Stream the slug of every published blog."""
+    for blog in iter_blogs_from_mongo(projection={"_id": 0, "slug": 1}):
+        yield blog["slug"]
 
 
 # ============================================================
 # Core Logic
 # ============================================================
 
-def embed_and_update_single_blog(blog: BlogInput, update_all_recs: bool = True) -> int:
+def update_recommendations_incrementally(
+    blog: BlogInput,
+    embedding: List[float],
+    top_k: int = 3
+) -> int:
+    """
+    Merge a newly embedded blog into the stored recommendation lists.
+    
+    Scores the new vector against every stored vector in one query,
+    merges it into the in-memory recommendation table (no MongoDB read)
+    and rewrites only the lists it changes, plus the new blog's own list.
+    
+    Returns:
+        Number of recommendation documents written
+    """
+    scores = score_against_all(embedding)
+    scores.pop(blog.slug, None)  # Pinecone may still hold the old vector
+    
+    new_entry = {
+        "slug": blog.slug,
+        "title": blog.title[:200],
+        "description": blog.description[:500],
+    }
+    
+    current = recommendation_table.snapshot()
+    changed, stale = merge_new_neighbour(new_entry, scores, current, top_k=top_k)
+    
+    # Lists the edited blog dropped out of need their own vector's neighbours
+    if len(stale) > INCREMENTAL_STALE_LIMIT:
+        ids, vectors, metadata = overlay_vectors(
+            *fetch_all_vectors(index=get_pinecone_index()),
+            [{**new_entry, "embedding": embedding}]
+        )
+        changed.update(compute_recommendations_from_vectors(ids, vectors, metadata, slugs=stale, top_k=top_k))
+    else:
+        for slug in stale:
+            similar = [
+                rec for rec in find_similar_blogs(slug, top_k=top_k + 1)
+                if rec["slug"] != blog.slug
+            ]
+            changed[slug] = insert_neighbour(
+                similar, {**new_entry, "score": round(scores[slug], 4)}, top_k
+            )
+    
+    # The new blog's own list comes straight from its scores
+    nearest = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+    own = []
+    if nearest:
+        fetched = get_pinecone_index().fetch(ids=[slug for slug, _ in nearest]).vectors
+        for slug, score in nearest:
+            meta = fetched[slug].metadata if slug in fetched else {}
+            own.append({
+                "slug": slug,
+                "title": meta.get("title", ""),
+                "description": meta.get("description", ""),
+                "score": round(score, 4)
+            })
+    changed[blog.slug] = own
+    
+    write_recommendations_to_mongo(changed)
+    return len(changed)
+
+
+def blog_to_document(blog: BlogInput) -> Dict[str, Any]:
+    """Convert an API payload to the MongoDB document shape preprocessing expects."""
+    return {
+        "slug": blog.slug,
+        "title": blog.title,
+        "description": blog.description,
+        "content": blog.content,
+        "tags": blog.tags,
+        "isStarred": blog.is_starred,
+        "published": True,
+    }
+
+
+def embed_and_upsert_blog(blog: BlogInput) -> List[float]:
+    """
+    Preprocess, embed and upsert a single blog to Pinecone.
+    
+    Returns:
+        The blog's embedding vector
+    """
+    # 1. Preprocess (shared pipeline with ml/scripts/train.py)
+    processed = preprocess_blog(blog_to_document(blog))
+    
+    # 2. Generate embedding (chunked and pooled when EMBEDDING_CHUNKING is on)
+    print(f"  Generating embedding for {blog.slug}...")
+    document = embed_documents([processed["processed_text"]])[0]
+    embedding = document["embedding"]
+    processed["embedding_layout"] = get_embedding_layout()
+    
+    # 3. Upsert to Pinecone (plus passage chunks when a chunk namespace is set)
+    print(f"  Upserting {blog.slug} to Pinecone...")
+    upsert_embedding(slug=blog.slug, embedding=embedding, metadata=processed)
+    upsert_chunk_vectors([{**processed, "chunks": document["chunks"]}], index=get_pinecone_index())
+    
+    return embedding
+
+
+def embed_and_update_single_blog(
+    blog: BlogInput,
+    update_all_recs: bool = True,
+    incremental: bool = True
+) -> int:
     """
     Embed a single blog and update recommendations.
     
     Args:
         blog: The blog to embed
         update_all_recs: If True, update recommendations for ALL blogs
+        incremental: If True, only rewrite the lists the new blog changes
+                     instead of recomputing every blog
     
     Returns:
         Number of recommendations updated
     """
     print(f"[{datetime.now().strftime('%H:%M:%S')}] Processing blog: {blog.slug}")
     
-    # 1. Preprocess
-    blog_dict = blog.model_dump()
-    blog_dict["content"] = blog.content
-    processed_text = preprocess_blog(blog_dict)
-    
-    # 2. Generate embedding
-    print(f"  Generating embedding...")
-    embedding = generate_embedding(processed_text)
-    
-    # 3. Upsert to Pinecone
-    print(f"  Upserting to Pinecone...")
-    upsert_embedding(
-        slug=blog.slug,
-        embedding=embedding,
-        metadata={
-            "title": blog.title,
-            "description": blog.description,
-            "tags": blog.tags,
-            "is_starred": blog.is_starred
-        }
-    )
-    
-    # Small delay to ensure Pinecone has indexed the new vector
-    time.sleep(1)
+    # 1-3. Preprocess, embed and upsert
+    embedding = embed_and_upsert_blog(blog)
     
     # 4. Update recommendations
     updated_count = 0
     
-    if update_all_recs:
-        # Get all slugs and update recommendations for each
-        all_slugs = get_all_slugs_from_pinecone()
-        print(f"  Updating recommendations for {len(all_slugs)} blogs...")
+    if update_all_recs and incremental:
+        print(f"  Merging into existing recommendations...")
+        updated_count = update_recommendations_incrementally(blog, embedding, top_k=3)
+    elif update_all_recs:
+        # Score every blog in memory; the new vector is overlaid so we
+        # don't have to wait for Pinecone to index it
+        all_recs = compute_all_recommendations(
+            top_k=3,
+            embedded_blogs=[{
+                "slug": blog.slug,
+                "embedding": embedding,
+                "title": blog.title,
+                "description": blog.description,
+            }]
+        )
+        print(f"  Updating recommendations for {len(all_recs)} blogs...")
         
-        for slug in all_slugs:
-            similar = find_similar_blogs(slug, top_k=3)
-            update_recommendations_in_mongo(slug, similar)
-            updated_count += 1
+        write_recommendations_to_mongo(all_recs)
+        updated_count = len(all_recs)
     else:
+        # Small delay to ensure Pinecone has indexed the new vector
+        time.sleep(1)
+        
         # Just update for the new blog
         similar = find_similar_blogs(blog.slug, top_k=3)
         update_recommendations_in_mongo(blog.slug, similar)
@@ -345,6 +702,350 @@ def embed_and_update_single_blog(blog: BlogInput, update_all_recs: bool = True)
     return updated_count
 
 
+def reembed_outdated_blogs() -> Dict[str, Any]:
+    """
+    Re-embed published blogs with missing or outdated vectors, then
+    recompute every blog's recommendations.
+    
+    Returns:
+        Summary for the /rerun-failed-embeddings response
+    """
+    # 1. Get all published slugs from MongoDB (full documents are
+    #    only fetched for the blogs that need re-embedding)
+    listed_at = time.monotonic()
+    all_mongo_slugs = set(iter_published_slugs())
+
+    # 2. Load the vectors (and their metadata) already in Pinecone
+    index_state = fetch_all_vectors(index=get_pinecone_index())
+    existing_slugs = set(index_state[0])
+    system_stats.seed_slugs(all_mongo_slugs, existing_slugs, listed_at)
+
+    # 3. Find missing slugs and vectors from another preprocessing
+    #    version or embedding layout
+    missing_slugs = all_mongo_slugs - existing_slugs
+    outdated_slugs = {
+        slug for slug in all_mongo_slugs & existing_slugs
+        if has_outdated_preprocessing(index_state[2].get(slug, {}))
+        or has_outdated_embedding(index_state[2].get(slug, {}))
+    }
+    refresh_slugs = missing_slugs | outdated_slugs
+
+    if not refresh_slugs:
+        return {
+            "success": True,
+            "message": "All blogs already have up-to-date embeddings. No re-run needed.",
+            "total_blogs": len(all_mongo_slugs),
+            "existing_embeddings": len(existing_slugs),
+            "preprocessing_version": PREPROCESSING_VERSION,
+            "embedding_layout": get_embedding_layout(),
+            "reprocessed": 0,
+            "failed": []
+        }
+
+    print(f"Found {len(missing_slugs)} blogs missing embeddings: {missing_slugs}")
+    print(f"Found {len(outdated_slugs)} blogs embedded by an older preprocessing version or layout")
+
+    # 4. Re-embed only those blogs, a few at a time
+    blog_inputs = [
+        BlogInput(
+            slug=blog["slug"],
+            title=blog.get("title", ""),
+            description=blog.get("description", ""),
+            content=blog.get("content", ""),
+            tags=blog.get("tags", []),
+            is_starred=blog.get("isStarred", False)
+        )
+        for blog in iter_blogs_from_mongo(query={"slug": {"$in": list(refresh_slugs)}})
+    ]
+
+    def report(i, blog_input, error):
+        if error is None:
+            print(f"  ✅ Re-embedded: {blog_input.slug}")
+        else:
+            print(f"  ❌ Failed to re-embed {blog_input.slug}: {error}")
+
+    embeddings, failures = map_concurrently(
+        embed_and_upsert_blog, blog_inputs, on_done=report
+    )
+
+    embedded_blogs = [
+        {
+            "slug": blog_input.slug,
+            "embedding": embedding,
+            "title": blog_input.title,
+            "description": blog_input.description,
+        }
+        for blog_input, embedding in zip(blog_inputs, embeddings)
+        if embedding is not None
+    ]
+    reprocessed = [blog["slug"] for blog in embedded_blogs]
+    failed = [
+        {"slug": failure["item"].slug, "error": str(failure["error"])}
+        for failure in failures
+    ]
+
+    # 5. Recompute ALL recommendations now that embeddings are complete
+    print("Recomputing all recommendations...")
+    all_recs = compute_all_recommendations(
+        top_k=3, embedded_blogs=embedded_blogs, index_state=index_state
+    )
+    mongo_counts = write_recommendations_to_mongo(all_recs)
+    recs_updated = len(all_recs)
+
+    # Each upsert already invalidated cached searches; drop any cached mid-run
+    get_search_cache().invalidate()
+
+    return {
+        "success": True,
+        "message": f"Re-embedded {len(reprocessed)} blogs and updated {recs_updated} recommendations",
+        "total_blogs": len(all_mongo_slugs),
+        "existing_embeddings": len(existing_slugs),
+        "missing": len(missing_slugs),
+        "outdated": len(outdated_slugs),
+        "preprocessing_version": PREPROCESSING_VERSION,
+        "embedding_layout": get_embedding_layout(),
+        "reprocessed": reprocessed,
+        "failed": failed,
+        "recommendations_updated": recs_updated,
+        "mongo": mongo_counts
+    }
+
+
+def search_index(
+    query_text: str,
+    top_k: int,
+    filters: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Embed a search query and return the best-matching blogs.
+    
+    Args:
+        query_text: Raw query text
+        top_k: Number of results
+        filters: Optional Pinecone metadata filter
+    
+    Returns:
+        Ranked list of {slug, title, description, tags, score}
+    """
+    # Process the query like we process blogs
+    processed_query = clean_text(query_text)
+    
+    # Query embedding (RETRIEVAL_QUERY), served from the in-memory cache when repeated
+    query_embedding = generate_query_embedding(processed_query)
+    
+    # Search Pinecone
+    index = get_pinecone_index()
+    with time_stage("vector_query"):
+        results = index.query(
+            vector=query_embedding,
+            top_k=top_k,
+            include_metadata=True,
+            **({"filter": filters} if filters else {})
+        )
+    
+    # Format results
+    search_results = []
+    for match in results.matches:
+        search_results.append({
+            "slug": match.id,
+            "title": match.metadata.get("title", ""),
+            "description": match.metadata.get("description", ""),
+            "tags": match.metadata.get("tags", []),
+            "score": round(float(match.score), 4)
+        })
+    
+    return search_results
+
+
+class SystemStats:
+    """
+    Cached building blocks of /stats.
+    
+    Each component (index stats, MongoDB counts, published/indexed slug sets)
+    is recomputed only when older than its TTL or when fresh=True, and records
+    how long its last computation took. Embeddings and recommendation lists
+    written by this process are applied to the cached numbers immediately.
+    """
+    
+    def __init__(
+        self,
+        ttl_seconds: float = STATS_TTL_SECONDS,
+        slugs_ttl_seconds: float = STATS_SLUGS_TTL_SECONDS
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.slugs_ttl_seconds = slugs_ttl_seconds
+        self._components: Dict[str, Dict[str, Any]] = {}
+        self._compute_locks: Dict[str, threading.Lock] = {
+            name: threading.Lock() for name in ("index", "mongodb", "slugs")
+        }
+        # Slugs indexed by this process, with the time they were written, so a
+        # slug listing that started before the write doesn't drop them
+        self._recently_indexed: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    def _component(self, name: str, compute: Callable[[], Any], ttl: float, fresh: bool) -> Dict[str, Any]:
+        """Return the cached component, recomputing it if stale (one thread at a time)."""
+        with self._compute_locks[name]:
+            entry = self._components.get(name)
+            if not fresh and entry is not None and time.monotonic() - entry["computed_at"] < ttl:
+                return {**entry, "cached": True}
+            
+            started = time.monotonic()
+            value = compute()
+            entry = {
+                "value": value,
+                "computed_at": time.monotonic(),
+                "duration_ms": round((time.monotonic() - started) * 1000, 1),
+            }
+            with self._lock:
+                if name == "slugs":
+                    self._apply_recent_writes(value, since=started)
+                self._components[name] = entry
+            return {**entry, "cached": False}
+    
+    def _compute_index(self) -> Dict[str, Any]:
+        stats = get_pinecone_index().describe_index_stats()
+        return {"total_vectors": stats.total_vector_count, "dimension": stats.dimension}
+    
+    def _compute_mongodb(self) -> Dict[str, Any]:
+        return {"recommendation_entries": get_mongo_db().recommendations.count_documents({})}
+    
+    def _compute_slugs(self) -> Dict[str, set]:
+        return {
+            "published": set(iter_published_slugs()),
+            "indexed": set(get_all_slugs_from_pinecone()),
+        }
+    
+    def _apply_recent_writes(self, slugs: Dict[str, set], since: float):
+        """Add slugs written after `since` (the listing may have missed them)."""
+        for slug, written_at in list(self._recently_indexed.items()):
+            if written_at >= since:
+                slugs["published"].add(slug)
+                slugs["indexed"].add(slug)
+            else:
+                del self._recently_indexed[slug]
+    
+    def record_indexed(self, slug: str):
+        """Apply an embedding upsert: the blog is published and now indexed."""
+        with self._lock:
+            self._recently_indexed[slug] = time.monotonic()
+            
+            slugs = self._components.get("slugs")
+            if slugs is None:
+                return
+            is_new = slug not in slugs["value"]["indexed"]
+            slugs["value"]["published"].add(slug)
+            slugs["value"]["indexed"].add(slug)
+            
+            index = self._components.get("index")
+            if is_new and index is not None:
+                index["value"]["total_vectors"] += 1
+    
+    def record_recommendations_added(self, count: int):
+        """Apply recommendation upserts that created new documents."""
+        if not count:
+            return
+        with self._lock:
+            mongodb = self._components.get("mongodb")
+            if mongodb is not None:
+                mongodb["value"]["recommendation_entries"] += count
+    
+    def seed_slugs(self, published: set, indexed: set, listed_at: float):
+        """
+        Store slug sets a caller just listed anyway (e.g. the rerun endpoint).
+        
+        Args:
+            published: Published slugs in MongoDB
+            indexed: Slugs with a vector in the index
+            listed_at: time.monotonic() when the listing started
+        """
+        with self._lock:
+            slugs = {"published": set(published), "indexed": set(indexed)}
+            self._apply_recent_writes(slugs, since=listed_at)
+            self._components["slugs"] = {
+                "value": slugs,
+                "computed_at": listed_at,
+                "duration_ms": None,
+            }
+    
+    def snapshot(self, fresh: bool = False) -> Dict[str, Any]:
+        """
+        Index, MongoDB and missing-embedding stats.
+        
+        Args:
+            fresh: Recompute every component instead of using cached values
+        
+        Returns:
+            The /stats fields plus per-component timings
+        """
+        index = self._component("index", self._compute_index, self.ttl_seconds, fresh)
+        mongodb = self._component("mongodb", self._compute_mongodb, self.ttl_seconds, fresh)
+        slugs = self._component("slugs", self._compute_slugs, self.slugs_ttl_seconds, fresh)
+        
+        with self._lock:
+            published = slugs["value"]["published"]
+            missing_slugs = sorted(published - slugs["value"]["indexed"])
+            published_count = len(published)
+            total_vectors = index["value"]["total_vectors"]
+        
+        now = time.monotonic()
+        return {
+            "pinecone": {
+                "index_name": PINECONE_INDEX_NAME,
+                "total_vectors": total_vectors,
+                "dimension": index["value"]["dimension"]
+            },
+            "mongodb": {
+                "published_blogs": published_count,
+                "recommendation_entries": mongodb["value"]["recommendation_entries"]
+            },
+            "missing_embeddings": {
+                "count": len(missing_slugs),
+                "slugs": missing_slugs
+            },
+            "timings": {
+                name: {
+                    "cached": entry["cached"],
+                    "age_seconds": round(now - entry["computed_at"], 1),
+                    "duration_ms": entry["duration_ms"],
+                }
+                for name, entry in (("index", index), ("mongodb", mongodb), ("slugs", slugs))
+            }
+        }
+
+
+system_stats = SystemStats()
+
+
+def collect_stats(fresh: bool = False) -> Dict[str, Any]:
+    """Gather index, MongoDB, cache and job statistics for /stats."""
+    started = time.monotonic()
+    stats = system_stats.snapshot(fresh=fresh)
+    stats.update({
+        "query_cache": get_query_cache().stats(),
+        "search_cache": get_search_cache().stats(),
+        "recommendation_table": recommendation_table.stats(),
+        "jobs": get_job_queue().counts()
+    })
+    stats["timings"]["total_ms"] = round((time.monotonic() - started) * 1000, 1)
+    return stats
+
+
+EMBED_BLOG_JOB = "embed-blog"
+
+
+def run_embed_blog_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Job handler for /embed-blog; the result is stored on the job."""
+    blog = BlogInput(**payload["blog"])
+    updated_count = embed_and_update_single_blog(
+        blog, update_all_recs=True, incremental=payload.get("incremental", True)
+    )
+    return {"slug": blog.slug, "recommendations_updated": updated_count}
+
+
+job_workers: Optional[JobWorkerPool] = None
+
+
 # ============================================================
 # FastAPI App
 # ============================================================
@@ -356,11 +1057,11 @@ async def lifespan(app: FastAPI):
     
     # Validate environment
     missing = []
-    if not MONGODB_URI:
+    if not MONGODB_URI and MONGODB_BACKEND != "memory":
         missing.append("MONGODB_URI")
-    if not PINECONE_API_KEY:
+    if not PINECONE_API_KEY and VECTOR_STORE_BACKEND not in ("local", "memory"):
         missing.append("PINECONE_API_KEY")
-    if not GOOGLE_API_KEY:
+    if not GOOGLE_API_KEY and EMBEDDING_PROVIDER != "fake":
         missing.append("GOOGLE_API_KEY or GEMINI_API_KEY")
     
     if missing:
@@ -368,9 +1069,29 @@ async def lifespan(app: FastAPI):
     else:
         print("✅ All environment variables configured")
     
+    global io_limiter, admin_limiter
+    io_limiter = anyio.CapacityLimiter(API_IO_THREADS)
+    admin_limiter = anyio.CapacityLimiter(API_ADMIN_THREADS)
+    
+    # Warm the recommendation table so the first read is O(1) too
+    try:
+        recommendation_table.reload()
+        print(f"✅ Loaded recommendations for {recommendation_table.stats()['entries']} blogs")
+    except Exception as e:
+        print(f"⚠️ Could not load recommendations: {e}")
+    
+    # Run queued embedding jobs (including any left over from a restart)
+    global job_workers
+    job_workers = JobWorkerPool(get_job_queue(), {EMBED_BLOG_JOB: run_embed_blog_job})
+    job_workers.start()
+    print(f"✅ Started {job_workers.workers} job worker(s)")
+    
     yield
     
     # Cleanup
+    job_workers.stop()
+    close_index()
+    
     global mongo_client
     if mongo_client:
         mongo_client.close()
@@ -393,6 +1114,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+REQUEST_SECONDS = get_registry().histogram(
+    "ml_api_request_duration_seconds",
+    "API request latency by route template and status code",
+    ("method", "route", "status")
+)
+
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Observe every request's latency, labelled by route template (not raw path)."""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=status
+        )
+
 
 # ============================================================
 # Endpoints
@@ -408,35 +1154,104 @@ async def health_check():
     }
 
 
-@app.post("/embed-blog", response_model=EmbedResponse)
+@app.get("/recommendations/{slug}")
+async def get_recommendations(slug: str):
+    """
+    Precomputed recommendations for one blog, served from memory.
+    """
+    try:
+        recommendations = await run_blocking(recommendation_table.get, slug)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Recommendations unavailable: {e}")
+    
+    if recommendations is None:
+        raise HTTPException(status_code=404, detail=f"No recommendations for '{slug}'")
+    
+    return {
+        "slug": slug,
+        "recommendations": recommendations,
+        "count": len(recommendations)
+    }
+
+
+@app.post("/recommendations/batch")
+async def get_recommendations_batch(request: RecommendationsBatchRequest):
+    """
+    Precomputed recommendations for many blogs in one call.
+    
+    Body:
+        slugs: List[str] - Blog slugs to look up
+    """
+    try:
+        found = await run_blocking(recommendation_table.get_many, request.slugs)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Recommendations unavailable: {e}")
+    
+    return {
+        "recommendations": found,
+        "missing": [slug for slug in request.slugs if slug not in found],
+        "count": len(found)
+    }
+
+
+@app.post("/embed-blog", response_model=EmbedJobResponse, status_code=202)
 async def embed_blog(
     blog: BlogInput,
-    background_tasks: BackgroundTasks,
+    incremental: bool = True,
     x_api_secret: str = Header(None, alias="X-API-Secret")
 ):
     """
-    Embed a new blog and update recommendations.
-    Called by Next.js when a new blog is created.
+    Queue a new blog for embedding and a recommendation update.
+    Called by Next.js when a new blog is created. Returns immediately with
+    a job ID to poll at /jobs/{job_id}; a blog that is already waiting in
+    the queue is updated in place rather than queued twice.
+    Pass ?incremental=false to recompute every blog's recommendations.
     """
     # Verify secret
     if x_api_secret != API_SECRET:
         raise HTTPException(status_code=401, detail="Invalid API secret")
     
     try:
-        # Process synchronously (for now)
-        # For very large scale, you might want to use background_tasks
-        updated_count = embed_and_update_single_blog(blog, update_all_recs=True)
-        
-        return EmbedResponse(
-            success=True,
-            message=f"Blog '{blog.slug}' embedded and recommendations updated",
-            slug=blog.slug,
-            recommendations_updated=updated_count
+        job_id, coalesced = await run_blocking(
+            get_job_queue().enqueue,
+            EMBED_BLOG_JOB,
+            blog.slug,
+            {"blog": blog.model_dump(), "incremental": incremental}
         )
-    
     except Exception as e:
-        print(f"Error embedding blog: {e}")
+        print(f"Error queueing blog: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    
+    return EmbedJobResponse(
+        success=True,
+        message=(
+            f"Blog '{blog.slug}' was already queued; job updated with the latest content"
+            if coalesced else f"Blog '{blog.slug}' queued for embedding"
+        ),
+        slug=blog.slug,
+        job_id=job_id,
+        status="queued",
+        coalesced=coalesced
+    )
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(
+    job_id: str,
+    x_api_secret: str = Header(None, alias="X-API-Secret")
+):
+    """
+    Status of a background job: queued, running, succeeded or failed.
+    Finished jobs include their result (or error).
+    """
+    if x_api_secret != API_SECRET:
+        raise HTTPException(status_code=401, detail="Invalid API secret")
+    
+    job = await run_blocking(get_job_queue().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    
+    return job
 
 
 @app.post("/update-all-recommendations")
@@ -451,16 +1266,17 @@ async def update_all_recommendations(
         raise HTTPException(status_code=401, detail="Invalid API secret")
     
     try:
-        all_slugs = get_all_slugs_from_pinecone()
+        all_recs = await run_blocking(compute_all_recommendations, top_k=3, admin=True)
+        mongo_counts = await run_blocking(write_recommendations_to_mongo, all_recs, admin=True)
         
-        for slug in all_slugs:
-            similar = find_similar_blogs(slug, top_k=3)
-            update_recommendations_in_mongo(slug, similar)
+        # Manual full refreshes usually follow out-of-band index writes (ml/scripts)
+        get_search_cache().invalidate()
         
         return {
             "success": True,
-            "message": f"Updated recommendations for {len(all_slugs)} blogs",
-            "count": len(all_slugs)
+            "message": f"Updated recommendations for {len(all_recs)} blogs",
+            "count": len(all_recs),
+            "mongo": mongo_counts
         }
     
     except Exception as e:
@@ -472,86 +1288,17 @@ async def rerun_failed_embeddings(
     x_api_secret: str = Header(None, alias="X-API-Secret")
 ):
     """
-    Re-embed all blogs that are missing embeddings in Pinecone.
+    Re-embed all blogs that are missing embeddings in Pinecone, or whose
+    vectors were built by an older preprocessing version.
     Fetches all published blogs from MongoDB, checks which ones
-    don't have vectors in Pinecone, re-generates their embeddings,
-    and updates all recommendations.
+    don't have up-to-date vectors in Pinecone, re-generates their
+    embeddings, and updates all recommendations.
     """
     if x_api_secret != API_SECRET:
         raise HTTPException(status_code=401, detail="Invalid API secret")
 
     try:
-        # 1. Get all published blogs from MongoDB
-        all_blogs = get_all_blogs_from_mongo()
-        all_mongo_slugs = {blog["slug"] for blog in all_blogs}
-
-        # 2. Get all slugs that already have embeddings in Pinecone
-        existing_slugs = set(get_all_slugs_from_pinecone())
-
-        # 3. Find missing slugs
-        missing_slugs = all_mongo_slugs - existing_slugs
-
-        if not missing_slugs:
-            return {
-                "success": True,
-                "message": "All blogs already have embeddings. No re-run needed.",
-                "total_blogs": len(all_mongo_slugs),
-                "existing_embeddings": len(existing_slugs),
-                "reprocessed": 0,
-                "failed": []
-            }
-
-        print(f"Found {len(missing_slugs)} blogs missing embeddings: {missing_slugs}")
-
-        # 4. Re-embed only the missing blogs
-        reprocessed = []
-        failed = []
-
-        for blog in all_blogs:
-            if blog["slug"] not in missing_slugs:
-                continue
-
-            slug = blog["slug"]
-            try:
-                blog_input = BlogInput(
-                    slug=slug,
-                    title=blog.get("title", ""),
-                    description=blog.get("description", ""),
-                    content=blog.get("content", ""),
-                    tags=blog.get("tags", []),
-                    is_starred=blog.get("isStarred", False)
-                )
-                # Embed but skip per-blog recommendation update (we'll do it all at once)
-                embed_and_update_single_blog(blog_input, update_all_recs=False)
-                reprocessed.append(slug)
-                print(f"  ✅ Re-embedded: {slug}")
-
-                # Small delay for rate limiting
-                time.sleep(1)
-
-            except Exception as e:
-                print(f"  ❌ Failed to re-embed {slug}: {e}")
-                failed.append({"slug": slug, "error": str(e)})
-
-        # 5. Recompute ALL recommendations now that embeddings are complete
-        print("Recomputing all recommendations...")
-        all_slugs = get_all_slugs_from_pinecone()
-        recs_updated = 0
-        for slug in all_slugs:
-            similar = find_similar_blogs(slug, top_k=3)
-            update_recommendations_in_mongo(slug, similar)
-            recs_updated += 1
-
-        return {
-            "success": True,
-            "message": f"Re-embedded {len(reprocessed)} blogs and updated {recs_updated} recommendations",
-            "total_blogs": len(all_mongo_slugs),
-            "existing_embeddings": len(existing_slugs),
-            "reprocessed": reprocessed,
-            "failed": failed,
-            "recommendations_updated": recs_updated
-        }
-
+        return await run_blocking(reembed_outdated_blogs, admin=True)
     except Exception as e:
         print(f"Error in rerun-failed-embeddings: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -565,88 +1312,69 @@ async def semantic_search(
     """
     Semantic search - find blogs similar to ANY text query.
     Generates an embedding from the query text and searches Pinecone.
+    Ranked results are cached until the next write to the index.
     
     Body:
         query: str - The text to search for
         top_k: int - Number of results (default: 3)
+        filter: dict - Optional Pinecone metadata filter, e.g. {"tags": {"$in": ["python"]}}
     """
     if x_api_secret != API_SECRET:
         raise HTTPException(status_code=401, detail="Invalid API secret")
     
     query_text = request.get("query", "")
     top_k = request.get("top_k", 3)
+    filters = request.get("filter") or None
     
     if not query_text:
         raise HTTPException(status_code=400, detail="Query is required")
     
-    # Process the query like we process blogs
-    processed_query = clean_text(query_text)
-    
-    # Generate embedding for the query
-    query_embedding = generate_embedding(processed_query)
+    # Popular queries skip both the embedding call and the vector query
+    search_cache = get_search_cache()
+    generation = search_cache.generation
+    cached = search_cache.get(query_text, top_k, filters)
+    if cached is not None:
+        return {
+            "query": query_text,
+            "results": cached,
+            "count": len(cached),
+            "cached": True
+        }
     
-    # Search Pinecone
-    index = get_pinecone_index()
-    results = index.query(
-        vector=query_embedding,
-        top_k=top_k,
-        include_metadata=True
-    )
+    # Embedding the query and querying the index are blocking network calls
+    search_results = await run_blocking(search_index, query_text, top_k, filters)
     
-    # Format results
-    search_results = []
-    for match in results.matches:
-        search_results.append({
-            "slug": match.id,
-            "title": match.metadata.get("title", ""),
-            "description": match.metadata.get("description", ""),
-            "tags": match.metadata.get("tags", []),
-            "score": round(float(match.score), 4)
-        })
+    search_cache.put(query_text, top_k, filters, search_results, generation)
     
     return {
         "query": query_text,
         "results": search_results,
-        "count": len(search_results)
+        "count": len(search_results),
+        "cached": False
     }
 
 
 @app.get("/stats")
-async def get_stats():
-    """Get statistics about the recommendation system."""
+async def get_stats(fresh: bool = False):
+    """
+    Get statistics about the recommendation system.
+    Served from cached counts; pass ?fresh=true to recompute everything.
+    """
     try:
-        index = get_pinecone_index()
-        stats = index.describe_index_stats()
-
-        db = get_mongo_db()
-        blog_count = db.blogs.count_documents({"published": True})
-        rec_count = db.recommendations.count_documents({})
-
-        # Also show which blogs are missing embeddings
-        all_blogs = list(db.blogs.find({"published": True}, {"slug": 1}))
-        all_mongo_slugs = {blog["slug"] for blog in all_blogs}
-        existing_slugs = set(get_all_slugs_from_pinecone())
-        missing_slugs = list(all_mongo_slugs - existing_slugs)
-
-        return {
-            "pinecone": {
-                "index_name": PINECONE_INDEX_NAME,
-                "total_vectors": stats.total_vector_count,
-                "dimension": stats.dimension
-            },
-            "mongodb": {
-                "published_blogs": blog_count,
-                "recommendation_entries": rec_count
-            },
-            "missing_embeddings": {
-                "count": len(missing_slugs),
-                "slugs": missing_slugs
-            }
-        }
+        return await run_blocking(collect_stats, fresh=fresh, admin=True)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/metrics")
+async def metrics():
+    """Counters and latency histograms in the Prometheus text format."""
+    return Response(
+        content=get_registry().render_prometheus(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 # ============================================================
 # Main
 # ============================================================
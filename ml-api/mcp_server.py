@@ -19,6 +19,7 @@ Full Tools (Enable Later):
     7. embed_single_blog - Manually trigger embedding for a blog
     8. update_all_recommendations - Recompute all recommendations
     9. rerun_failed_embeddings - Fix missing embeddings in Pinecone
+    10. get_job_status - Check on a queued embedding job
 
 Usage:
     # 1. Set environment variables (or put in .env file)
@@ -34,6 +35,7 @@ Usage:
 
 import os
 import sys
+import asyncio
 import argparse
 from typing import Any, Optional
 from dataclasses import dataclass
@@ -73,6 +75,10 @@ def get_config() -> ServerConfig:
 # Load config at module level so tools can access it
 config = get_config()
 
+# embed_single_blog polls the queued job for up to a minute before giving up
+EMBED_JOB_POLL_SECONDS = 2.0
+EMBED_JOB_POLL_ATTEMPTS = 30
+
 
 # ============================================================
 # Create FastMCP Server
@@ -331,21 +337,16 @@ async def get_blog_recommendations(slug: str) -> str:
         msg += f"**Description:** {blog.get('description', 'N/A')}\n"
         msg += f"**Tags:** {', '.join(blog.get('tags', []))}\n\n"
         
-        # Use semantic search with the blog's own content to find similar blogs
-        # This avoids needing a direct MongoDB connection from the MCP server
+        # Precomputed recommendations, served from the ML API's in-memory table
+        # (no embedding call or vector query, and no MongoDB connection here)
         try:
-            search_text = f"{blog.get('title', '')} {blog.get('description', '')}"
-            search_result = await _ml_api_request(
-                "post", "/search",
-                json={"query": search_text, "top_k": 4},
-                timeout=60.0,
-            )
-            
-            # Filter out the blog itself from results
-            recommendations = [
-                r for r in search_result.get("results", [])
-                if r.get("slug") != slug
-            ][:3]
+            try:
+                rec_result = await _ml_api_request("get", f"/recommendations/{slug}")
+                recommendations = rec_result.get("recommendations", [])
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code != 404:
+                    raise
+                recommendations = []
             
             if recommendations:
                 msg += "### Similar Blogs\n"
@@ -363,11 +364,15 @@ async def get_blog_recommendations(slug: str) -> str:
 
 
 @mcp.tool()
-async def get_system_stats() -> str:
+async def get_system_stats(fresh: bool = False) -> str:
     """Get statistics about the blog recommendation system.
-    Shows: Pinecone vector count, MongoDB blog count, missing embeddings."""
+    Shows: Pinecone vector count, MongoDB blog count, missing embeddings.
+    
+    Args:
+        fresh: Recompute every number instead of using the cached stats (slower)
+    """
     try:
-        stats = await _ml_api_request("get", "/stats")
+        stats = await _ml_api_request("get", "/stats", params={"fresh": "true"} if fresh else None)
         
         msg = "## Blog Recommendation System Stats\n\n"
         
@@ -389,6 +394,22 @@ async def get_system_stats() -> str:
             msg += f"Slugs: {', '.join(shown)}"
             if len(missing["slugs"]) > 5:
                 msg += f" ... and {len(missing['slugs']) - 5} more"
+            msg += "\n"
+        
+        query_cache = stats.get("query_cache")
+        if query_cache:
+            msg += "\n### Query Embedding Cache\n"
+            msg += f"- **Entries:** {query_cache.get('size', 0)}/{query_cache.get('max_entries', 0)}\n"
+            msg += f"- **Hit Rate:** {query_cache.get('hit_rate', 0):.1%} "
+            msg += f"({query_cache.get('hits', 0)} hits, {query_cache.get('misses', 0)} misses)\n"
+        
+        timings = stats.get("timings")
+        if timings:
+            ages = [t["age_seconds"] for t in timings.values() if isinstance(t, dict)]
+            msg += f"\n_Stats computed in {timings.get('total_ms', 0)} ms"
+            if ages:
+                msg += f", oldest component {max(ages):.0f}s old"
+            msg += "_\n"
         
         return msg
     except Exception as e:
@@ -405,7 +426,8 @@ async def embed_single_blog(
     is_starred: bool = False,
 ) -> str:
     """Manually trigger embedding generation for a specific blog.
-    Use this if embedding failed during blog creation.
+    Use this if embedding failed during blog creation. The ML API runs the
+    job in the background; this waits up to a minute for it to finish.
     
     Args:
         slug: The blog slug to embed (required)
@@ -416,7 +438,7 @@ async def embed_single_blog(
         is_starred: Is the blog starred?
     """
     try:
-        result = await _ml_api_request(
+        queued = await _ml_api_request(
             "post", "/embed-blog",
             json={
                 "slug": slug,
@@ -426,17 +448,51 @@ async def embed_single_blog(
                 "tags": tags,
                 "is_starred": is_starred,
             },
-            timeout=120.0,
         )
+        job_id = queued["job_id"]
         
-        if result.get("success"):
-            return f"✅ Embedded blog '{slug}'. {result.get('recommendations_updated', 0)} recommendations updated."
-        else:
-            return f"❌ Error: {result.get('detail', result.get('message', 'Unknown error'))}"
+        for _ in range(EMBED_JOB_POLL_ATTEMPTS):
+            job = await _ml_api_request("get", f"/jobs/{job_id}")
+            if job["status"] in ("succeeded", "failed"):
+                return _format_job(job)
+            await asyncio.sleep(EMBED_JOB_POLL_SECONDS)
+        
+        return (
+            f"⏳ Embedding for '{slug}' is still {job['status']} (job {job_id}). "
+            f"Check again with get_job_status."
+        )
     except Exception as e:
         return f"Error embedding blog: {str(e)}"
 
 
+@mcp.tool()
+async def get_job_status(job_id: str) -> str:
+    """Check the status of a background embedding job.
+    
+    Args:
+        job_id: Job ID returned when the blog was queued
+    """
+    try:
+        job = await _ml_api_request("get", f"/jobs/{job_id}")
+        return _format_job(job)
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 404:
+            return f"No job found with ID '{job_id}'."
+        return f"Error getting job status: {str(e)}"
+    except Exception as e:
+        return f"Error getting job status: {str(e)}"
+
+
+def _format_job(job: dict) -> str:
+    """Describe an ML API job for a tool response."""
+    if job["status"] == "succeeded":
+        updated = (job.get("result") or {}).get("recommendations_updated", 0)
+        return f"✅ Embedded blog '{job['key']}'. {updated} recommendations updated."
+    if job["status"] == "failed":
+        return f"❌ Embedding '{job['key']}' failed: {job.get('error') or 'Unknown error'}"
+    return f"⏳ Job {job['id']} for '{job['key']}' is {job['status']}."
+
+
 @mcp.tool()
 async def update_all_recommendations() -> str:
     """Recompute recommendations for ALL blogs.
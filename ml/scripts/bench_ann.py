@@ -0,0 +1,145 @@
+"""
+Recall / latency benchmark for the HNSW option of the local vector store.
+Builds exact and HNSW LocalVectorIndexes over the same synthetic clustered
+embeddings, then reports recall@k and query latency for a grid of M and ef
+values, including after incremental deletes and inserts and after reloading
+the graph from disk. Runs offline (needs: pip install hnswlib).
+
+Usage:
+    python scripts/bench_ann.py
+    python scripts/bench_ann.py --vectors 50000 --m 16,32 --ef 32,64,128
+"""
+
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from utils.config import EMBEDDING_DIMENSION
+from utils.local_index import LocalVectorIndex
+
+
+def make_corpus(rng: np.random.Generator, count: int, clusters: int, dimension: int) -> np.ndarray:
+    """Clustered vectors, closer to real topic-structured embeddings than pure noise."""
+    centers = rng.normal(size=(clusters, dimension)).astype(np.float32)
+    assignments = rng.integers(0, clusters, size=count)
+    noise = rng.normal(scale=2.0, size=(count, dimension)).astype(np.float32)
+    return centers[assignments] + noise
+
+
+def upsert_all(index: LocalVectorIndex, ids, matrix, batch_size: int = 5000) -> float:
+    """Insert every vector; returns the elapsed seconds."""
+    start = time.perf_counter()
+    for i in range(0, len(ids), batch_size):
+        index.upsert(vectors=[
+            {"id": vector_id, "values": row}
+            for vector_id, row in zip(ids[i:i + batch_size], matrix[i:i + batch_size])
+        ])
+    return time.perf_counter() - start
+
+
+def run_queries(index: LocalVectorIndex, queries: np.ndarray, k: int, ef: int = None):
+    """Top-k IDs per query and per-query latencies in milliseconds."""
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        matches = index.query(vector=query, top_k=k, ef=ef).matches
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([match.id for match in matches])
+    return results, np.array(latencies)
+
+
+def recall(results, truth) -> float:
+    """Mean fraction of the true top-k found."""
+    return float(np.mean([len(set(r) & set(t)) / len(t) for r, t in zip(results, truth)]))
+
+
+def print_row(label: str, rec: float, latencies: np.ndarray):
+    print(f"  {label:<22} recall {rec:6.3f}   mean {latencies.mean():7.3f} ms   "
+          f"p95 {np.percentile(latencies, 95):7.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HNSW against exact search")
+    parser.add_argument("--vectors", type=int, default=10000, help="Number of stored vectors")
+    parser.add_argument("--queries", type=int, default=200, help="Number of test queries")
+    parser.add_argument("--clusters", type=int, default=100, help="Topic clusters in the corpus")
+    parser.add_argument("--k", type=int, default=10, help="Neighbours per query")
+    parser.add_argument("--m", default="8,16,32", help="Comma-separated HNSW M values")
+    parser.add_argument("--ef", default="16,32,64,128,256", help="Comma-separated ef values")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    m_values = [int(m) for m in args.m.split(",")]
+    ef_values = [int(ef) for ef in args.ef.split(",")]
+
+    ids = [f"blog-{i}" for i in range(args.vectors)]
+    matrix = make_corpus(rng, args.vectors, args.clusters, EMBEDDING_DIMENSION)
+    # Queries land near stored vectors, like a search for an existing topic
+    queries = matrix[rng.integers(0, args.vectors, size=args.queries)]
+    queries = queries + rng.normal(scale=0.5, size=queries.shape).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        print("=" * 60)
+        print(f"{args.vectors} vectors x {EMBEDDING_DIMENSION} dims, "
+              f"{args.queries} queries, k={args.k}")
+        print("=" * 60)
+
+        exact = LocalVectorIndex(Path(tmp_dir) / "exact", EMBEDDING_DIMENSION)
+        build = upsert_all(exact, ids, matrix)
+        truth, latencies = run_queries(exact, queries, args.k)
+        print(f"  exact build {build:.1f}s")
+        print_row("exact", 1.0, latencies)
+
+        for m in m_values:
+            path = Path(tmp_dir) / f"hnsw-m{m}"
+            hnsw = LocalVectorIndex(path, EMBEDDING_DIMENSION, index_type="hnsw",
+                                    hnsw_params={"m": m})
+            build = upsert_all(hnsw, ids, matrix)
+            hnsw.flush()
+            print(f"\n  hnsw M={m} build {build:.1f}s")
+            for ef in ef_values:
+                results, latencies = run_queries(hnsw, queries, args.k, ef=ef)
+                print_row(f"M={m} ef={ef}", recall(results, truth), latencies)
+
+        # Incremental updates: delete 10% and insert as many new vectors
+        m = 16 if 16 in m_values else m_values[0]
+        ef = 64 if 64 in ef_values else ef_values[-1]
+        hnsw = LocalVectorIndex(Path(tmp_dir) / f"hnsw-m{m}", EMBEDDING_DIMENSION,
+                                index_type="hnsw", hnsw_params={"m": m})
+
+        removed = ids[::10]
+        added_ids = [f"new-{i}" for i in range(len(removed))]
+        added = make_corpus(rng, len(removed), args.clusters, EMBEDDING_DIMENSION)
+        for index in (exact, hnsw):
+            index.delete(ids=removed)
+            upsert_all(index, added_ids, added)
+
+        print("\n" + "=" * 60)
+        print(f"After deleting and inserting {len(removed)} vectors (M={m}, ef={ef})")
+        print("=" * 60)
+        truth, latencies = run_queries(exact, queries, args.k)
+        print_row("exact", 1.0, latencies)
+        results, latencies = run_queries(hnsw, queries, args.k, ef=ef)
+        print_row(f"M={m} ef={ef}", recall(results, truth), latencies)
+
+        hnsw.flush()
+        start = time.perf_counter()
+        reopened = LocalVectorIndex(Path(tmp_dir) / f"hnsw-m{m}", EMBEDDING_DIMENSION,
+                                    index_type="hnsw", hnsw_params={"m": m})
+        reopened.describe_index_stats()  # Namespaces (and graphs) load lazily
+        print(f"\n  Reloaded from disk in {time.perf_counter() - start:.2f}s")
+        results, latencies = run_queries(reopened, queries, args.k, ef=ef)
+        print_row("reloaded", recall(results, truth), latencies)
+        print()
+
+
+if __name__ == "__main__":
+    main()
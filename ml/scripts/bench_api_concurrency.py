@@ -0,0 +1,185 @@
+"""
+Concurrency benchmark for the ML API.
+Starts ml-api/main.py in-process on a local vector store, with the embedding
+API and the /stats scan replaced by blocking sleeps of realistic length, and
+measures /search and /health latency alone and under mixed load (concurrent
+/stats and /recommendations calls). Run with --inline to call the blocking
+work directly on the event loop, as the handlers used to, for comparison.
+
+Usage:
+    python scripts/bench_api_concurrency.py
+    python scripts/bench_api_concurrency.py --inline
+    python scripts/bench_api_concurrency.py --embed-ms 150 --stats-ms 3000 --clients 16
+"""
+
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+
+# Offline settings before the API (and utils) read their config
+_tmp_dir = tempfile.TemporaryDirectory()
+os.environ["VECTOR_STORE_BACKEND"] = "local"
+os.environ["VECTOR_STORE_PATH"] = str(Path(_tmp_dir.name) / "vectors")
+os.environ["VECTOR_STORE_INDEX"] = "exact"
+os.environ["JOB_QUEUE_PATH"] = str(Path(_tmp_dir.name) / "jobs.sqlite")
+os.environ["SEARCH_CACHE_SIZE"] = "0"  # Every search goes through the embed + query path
+os.environ["QUERY_CACHE_SIZE"] = "0"
+os.environ.setdefault("API_SECRET", "bench-secret")
+
+# Add the API and the shared ML utilities to the path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "ml-api"))
+
+import httpx
+import numpy as np
+import uvicorn
+
+import main as api
+from utils.config import EMBEDDING_DIMENSION
+from utils.vector_store import upsert_blogs_batch
+
+
+def install_fakes(args, rng: np.random.Generator):
+    """Replace the external calls with blocking sleeps of the given length."""
+    def fake_query_embedding(text, use_cache=True):
+        time.sleep(args.embed_ms / 1000)
+        return rng.normal(size=EMBEDDING_DIMENSION).tolist()
+
+    def fake_collect_stats(fresh=False):
+        time.sleep(args.stats_ms / 1000)
+        return {"ok": True}
+
+    def fake_load_recommendations():
+        time.sleep(args.mongo_ms / 1000)
+        return {f"blog-{i}": [] for i in range(args.vectors)}
+
+    api.generate_query_embedding = fake_query_embedding
+    api.collect_stats = fake_collect_stats
+    api.get_all_recommendations_from_mongo = fake_load_recommendations
+    api.recommendation_table.ttl_seconds = 0.5  # Reload from "Mongo" often
+
+    if args.inline:
+        async def run_inline(func, *func_args, admin=False, **kwargs):
+            return func(*func_args, **kwargs)
+        api.run_blocking = run_inline
+
+
+def start_server(port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(api.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def timed_loop(client, method, path, latencies, stop, **kwargs):
+    """Call an endpoint back to back until stopped, recording latencies in ms."""
+    i = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        body = kwargs.get("json")
+        if body is not None and "query" in body:
+            body = {**body, "query": f"{body['query']} {i}"}
+        response = await client.request(method, path, json=body)
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+        i += 1
+
+
+async def run_phase(base_url: str, args, mixed: bool):
+    """Run search clients (plus background load if mixed) for args.seconds."""
+    headers = {"X-API-Secret": os.environ["API_SECRET"]}
+    timeout = httpx.Timeout(120.0)
+    limits = httpx.Limits(max_connections=args.clients + 8)
+    latencies = {"search": [], "health": [], "stats": [], "recommendations": []}
+    stop = asyncio.Event()
+
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, timeout=timeout, limits=limits) as client:
+        tasks = [
+            timed_loop(client, "POST", "/search", latencies["search"], stop,
+                       json={"query": f"vector databases {c}", "top_k": 5})
+            for c in range(args.clients)
+        ]
+        tasks.append(timed_loop(client, "GET", "/health", latencies["health"], stop))
+        if mixed:
+            tasks.append(timed_loop(client, "GET", "/stats?fresh=true", latencies["stats"], stop))
+            tasks.append(timed_loop(client, "GET", "/recommendations/blog-0",
+                                    latencies["recommendations"], stop))
+
+        async def stopper():
+            await asyncio.sleep(args.seconds)
+            stop.set()
+
+        await asyncio.gather(stopper(), *tasks)
+
+    return latencies
+
+
+def report(name: str, latencies, seconds: float):
+    if not latencies:
+        print(f"  {name:<16} no completed requests")
+        return
+    values = np.array(latencies)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    print(f"  {name:<16} {len(values) / seconds:7.1f} req/s   "
+          f"p50 {p50:8.1f} ms   p95 {p95:8.1f} ms   p99 {p99:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ML API latency under concurrent load")
+    parser.add_argument("--vectors", type=int, default=2000, help="Blogs in the local index")
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent /search clients")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each phase")
+    parser.add_argument("--embed-ms", type=float, default=80, help="Simulated query embedding latency")
+    parser.add_argument("--stats-ms", type=float, default=1500, help="Simulated /stats scan time")
+    parser.add_argument("--mongo-ms", type=float, default=50, help="Simulated recommendation reload time")
+    parser.add_argument("--inline", action="store_true",
+                        help="Run blocking calls on the event loop (the old behaviour)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    matrix = rng.normal(size=(args.vectors, EMBEDDING_DIMENSION)).astype(np.float32)
+    upsert_blogs_batch(
+        [{"slug": f"blog-{i}", "title": f"Blog {i}", "embedding": row.tolist()} for i, row in enumerate(matrix)],
+        batch_size=1000,
+        show_progress=False
+    )
+    install_fakes(args, rng)
+
+    port = free_port()
+    server = start_server(port)
+    base_url = f"http://127.0.0.1:{port}"
+
+    mode = "inline on the event loop" if args.inline else "thread pool offload"
+    print("=" * 70)
+    print(f"ML API concurrency ({mode}, {args.clients} search clients, {args.vectors} vectors)")
+    print(f"Simulated latency: embed {args.embed_ms:g} ms, /stats {args.stats_ms:g} ms, "
+          f"Mongo reload {args.mongo_ms:g} ms")
+    print("=" * 70)
+
+    for mixed in (False, True):
+        latencies = asyncio.run(run_phase(base_url, args, mixed))
+        print("Search + health only" if not mixed else "Mixed load (+ /stats, /recommendations)")
+        for name, values in latencies.items():
+            if values or name in ("search", "health"):
+                report(name, values, args.seconds)
+        print()
+
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
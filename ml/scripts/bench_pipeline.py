@@ -0,0 +1,432 @@
+"""
+Offline benchmark of the train.py and update.py pipelines.
+Generates a reproducible synthetic corpus of markdown posts, swaps MongoDB
+for an in-memory blog stream, Gemini for the deterministic hashing embedder
+(EMBEDDING_PROVIDER=fake) and Pinecone for the local vector store, then
+times every stage of a full training run and of an incremental update
+(edits, new posts and unpublished posts) at each corpus size. Results are
+written to a JSON baseline; pass --baseline to compare a run against an
+earlier one.
+
+Usage:
+    python scripts/bench_pipeline.py
+    python scripts/bench_pipeline.py --sizes 100,1000,10000,100000
+    python scripts/bench_pipeline.py --baseline data/benchmarks/pipeline_baseline.json --output /tmp/run.json
+    python scripts/bench_pipeline.py --sizes 2000 --write-fixture /tmp/blogs.jsonl
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import zlib
+import random
+import hashlib
+import argparse
+import platform
+import tempfile
+import contextlib
+from pathlib import Path
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List
+
+# Offline settings before utils reads its config
+_tmp_dir = tempfile.TemporaryDirectory()
+os.environ["VECTOR_STORE_BACKEND"] = "local"
+os.environ["VECTOR_STORE_PATH"] = str(Path(_tmp_dir.name) / "vectors")
+os.environ["VECTOR_STORE_INDEX"] = "exact"
+os.environ["EMBEDDING_CACHE_PATH"] = "off"
+os.environ["METRICS_SUMMARY_DIR"] = "off"
+os.environ["EMBEDDING_PROVIDER"] = "fake"
+
+# Add parent directory (utils) and the scripts themselves to the path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+
+import train
+import update
+from utils.config import EMBEDDING_DIMENSION
+from utils.metrics import get_registry, STAGE_SECONDS
+from utils.vector_store import delete_all_vectors
+
+
+DEFAULT_OUTPUT = Path(__file__).parent.parent / "data" / "benchmarks" / "pipeline_baseline.json"
+
+
+# ============================================================
+# Synthetic corpus
+# ============================================================
+
+TOPICS = {
+    "python": "python generator decorator asyncio typing dataclass import module package venv",
+    "ml": "embedding vector model training dataset gradient inference tokenizer transformer",
+    "web": "nextjs react server component route handler fetch cache middleware tailwind",
+    "databases": "mongodb index query aggregation cursor shard replica transaction pinecone",
+    "devops": "docker container deploy render pipeline github actions logging monitoring",
+    "career": "interview resume portfolio mentor learning project feedback growth habit",
+}
+FILLER = (
+    "the a this that we you it when then because so and but with for into over "
+    "simple fast small large first next finally really quite often usually"
+).split()
+
+
+class SyntheticCorpus:
+    """
+    Deterministic markdown posts, regenerated on demand instead of held in memory.
+
+    Revision 0 is the corpus for the training run. The update revision edits
+    about 5% of posts, unpublishes 1% and appends 2% new ones.
+    """
+
+    def __init__(self, size: int, words_per_post: int, seed: int = 42):
+        self.size = size
+        self.words_per_post = words_per_post
+        self.seed = seed
+        self.topic_words = {name: words.split() for name, words in TOPICS.items()}
+
+    def _rng(self, i: int, revision: int) -> random.Random:
+        return random.Random(f"{self.seed}:{i}:{revision}")
+
+    def _sentence(self, rng: random.Random, words: List[str]) -> str:
+        tokens = [rng.choice(words) if rng.random() < 0.4 else rng.choice(FILLER)
+                  for _ in range(rng.randint(8, 18))]
+        return " ".join(tokens).capitalize() + rng.choice([".", ".", ".", "!", "?"])
+
+    def _paragraph(self, rng: random.Random, words: List[str]) -> str:
+        sentences = [self._sentence(rng, words) for _ in range(rng.randint(3, 6))]
+        roll = rng.random()
+        if roll < 0.15:
+            sentences.append(f"Run `{rng.choice(words)} --{rng.choice(FILLER)}` to try it.")
+        elif roll < 0.25:
+            sentences.append(f"See [the docs](https://example.com/{rng.choice(words)}) for more.")
+        elif roll < 0.3:
+            sentences.append(f"**Note:** {self._sentence(rng, words)}")
+        return " ".join(sentences)
+
+    def make_post(self, i: int, revision: int = 0) -> Dict[str, Any]:
+        rng = self._rng(i, revision)
+        topics = rng.sample(sorted(self.topic_words), k=2)
+        words = self.topic_words[topics[0]] * 2 + self.topic_words[topics[1]]
+
+        blocks = []
+        written = 0
+        while written < self.words_per_post:
+            roll = rng.random()
+            if roll < 0.15:
+                block = f"## {self._sentence(rng, words).rstrip('.!?')}"
+            elif roll < 0.25:
+                block = "\n".join(f"- {self._sentence(rng, words)}" for _ in range(rng.randint(2, 5)))
+            elif roll < 0.32:
+                block = (f"```python\ndef {rng.choice(words)}_{i}(x):\n"
+                         f"    return x * {rng.randint(2, 9)}\n```")
+            else:
+                block = self._paragraph(rng, words)
+            blocks.append(block)
+            written += len(block.split())
+
+        created = datetime(2024, 1, 1) + timedelta(hours=i)
+        return {
+            "slug": f"post-{i}",
+            "title": f"{self._sentence(rng, words).rstrip('.!?')} ({i})",
+            "description": self._sentence(rng, words),
+            "content": "\n\n".join(blocks),
+            "tags": topics + rng.sample(words, k=2),
+            "isStarred": rng.random() < 0.05,
+            "published": True,
+            "updatedAt": created + timedelta(days=revision),
+        }
+
+    def _update_revision(self, i: int) -> int:
+        """1 for posts edited in the update run, 0 otherwise."""
+        return 1 if zlib.crc32(f"edit:{self.seed}:{i}".encode()) % 100 < 5 else 0
+
+    def _unpublished(self, i: int) -> bool:
+        return zlib.crc32(f"drop:{self.seed}:{i}".encode()) % 100 == 0
+
+    def iter_posts(self, phase: str = "train") -> Iterator[Dict[str, Any]]:
+        """Posts as MongoDB would return them for the given run ("train" or "update")."""
+        if phase == "train":
+            for i in range(self.size):
+                yield self.make_post(i)
+            return
+
+        for i in range(self.size):
+            if not self._unpublished(i):
+                yield self.make_post(i, self._update_revision(i))
+        for i in range(self.size, self.size + max(1, self.size // 50)):
+            yield self.make_post(i)
+
+    def megabytes(self, phase: str = "train") -> float:
+        return sum(len(post["content"].encode("utf-8")) for post in self.iter_posts(phase)) / 1e6
+
+
+# ============================================================
+# Stage timing
+# ============================================================
+
+class StageTimer:
+    """Wraps module-level functions so every call adds to a named stage total."""
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self._patched = []
+
+    def wrap(self, module, name: str, stage: str, replacement: Callable = None):
+        original = getattr(module, name)
+        target = replacement or original
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return target(*args, **kwargs)
+            finally:
+                self.seconds[stage] = self.seconds.get(stage, 0.0) + time.perf_counter() - start
+                self.calls[stage] = self.calls.get(stage, 0) + 1
+
+        setattr(module, name, timed)
+        self._patched.append((module, name, original))
+
+    def restore(self):
+        for module, name, original in reversed(self._patched):
+            setattr(module, name, original)
+        self._patched = []
+
+
+def stage_report(seconds: Dict[str, float], blogs: int) -> Dict[str, Dict[str, float]]:
+    return {
+        stage: {
+            "seconds": round(elapsed, 4),
+            "per_blog_ms": round(elapsed / blogs * 1000, 4) if blogs else None,
+            "blogs_per_second": round(blogs / elapsed, 1) if elapsed > 0 else None,
+        }
+        for stage, elapsed in seconds.items()
+    }
+
+
+def registry_stage_seconds() -> Dict[str, float]:
+    """Per-stage totals recorded by utils.metrics (preprocess, embed, vector_upsert...)."""
+    return {
+        stage: summary["sum_seconds"]
+        for stage, summary in STAGE_SECONDS.summary().items()
+    }
+
+
+def digest(recommendations: Dict[str, Any]) -> str:
+    """Fingerprint of the recommendation output, to spot behaviour changes."""
+    payload = json.dumps(recommendations, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+
+# ============================================================
+# Pipeline runs
+# ============================================================
+
+def run_train(corpus: SyntheticCorpus, output_dir: Path, workers: int, top_k: int) -> Dict[str, Any]:
+    """Time train.py's stages on the training revision of the corpus."""
+    get_registry().reset()
+    train.iter_published_blogs = lambda **kwargs: corpus.iter_posts("train")
+
+    timer = StageTimer()
+    timer.wrap(train, "fetch_all_vectors", "load_vectors")
+    timer.wrap(train, "compute_recommendations_from_vectors", "similarity")
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        delete_all_vectors()
+        stream_start = time.perf_counter()
+        processed_count, embedded_blogs = train.stream_blogs_to_index(workers=workers)
+        timer.seconds["stream_to_index"] = time.perf_counter() - stream_start
+
+        slugs = [blog["slug"] for blog in embedded_blogs]
+        recommendations = train.compute_recommendations(slugs, top_k=top_k, embedded_blogs=embedded_blogs)
+
+        export_start = time.perf_counter()
+        train.export_recommendations(recommendations, output_dir)
+        timer.seconds["export"] = time.perf_counter() - export_start
+    total = time.perf_counter() - start
+    timer.restore()
+
+    breakdown = registry_stage_seconds()
+    return {
+        "blogs": processed_count,
+        "stages": stage_report({
+            "preprocess": breakdown.get("preprocess", 0.0),
+            "embed": breakdown.get("embed", 0.0),
+            "vector_upsert": breakdown.get("vector_upsert", 0.0),
+            **timer.seconds,
+        }, processed_count),
+        "total_seconds": round(total, 4),
+        "recommendations": len(recommendations),
+        "recommendations_digest": digest(recommendations),
+    }
+
+
+def run_update(corpus: SyntheticCorpus, output_dir: Path, top_k: int) -> Dict[str, Any]:
+    """Time update.py's incremental run on the update revision of the corpus."""
+    get_registry().reset()
+    update.iter_published_blogs = lambda **kwargs: corpus.iter_posts("update")
+
+    captured = {}
+
+    def export_to_output_dir(recommendations, _output_dir):
+        captured["recommendations"] = recommendations
+        return update_export(recommendations, output_dir)
+
+    update_export = update.export_recommendations
+    timer = StageTimer()
+    timer.wrap(update, "fetch_all_vectors", "load_vectors")
+    timer.wrap(update, "get_changed_blogs", "change_detection")
+    timer.wrap(update, "map_concurrently", "embed_changed")
+    timer.wrap(update, "upsert_blogs_batch", "vector_upsert")
+    timer.wrap(update, "delete_vectors", "delete_unpublished")
+    timer.wrap(update, "compute_recommendations_from_vectors", "similarity")
+    timer.wrap(update, "export_recommendations", "export", replacement=export_to_output_dir)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        update.incremental_update(top_k=top_k, workers=1)
+    total = time.perf_counter() - start
+    timer.restore()
+
+    recommendations = captured.get("recommendations", {})
+    breakdown = registry_stage_seconds()
+    changed = STAGE_SECONDS.summary().get("preprocess", {}).get("count", 0)
+    return {
+        "blogs": len(recommendations),
+        "changed_blogs": changed,
+        "stages": stage_report({
+            "preprocess": breakdown.get("preprocess", 0.0),
+            "embed": breakdown.get("embed", 0.0),
+            **timer.seconds,
+        }, len(recommendations)),
+        "total_seconds": round(total, 4),
+        "recommendations_digest": digest(recommendations),
+    }
+
+
+# ============================================================
+# Baseline comparison
+# ============================================================
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Stages that got slower than baseline by more than `tolerance` (fraction)."""
+    regressions = []
+    for size, runs in current["results"].items():
+        base_runs = baseline.get("results", {}).get(size)
+        if not base_runs:
+            continue
+
+        print(f"\n  {size} posts")
+        for run in ("train", "update"):
+            for stage, timing in runs[run]["stages"].items():
+                base = base_runs.get(run, {}).get("stages", {}).get(stage)
+                if not base or not base["seconds"]:
+                    continue
+                ratio = timing["seconds"] / base["seconds"]
+                flag = ""
+                # Ignore sub-10ms stages: timer noise dominates
+                if ratio > 1 + tolerance and timing["seconds"] > 0.01:
+                    flag = "  ❌ slower"
+                    regressions.append(f"{size}/{run}/{stage}: {ratio:.2f}x")
+                print(f"    {run:<7} {stage:<18} {base['seconds']:9.3f}s -> {timing['seconds']:9.3f}s "
+                      f"({ratio:5.2f}x){flag}")
+
+            if runs[run]["recommendations_digest"] != base_runs.get(run, {}).get("recommendations_digest"):
+                print(f"    ⚠️ {run} recommendations differ from the baseline")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the training and update pipelines")
+    parser.add_argument("--sizes", type=str, default="100,1000,10000",
+                        help="Comma-separated corpus sizes (e.g. 100,1000,10000,100000)")
+    parser.add_argument("--words", type=int, default=400, help="Approximate words per post")
+    parser.add_argument("--workers", type=int, default=1, help="Preprocessing processes for train")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT, help="Where to write the results")
+    parser.add_argument("--baseline", type=Path, default=None, help="Earlier results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown per stage before it counts as a regression")
+    parser.add_argument("--write-fixture", type=Path, default=None,
+                        help="Only write the first size's corpus as JSON lines for MONGODB_BACKEND=memory")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+
+    if args.write_fixture:
+        corpus = SyntheticCorpus(sizes[0], args.words, seed=args.seed)
+        with open(args.write_fixture, "w", encoding="utf-8") as f:
+            for post in corpus.iter_posts("train"):
+                f.write(json.dumps(post, default=str) + "\n")
+        print(f"✅ Wrote {sizes[0]} posts to {args.write_fixture} (MONGODB_FIXTURE_PATH)")
+        return
+
+    results = {}
+    for size in sizes:
+        corpus = SyntheticCorpus(size, args.words, seed=args.seed)
+        export_dir = Path(_tmp_dir.name) / f"export-{size}"
+
+        print("=" * 60)
+        print(f"{size} posts (~{args.words} words each)")
+        print("=" * 60)
+
+        train_result = run_train(corpus, export_dir, args.workers, args.top_k)
+        update_result = run_update(corpus, export_dir, args.top_k)
+        results[str(size)] = {
+            "corpus_mb": round(corpus.megabytes("train"), 2),
+            "train": train_result,
+            "update": update_result,
+        }
+
+        for run, result in (("train", train_result), ("update", update_result)):
+            print(f"  {run} ({result['blogs']} blogs, {result['total_seconds']:.2f}s total)")
+            for stage, timing in result["stages"].items():
+                print(f"    {stage:<18} {timing['seconds']:9.3f}s  {timing['per_blog_ms'] or 0:9.3f} ms/blog")
+        print()
+
+    report = {
+        "generated_at": datetime.now().isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "settings": {
+            "sizes": sizes,
+            "words_per_post": args.words,
+            "workers": args.workers,
+            "top_k": args.top_k,
+            "seed": args.seed,
+            "embedding_dimension": EMBEDDING_DIMENSION,
+        },
+        "results": results,
+    }
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print("\n" + "=" * 60)
+        print(f"Comparison with {args.baseline}")
+        print("=" * 60)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} stage(s) slower than baseline by more than "
+                  f"{args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\n✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
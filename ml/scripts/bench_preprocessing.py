@@ -0,0 +1,191 @@
+"""
+Micro-benchmark for text preprocessing.
+Checks that the precompiled cleaners and the fast markdown extractor produce
+byte-identical output to the original implementation, then compares their
+throughput on large synthetic markdown posts.
+
+Usage:
+    python scripts/bench_preprocessing.py
+    python scripts/bench_preprocessing.py --posts 50 --paragraphs 400
+"""
+
+import re
+import sys
+import random
+import argparse
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.preprocessing import (
+    remove_code_blocks,
+    clean_text,
+    markdown_to_plain_text,
+    extract_keywords_from_tags,
+    preprocess_blog,
+)
+
+
+# ============================================================
+# Reference implementation (before precompiled/fused cleaning)
+# ============================================================
+
+def legacy_remove_code_blocks(content: str) -> str:
+    content = re.sub(r'```[\s\S]*?```', ' [code block] ', content)
+    content = re.sub(r'`[^`]+`', ' [code] ', content)
+    return content
+
+
+def legacy_clean_text(text: str) -> str:
+    text = re.sub(r'http[s]?://\S+', '', text)
+    text = re.sub(r'\S+@\S+', '', text)
+    text = re.sub(r'[^\w\s.,!?;:\-\'"]', ' ', text)
+    text = re.sub(r'\s+', ' ', text)
+    text = text.strip()
+    return text
+
+
+def legacy_processed_text(blog: dict) -> str:
+    content = legacy_remove_code_blocks(blog.get('content', ''))
+    clean_content = legacy_clean_text(markdown_to_plain_text(content, extractor='bs4'))
+    tag_text = extract_keywords_from_tags(blog.get('tags', []))
+    combined_text = f"""
+    Title: {blog.get('title', '')}
+
+    Summary: {blog.get('description', '')}
+
+    {tag_text}
+
+    Content: {clean_content}
+    """.strip()
+    return legacy_clean_text(combined_text)
+
+
+# ============================================================
+# Synthetic corpus
+# ============================================================
+
+WORDS = (
+    "python vector embedding search latency cache index query model "
+    "token batch stream cursor pipeline markdown recommendation blog"
+).split()
+
+SNIPPETS = [
+    "See https://example.com/docs?q=1&x=2 for details.",
+    "Mail me at someone@example.org (or admin@host).",
+    "Use `pip install numpy` first.",
+    "```python\nprint('hello')\nfor i in range(3):\n    pass\n```",
+    "**Bold**, _italic_ and [a link](http://foo.bar/baz).",
+    "Émojis 🚀 and naïve café — “quotes” … ",
+    "xhttp://a@b a@http://x @start end@ ``` unterminated",
+    "| col | col |\n|-----|-----|\n| 1   | 2   |",
+    "> quote with tabs\t\tand a\xa0nbsp",
+]
+
+# Raw HTML and entities take the BeautifulSoup fallback of the fast extractor
+HTML_SNIPPETS = [
+    "> quote with <b>html</b> &amp; entities",
+]
+
+
+def make_post(rng: random.Random, paragraphs: int, raw_html: bool = False) -> dict:
+    """Build one large markdown post mixing prose, code, links and unicode."""
+    snippets = SNIPPETS + HTML_SNIPPETS if raw_html else SNIPPETS
+    parts = []
+    for i in range(paragraphs):
+        if i % 10 == 0:
+            parts.append(f"## Section {i // 10}")
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 60)))
+        parts.append(f"{sentence}. {rng.choice(snippets)}")
+    return {
+        'slug': f"post-{rng.randrange(10**6)}",
+        'title': f"{rng.choice(WORDS).title()} at scale: https://t.co/x",
+        'description': " ".join(rng.choice(WORDS) for _ in range(25)) + " user@mail.com",
+        'tags': rng.sample(WORDS, 4),
+        'content': "\n\n".join(parts),
+    }
+
+
+def fuzz_strings(rng: random.Random, count: int) -> list:
+    """Short random strings over an alphabet dense in regex edge cases."""
+    alphabet = list("ab :/@`.-_'\"\n\t éß🚀") + ["http", "https://", "```", "@@"]
+    return ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40))) for _ in range(count)]
+
+
+# ============================================================
+# Benchmark
+# ============================================================
+
+def time_it(fn, inputs, repeat: int) -> float:
+    """Best wall time over `repeat` runs of fn across all inputs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in inputs:
+            fn(item)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark text preprocessing")
+    parser.add_argument("--posts", type=int, default=20, help="Number of synthetic posts")
+    parser.add_argument("--paragraphs", type=int, default=300, help="Paragraphs per post")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    # One post in four embeds raw HTML
+    posts = [make_post(rng, args.paragraphs, raw_html=i % 4 == 0) for i in range(args.posts)]
+    raw_texts = [post['content'] for post in posts]
+    stripped_texts = [remove_code_blocks(text) for text in raw_texts]
+    plain_texts = [markdown_to_plain_text(text, extractor='bs4') for text in stripped_texts]
+    total_mb = sum(len(text.encode('utf-8')) for text in raw_texts) / 1e6
+
+    print("=" * 50)
+    print("Checking equivalence with the original cleaners")
+    print("=" * 50)
+
+    fuzz = fuzz_strings(rng, 20000)
+    for text in fuzz + raw_texts + plain_texts:
+        assert clean_text(text) == legacy_clean_text(text), repr(text)
+        assert remove_code_blocks(text) == legacy_remove_code_blocks(text), repr(text)
+
+    for text, plain in zip(stripped_texts, plain_texts):
+        assert markdown_to_plain_text(text, extractor='fast') == plain
+
+    for post in posts + [{'title': t, 'description': d, 'tags': [], 'content': c}
+                         for t, d, c in zip(fuzz[::3], fuzz[1::3], fuzz[2::3])][:2000]:
+        assert preprocess_blog(post)['processed_text'] == legacy_processed_text(post), post['slug'] if 'slug' in post else post
+
+    print(f"✅ Identical output on {len(fuzz)} fuzz strings and {len(posts)} posts\n")
+
+    print("=" * 50)
+    print(f"Throughput ({args.posts} posts, {total_mb:.1f} MB of markdown)")
+    print("=" * 50)
+
+    cases = [
+        ("remove_code_blocks", legacy_remove_code_blocks, remove_code_blocks, raw_texts),
+        ("markdown_to_plain", lambda text: markdown_to_plain_text(text, extractor='bs4'),
+         lambda text: markdown_to_plain_text(text, extractor='fast'), stripped_texts),
+        ("clean_text", legacy_clean_text, clean_text, plain_texts),
+    ]
+    for name, old_fn, new_fn, inputs in cases:
+        mb = sum(len(text.encode('utf-8')) for text in inputs) / 1e6
+        old_time = time_it(old_fn, inputs, args.repeat)
+        new_time = time_it(new_fn, inputs, args.repeat)
+        print(f"  {name:<20} {mb / old_time:8.1f} MB/s -> {mb / new_time:8.1f} MB/s "
+              f"({old_time / new_time:.2f}x)")
+
+    old_time = time_it(legacy_processed_text, posts, 1)
+    new_time = time_it(lambda post: preprocess_blog(post)['processed_text'], posts, 1)
+    print(f"  {'preprocess_blog':<20} {total_mb / old_time:8.1f} MB/s -> {total_mb / new_time:8.1f} MB/s "
+          f"({old_time / new_time:.2f}x)")
+    print()
+
+
+if __name__ == "__main__":
+    main()
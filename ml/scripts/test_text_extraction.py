@@ -0,0 +1,130 @@
+"""
+Equivalence tests for markdown -> plain text extraction.
+Checks that the fast element-tree extractor returns exactly what the
+markdown + BeautifulSoup path returns, on hand-written edge cases and on
+randomly generated markdown documents. Runs offline.
+
+Usage:
+    python scripts/test_text_extraction.py
+    python scripts/test_text_extraction.py --fuzz 20000
+"""
+
+import sys
+import random
+import argparse
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.preprocessing import (
+    markdown_to_plain_text,
+    extract_text_from_markdown,
+    remove_code_blocks,
+)
+
+
+EDGE_CASES = [
+    "",
+    "   \n\t ",
+    "plain",
+    "  leading and trailing  ",
+    "# Heading\n\nParagraph with *emphasis*, **strong** and `code`.",
+    "Setext\n======\n\nSub\n---",
+    "- one\n- two\n    - nested\n\n1. first\n2. second",
+    "> quote\n> > nested quote\n\ntext after",
+    "    indented code <tag> & \"quotes\"\n    second line\n\nafter",
+    "    &amp; &lt; &copy; &#169; already escaped in code",
+    "``code span with <html> & amp``",
+    "[link](http://example.com \"title\") and ![img](a.png \"alt\")",
+    "<http://autolink.com> and <me@example.com>",
+    "Inline <b>html</b> and <span>spans</span>",
+    "<div>\nblock html\n</div>\n\nafter",
+    "<script>alert(1)</script>\n\n<style>p{}</style>",
+    "<!-- comment -->\n\ntext",
+    "AT&T, R&D, 5 > 3 < 4, &copy; &#169; &#xA9; &AMP; &bogus;",
+    "Escapes: \\* \\_ \\` \\# \\\\ \\[",
+    "Hard  \nbreak and line\nwrap",
+    "***\n\n---\n\n___",
+    "Tab\tseparated\ttext\x0cform feed\r\nCRLF\rCR",
+    "Non-breaking\xa0space and em space　ideographic",
+    "Emoji 🚀 and naïve café — “quotes”",
+    "\x02stx\x03 control characters",
+    "[ref link][1]\n\n[1]: http://example.com",
+    "Trailing spaces   \n\n   ",
+    "1986\\. A great season.",
+    "* * *\n\n- [ ] task\n- [x] done",
+    "Text\n\n\n\n\nwith many blank lines\n\n\n",
+]
+
+FRAGMENTS = [
+    "word", "two words", "*em*", "**strong**", "_u_", "`code`", "&", "<", ">",
+    "[a](b)", "![i](j)", "a@b.c", "http://u.rl/x", "\xa0", "\t", "  ",
+    "\n", "\n\n", "\n    ", "\n> ", "\n- ", "\n1. ", "\n# ", "\n---\n", "\n===\n",
+    "\n```\n", "é", "🚀", "'", '"', "---", "***",
+]
+
+# Fragments that force the BeautifulSoup fallback (raw HTML, entities, escapes)
+FALLBACK_FRAGMENTS = ["&amp;", "&lt;", "&copy;", "<b>", "</b>", "<br>", "<http://x.y>", "\\*"]
+
+
+def random_markdown(rng: random.Random) -> str:
+    """Concatenate random fragments into a (usually odd) markdown document."""
+    return "".join(
+        rng.choice(FALLBACK_FRAGMENTS if rng.random() < 0.01 else FRAGMENTS)
+        for _ in range(rng.randint(0, 60))
+    )
+
+
+def check(text: str, stats: dict):
+    """Compare both extractors for one document in both strip modes."""
+    for strip in (False, True):
+        try:
+            expected = markdown_to_plain_text(text, extractor='bs4', strip=strip)
+        except Exception as e:
+            # Some markdown versions emit HTML that html.parser rejects;
+            # the fast path must then fail the same way
+            expected = type(e)
+        try:
+            actual = markdown_to_plain_text(text, extractor='fast', strip=strip)
+        except Exception as e:
+            actual = type(e)
+        assert actual == expected, (
+            f"Mismatch (strip={strip}) for {text!r}:\n"
+            f"  fast: {actual!r}\n  bs4:  {expected!r}"
+        )
+
+    stats["checked"] += 1
+    if isinstance(expected, str) and extract_text_from_markdown(text, fallback=False) is None:
+        stats["fallback"] += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test markdown text extraction")
+    parser.add_argument("--fuzz", type=int, default=2000, help="Random documents to check")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    stats = {"checked": 0, "fallback": 0}
+
+    print("=" * 50)
+    print("Edge cases")
+    print("=" * 50)
+    for text in EDGE_CASES:
+        check(text, stats)
+        check(remove_code_blocks(text), stats)
+    print(f"✅ {stats['checked']} edge cases match\n")
+
+    print("=" * 50)
+    print(f"Random documents (seed {args.seed})")
+    print("=" * 50)
+    for _ in range(args.fuzz):
+        check(random_markdown(rng), stats)
+    print(f"✅ {stats['checked']} documents match")
+    print(f"   Fell back to BeautifulSoup for {stats['fallback']} "
+          f"({stats['fallback'] / stats['checked']:.1%}) documents with raw HTML or entities\n")
+
+
+if __name__ == "__main__":
+    main()
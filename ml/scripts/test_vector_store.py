@@ -0,0 +1,138 @@
+"""
+Offline test for the local vector store backend.
+Runs the utils.vector_store API against a LocalVectorIndex in a temporary
+directory and checks query results against brute-force numpy cosine search,
+including after deletes and after reopening the index from disk.
+
+Usage:
+    python scripts/test_vector_store.py
+    python scripts/test_vector_store.py --vectors 5000 --queries 200
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+# Point the vector store at a throwaway local index before utils reads its config
+_tmp_dir = tempfile.TemporaryDirectory()
+os.environ["VECTOR_STORE_BACKEND"] = "local"
+os.environ["VECTOR_STORE_PATH"] = _tmp_dir.name
+os.environ["VECTOR_STORE_INDEX"] = "exact"  # HNSW is checked by bench_ann.py
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from utils.config import EMBEDDING_DIMENSION, VECTOR_STORE_PATH
+from utils.local_index import LocalVectorIndex
+from utils.vector_store import (
+    get_index,
+    get_index_stats,
+    get_existing_slugs,
+    upsert_blogs_batch,
+    find_similar_blogs,
+    find_similar_by_embedding,
+    fetch_all_vectors,
+    delete_vectors,
+)
+
+
+def exact_top_k(ids, matrix, query, k):
+    """Reference cosine top-k with plain numpy."""
+    normalized = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+    scores = normalized @ (query / np.linalg.norm(query))
+    order = np.argsort(-scores, kind="stable")[:k]
+    return [ids[i] for i in order], scores[order]
+
+
+def check_queries(ids, matrix, queries, k, index=None):
+    """Compare find_similar_by_embedding with the reference on every query."""
+    for query in queries:
+        expected_ids, expected_scores = exact_top_k(ids, matrix, query, k)
+        if index is None:
+            results = find_similar_by_embedding(query.tolist(), top_k=k)
+            actual_ids = [r["slug"] for r in results]
+            actual_scores = np.array([r["score"] for r in results])
+        else:
+            matches = index.query(vector=query.tolist(), top_k=k).matches
+            actual_ids = [m.id for m in matches]
+            actual_scores = np.array([m.score for m in matches])
+        assert actual_ids == expected_ids, (actual_ids, expected_ids)
+        assert np.allclose(actual_scores, expected_scores, atol=1e-5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test the local vector store backend")
+    parser.add_argument("--vectors", type=int, default=2000, help="Number of stored vectors")
+    parser.add_argument("--queries", type=int, default=100, help="Number of test queries")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    ids = [f"blog-{i}" for i in range(args.vectors)]
+    matrix = rng.normal(size=(args.vectors, EMBEDDING_DIMENSION)).astype(np.float32)
+    queries = rng.normal(size=(args.queries, EMBEDDING_DIMENSION)).astype(np.float32)
+
+    print("=" * 50)
+    print(f"Local vector store ({VECTOR_STORE_PATH})")
+    print("=" * 50)
+
+    blogs = [
+        {"slug": slug, "title": f"Title {slug}", "tags": ["test"], "embedding": row.tolist()}
+        for slug, row in zip(ids, matrix)
+    ]
+    upsert_blogs_batch(blogs, batch_size=500, show_progress=False)
+    stats = get_index_stats()
+    assert stats["total_vectors"] == args.vectors, stats
+    assert sorted(get_existing_slugs()) == sorted(ids)
+    print(f"✅ Upserted {stats['total_vectors']} vectors")
+
+    check_queries(ids, matrix, queries, k=10)
+    similar = find_similar_blogs(ids[0], top_k=3)
+    assert ids[0] not in [s["slug"] for s in similar] and len(similar) == 3
+    assert similar[0]["metadata"]["title"].startswith("Title ")
+    print(f"✅ {args.queries} queries match exact numpy search")
+
+    # Overwrite a vector in place and delete a slice
+    edited = ids[1]
+    matrix[1] = rng.normal(size=EMBEDDING_DIMENSION)
+    upsert_blogs_batch([{"slug": edited, "title": "Edited", "embedding": matrix[1].tolist()}],
+                       show_progress=False)
+    removed = ids[::7]
+    delete_vectors(removed)
+    keep = [i for i, slug in enumerate(ids) if slug not in set(removed)]
+    ids = [ids[i] for i in keep]
+    matrix = matrix[keep]
+
+    check_queries(ids, matrix, queries, k=10)
+    fetched_ids, fetched_matrix, metadata = fetch_all_vectors()
+    order = [fetched_ids.index(slug) for slug in ids]
+    assert np.allclose(fetched_matrix[order], matrix)
+    assert metadata[edited]["title"] == "Edited"
+    print(f"✅ Updates and {len(removed)} deletes reflected in results")
+
+    # A fresh index over the same directory sees the persisted state
+    get_index().flush()
+    reopened = LocalVectorIndex(VECTOR_STORE_PATH, EMBEDDING_DIMENSION)
+    check_queries(ids, matrix, queries, k=10, index=reopened)
+    print("✅ Reopened index returns the same results\n")
+
+    print("=" * 50)
+    print("Query latency")
+    print("=" * 50)
+    index = get_index()
+    for k in (3, 10, 100):
+        start = time.perf_counter()
+        for query in queries:
+            index.query(vector=query.tolist(), top_k=k)
+        elapsed = (time.perf_counter() - start) / len(queries)
+        print(f"  top_k={k:<4} {elapsed * 1000:.3f} ms/query over {len(ids)} vectors")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ Run this script monthly (or when new blogs are added) to update recommendations.
 Usage:
     python scripts/train.py
     python scripts/train.py --force  # Force re-index all blogs
+    python scripts/train.py --workers 4  # Preprocessing processes (default: all cores)
 """
 
 import sys
@@ -12,20 +13,24 @@ import json
 import argparse
 from pathlib import Path
 from datetime import datetime
+import numpy as np
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from utils.database import fetch_published_blogs, get_blog_count
-from utils.preprocessing import preprocess_blogs
+from utils.database import iter_published_blogs, mongo_connection
+from utils.preprocessing import iter_preprocessed_blogs, iter_chunks
 from utils.embeddings import embed_preprocessed_blogs
 from utils.vector_store import (
     get_index_stats,
     upsert_blogs_batch,
-    find_similar_blogs,
+    fetch_all_vectors,
     delete_all_vectors,
+    close_index,
 )
-from utils.config import PINECONE_INDEX_NAME
+from utils.similarity import overlay_vectors, compute_recommendations_from_vectors
+from utils.metrics import write_metrics_summary
+from utils.config import PINECONE_INDEX_NAME, EMBEDDING_BATCH_SIZE, PREPROCESS_WORKERS
 
 
 def log(message: str, level: str = "INFO"):
@@ -35,73 +40,80 @@ def log(message: str, level: str = "INFO"):
     print(f"[{timestamp}] {prefix} {message}")
 
 
-def fetch_and_preprocess_blogs():
-    """Fetch blogs from MongoDB and preprocess them."""
-    log("Fetching blogs from MongoDB...")
-    blogs = fetch_published_blogs()
-    log(f"Found {len(blogs)} published blogs", "SUCCESS")
-    
-    if not blogs:
-        return []
-    
-    log("Preprocessing blog content...")
-    processed = preprocess_blogs(blogs)
-    log(f"Preprocessed {len(processed)} blogs", "SUCCESS")
-    
-    return processed
-
-
-def generate_all_embeddings(processed_blogs):
-    """Generate embeddings for all preprocessed blogs."""
-    log(f"Generating embeddings for {len(processed_blogs)} blogs...")
-    log("(This may take a few minutes due to API rate limits)")
-    
-    embedded = embed_preprocessed_blogs(processed_blogs, show_progress=True)
-    log(f"Generated embeddings for {len(embedded)} blogs", "SUCCESS")
-    
-    return embedded
-
-
-def update_pinecone_index(embedded_blogs, force: bool = False):
-    """Upsert blog embeddings to Pinecone."""
+def prepare_index(force: bool = False):
+    """Delete existing vectors before re-indexing when --force is set."""
     stats = get_index_stats()
     current_count = stats['total_vectors']
+    log(f"Pinecone index has {current_count} vectors")
     
     if force and current_count > 0:
         log("Force flag set. Deleting existing vectors...")
         delete_all_vectors()
         log("Existing vectors deleted", "SUCCESS")
-    
-    log(f"Upserting {len(embedded_blogs)} blogs to Pinecone...")
-    count = upsert_blogs_batch(embedded_blogs, show_progress=True)
-    log(f"Upserted {count} blogs to Pinecone", "SUCCESS")
-    
-    return count
 
 
-def compute_recommendations(slugs: list, top_k: int = 3):
-    """Compute recommendations for all blogs."""
-    log(f"Computing recommendations for {len(slugs)} blogs...")
+def stream_blogs_to_index(
+    chunk_size: int = EMBEDDING_BATCH_SIZE,
+    workers: int = PREPROCESS_WORKERS
+):
+    """
+    Fetch, preprocess, embed and upsert blogs as one streaming pipeline.
+    Only a few chunks of full blog documents are held in memory at a time,
+    and the first upserts happen before the last blogs are read.
+    Preprocessing is spread over `workers` processes.
+    
+    Returns:
+        Tuple of (number of blogs preprocessed, slim embedded blogs with
+        slug/title/description/embedding for the recommendation step)
+    """
+    log("Streaming blogs from MongoDB...")
+    log("(This may take a few minutes due to API rate limits)")
     
-    recommendations = {}
+    processed_count = 0
+    embedded_blogs = []
     
-    for i, slug in enumerate(slugs):
-        similar = find_similar_blogs(slug, top_k=top_k)
+    blogs = iter_published_blogs()
+    processed = iter_preprocessed_blogs(blogs, workers=workers)
+    for chunk in iter_chunks(processed, chunk_size):
+        processed_count += len(chunk)
+        
+        embedded = embed_preprocessed_blogs(chunk, show_progress=False)
+        upsert_blogs_batch(embedded, show_progress=False)
         
-        # Store simplified recommendation data
-        recommendations[slug] = [
+        # Keep only what the recommendation step needs
+        embedded_blogs.extend(
             {
-                "slug": rec["slug"],
-                "title": rec["metadata"].get("title", ""),
-                "description": rec["metadata"].get("description", ""),
-                "score": round(rec["score"], 4)
+                "slug": blog["slug"],
+                "title": blog["title"],
+                "description": blog["description"],
+                "embedding": np.asarray(blog["embedding"], dtype=np.float32),
             }
-            for rec in similar
-        ]
-        
-        # Progress indicator
-        if (i + 1) % 5 == 0 or i == len(slugs) - 1:
-            log(f"  Computed {i + 1}/{len(slugs)} recommendations")
+            for blog in embedded
+        )
+        log(f"  Embedded and upserted {len(embedded_blogs)}/{processed_count} blogs")
+    
+    log(f"Preprocessed {processed_count} blogs", "SUCCESS")
+    log(f"Upserted {len(embedded_blogs)} blogs to Pinecone", "SUCCESS")
+    
+    return processed_count, embedded_blogs
+
+
+def compute_recommendations(slugs: list, top_k: int = 3, embedded_blogs: list = None):
+    """
+    Compute recommendations for all blogs.
+    Loads every vector once and scores all pairs in memory.
+    """
+    log(f"Computing recommendations for {len(slugs)} blogs...")
+    
+    ids, vectors, metadata = fetch_all_vectors()
+    log(f"  Loaded {len(ids)} vectors from Pinecone")
+    
+    # Include this run's embeddings even if Pinecone hasn't indexed them yet
+    ids, vectors, metadata = overlay_vectors(ids, vectors, metadata, embedded_blogs or [])
+    
+    recommendations = compute_recommendations_from_vectors(
+        ids, vectors, metadata, slugs=slugs, top_k=top_k
+    )
     
     log(f"Computed recommendations for {len(recommendations)} blogs", "SUCCESS")
     return recommendations
@@ -154,6 +166,12 @@ def main():
     parser = argparse.ArgumentParser(description="Train blog recommendation system")
     parser.add_argument("--force", action="store_true", help="Force re-index all blogs")
     parser.add_argument("--top-k", type=int, default=3, help="Number of recommendations per blog")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=PREPROCESS_WORKERS,
+        help=f"Preprocessing worker processes (default: {PREPROCESS_WORKERS}, all cores)"
+    )
     args = parser.parse_args()
     
     print("\n" + "=" * 60)
@@ -161,61 +179,66 @@ def main():
     print("=" * 60 + "\n")
     
     start_time = datetime.now()
+    status = "failed"
     
     try:
-        # Step 1: Fetch and preprocess
-        print("\n📥 Step 1: Fetch & Preprocess")
-        print("-" * 40)
-        processed_blogs = fetch_and_preprocess_blogs()
-        
-        if not processed_blogs:
-            log("No blogs found. Exiting.", "WARNING")
-            return
-        
-        # Step 2: Generate embeddings
-        print("\n🧠 Step 2: Generate Embeddings")
-        print("-" * 40)
-        embedded_blogs = generate_all_embeddings(processed_blogs)
-        
-        # Step 3: Update Pinecone
-        print("\n📤 Step 3: Update Pinecone Index")
-        print("-" * 40)
-        update_pinecone_index(embedded_blogs, force=args.force)
-        
-        # Step 4: Compute recommendations
-        print("\n🔍 Step 4: Compute Recommendations")
-        print("-" * 40)
-        slugs = [blog['slug'] for blog in embedded_blogs]
-        recommendations = compute_recommendations(slugs, top_k=args.top_k)
-        
-        # Step 5: Export
-        print("\n💾 Step 5: Export Recommendations")
-        print("-" * 40)
-        output_dir = Path(__file__).parent.parent / "data"
-        export_recommendations(recommendations, output_dir)
-        
-        # Print samples
-        print_sample_recommendations(recommendations)
-        
-        # Summary
-        end_time = datetime.now()
-        duration = (end_time - start_time).total_seconds()
-        
-        print("\n" + "=" * 60)
-        print("✅ Training Complete!")
-        print("=" * 60)
-        print(f"   Blogs processed: {len(processed_blogs)}")
-        print(f"   Vectors in Pinecone: {get_index_stats()['total_vectors']}")
-        print(f"   Recommendations computed: {len(recommendations)}")
-        print(f"   Time taken: {duration:.1f} seconds")
-        print(f"\n   Output: ml/data/recommendations.json")
-        print("=" * 60 + "\n")
-        
+        # One pooled MongoDB connection for the whole run
+        with mongo_connection():
+            # Step 1: Prepare index
+            print("\n🗂️ Step 1: Prepare Pinecone Index")
+            print("-" * 40)
+            prepare_index(force=args.force)
+            
+            # Step 2: Fetch, preprocess, embed and upsert (streamed)
+            print("\n🧠 Step 2: Stream Blogs → Embeddings → Pinecone")
+            print("-" * 40)
+            processed_count, embedded_blogs = stream_blogs_to_index(workers=args.workers)
+            
+            if processed_count == 0:
+                log("No blogs found. Exiting.", "WARNING")
+                status = "success"
+                return
+            
+            # Step 3: Compute recommendations
+            print("\n🔍 Step 3: Compute Recommendations")
+            print("-" * 40)
+            slugs = [blog['slug'] for blog in embedded_blogs]
+            recommendations = compute_recommendations(slugs, top_k=args.top_k, embedded_blogs=embedded_blogs)
+            
+            # Step 4: Export
+            print("\n💾 Step 4: Export Recommendations")
+            print("-" * 40)
+            output_dir = Path(__file__).parent.parent / "data"
+            export_recommendations(recommendations, output_dir)
+            
+            # Print samples
+            print_sample_recommendations(recommendations)
+            
+            # Summary
+            end_time = datetime.now()
+            duration = (end_time - start_time).total_seconds()
+            
+            print("\n" + "=" * 60)
+            print("✅ Training Complete!")
+            print("=" * 60)
+            print(f"   Blogs processed: {processed_count}")
+            print(f"   Vectors in Pinecone: {get_index_stats()['total_vectors']}")
+            print(f"   Recommendations computed: {len(recommendations)}")
+            print(f"   Time taken: {duration:.1f} seconds")
+            print(f"\n   Output: ml/data/recommendations.json")
+            print("=" * 60 + "\n")
+            status = "success"
+            
     except Exception as e:
         log(f"Training failed: {e}", "ERROR")
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    finally:
+        close_index()
+        metrics_path = write_metrics_summary("train", start_time, status=status, extra={"args": vars(args)})
+        if metrics_path:
+            log(f"Metrics summary: {metrics_path}")
 
 
 if __name__ == "__main__":
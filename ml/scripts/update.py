@@ -1,9 +1,11 @@
 """
 Incremental update script for the blog recommendation system.
-Only generates embeddings for NEW blogs, not existing ones.
+Only generates embeddings for NEW or EDITED blogs (and blogs embedded by
+an older preprocessing version), and removes vectors for blogs that are
+no longer published.
 
 Usage:
-    python scripts/update.py              # Process only new blogs
+    python scripts/update.py              # Process only new/edited blogs
     python scripts/update.py --force      # Force re-index all blogs
     python scripts/update.py --slug my-blog-slug  # Process specific blog
 """
@@ -13,24 +15,46 @@ import json
 import argparse
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Any, Set
+from typing import List, Dict, Any, Tuple
+import numpy as np
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from utils.database import fetch_published_blogs
-from utils.preprocessing import preprocess_blog, preprocess_blogs
-from utils.embeddings import generate_embedding, embed_preprocessed_blogs
+from utils.database import iter_published_blogs, mongo_connection
+from utils.preprocessing import (
+    preprocess_blog,
+    preprocess_blogs,
+    compute_content_hash,
+    format_updated_at,
+    has_outdated_preprocessing,
+    iter_chunks,
+)
+from utils.embeddings import embed_documents, embed_preprocessed_blogs
+from utils.chunking import get_embedding_layout, has_outdated_embedding
 from utils.vector_store import (
     get_index_stats,
-    get_existing_slugs,
     check_slug_exists,
     upsert_blog_embedding,
     upsert_blogs_batch,
-    find_similar_blogs,
+    fetch_all_vectors,
+    delete_vectors,
     delete_all_vectors,
+    close_index,
+)
+from utils.concurrency import map_concurrently
+from utils.metrics import write_metrics_summary
+from utils.similarity import (
+    overlay_vectors,
+    remove_vectors,
+    compute_recommendations_from_vectors,
+)
+from utils.config import (
+    PINECONE_INDEX_NAME,
+    EMBEDDING_DIMENSION,
+    EMBEDDING_MAX_WORKERS,
+    MONGODB_BATCH_SIZE,
 )
-from utils.config import PINECONE_INDEX_NAME
 
 
 def log(message: str, level: str = "INFO"):
@@ -40,27 +64,72 @@ def log(message: str, level: str = "INFO"):
     print(f"[{timestamp}] {prefix} {message}")
 
 
-def get_new_blogs(all_blogs: List[Dict], existing_slugs: Set[str]) -> List[Dict]:
+def blog_has_changed(blog: Dict, stored_metadata: Dict) -> bool:
+    """
+    Compare a MongoDB blog against the metadata stored with its vector.
+    Vectors written before fingerprints were stored count as changed.
+    """
+    stored_hash = stored_metadata.get('content_hash')
+    if stored_hash != compute_content_hash(blog):
+        return True
+    
+    stored_updated_at = stored_metadata.get('updated_at')
+    current_updated_at = format_updated_at(blog.get('updatedAt'))
+    if stored_updated_at and current_updated_at:
+        return stored_updated_at != current_updated_at
+    
+    return False
+
+
+def get_changed_blogs(
+    all_blogs: List[Dict],
+    indexed_metadata: Dict[str, Dict]
+) -> Tuple[List[Dict], List[Dict], List[Dict]]:
     """
-    Filter blogs to get only those not in Pinecone.
+    Split blogs into those missing from Pinecone, those edited since they
+    were embedded, and unchanged ones embedded by an older preprocessing
+    pipeline or a different embedding layout (chunked vs single).
     
     Args:
         all_blogs: All blogs from MongoDB
-        existing_slugs: Set of slugs already in Pinecone
+        indexed_metadata: Dict of slug -> vector metadata already in Pinecone
     
     Returns:
-        List of new blogs that need embedding
+        Tuple of (new blogs, edited blogs, outdated blogs) that need embedding
     """
     new_blogs = []
+    edited_blogs = []
+    outdated_blogs = []
     for blog in all_blogs:
-        if blog['slug'] not in existing_slugs:
+        stored = indexed_metadata.get(blog['slug'])
+        if stored is None:
             new_blogs.append(blog)
-    return new_blogs
+        elif blog_has_changed(blog, stored):
+            edited_blogs.append(blog)
+        elif has_outdated_preprocessing(stored) or has_outdated_embedding(stored):
+            outdated_blogs.append(blog)
+    return new_blogs, edited_blogs, outdated_blogs
+
+
+def get_removed_slugs(published_slugs: List[str], indexed_slugs: List[str]) -> List[str]:
+    """
+    Find vectors whose blogs are no longer published.
+    
+    Args:
+        published_slugs: Slugs of all published blogs in MongoDB
+        indexed_slugs: Slugs currently in Pinecone
+    
+    Returns:
+        Slugs to delete from the index
+    """
+    published = set(published_slugs)
+    return [slug for slug in indexed_slugs if slug not in published]
 
 
 def process_single_blog(blog: Dict) -> Dict:
     """
     Process a single blog: preprocess and generate embedding.
+    Unchanged text is served from the on-disk embedding cache.
     
     Args:
         blog: Raw blog document from MongoDB
@@ -71,49 +140,54 @@ def process_single_blog(blog: Dict) -> Dict:
     # Preprocess
     processed = preprocess_blog(blog)
     
-    # Generate embedding
-    embedding = generate_embedding(processed['processed_text'])
+    # Generate embedding (chunked and pooled when enabled)
+    document = embed_documents([processed['processed_text']])[0]
     
     # Return with embedding attached
     return {
         **processed,
-        'embedding': embedding
+        'embedding': document['embedding'],
+        'chunks': document['chunks'],
+        'embedding_layout': get_embedding_layout(),
     }
 
 
-def update_recommendations_for_all(all_slugs: List[str], top_k: int = 3) -> Dict:
+def update_recommendations_for_all(
+    all_slugs: List[str],
+    top_k: int = 3,
+    embedded_blogs: List[Dict] = None,
+    index_state: Tuple = None,
+    removed_slugs: List[str] = None
+) -> Dict:
     """
     Recompute recommendations for ALL blogs.
     This is necessary because new blogs might be similar to existing ones.
+    All vectors are loaded once and scored in memory.
     
     Args:
         all_slugs: All blog slugs in the system
         top_k: Number of recommendations per blog
+        embedded_blogs: Blogs embedded in this run (used even if Pinecone
+                        hasn't indexed them yet)
+        index_state: (ids, vectors, metadata) already loaded from Pinecone,
+                     to avoid fetching every vector twice
+        removed_slugs: Slugs deleted in this run (never recommended)
     
     Returns:
         Dict of slug -> recommendations
     """
     log(f"Recomputing recommendations for {len(all_slugs)} blogs...")
     
-    recommendations = {}
+    if index_state is None:
+        index_state = fetch_all_vectors()
+        log(f"  Loaded {len(index_state[0])} vectors from Pinecone")
     
-    for i, slug in enumerate(all_slugs):
-        similar = find_similar_blogs(slug, top_k=top_k)
-        
-        recommendations[slug] = [
-            {
-                "slug": rec["slug"],
-                "title": rec["metadata"].get("title", ""),
-                "description": rec["metadata"].get("description", ""),
-                "score": round(rec["score"], 4)
-            }
-            for rec in similar
-        ]
-        
-        if (i + 1) % 10 == 0 or i == len(all_slugs) - 1:
-            log(f"  Computed {i + 1}/{len(all_slugs)} recommendations")
+    ids, vectors, metadata = remove_vectors(*index_state, removed_slugs or [])
+    ids, vectors, metadata = overlay_vectors(ids, vectors, metadata, embedded_blogs or [])
     
-    return recommendations
+    return compute_recommendations_from_vectors(
+        ids, vectors, metadata, slugs=all_slugs, top_k=top_k
+    )
 
 
 def export_recommendations(recommendations: dict, output_dir: Path):
@@ -142,7 +216,12 @@ def export_recommendations(recommendations: dict, output_dir: Path):
     return output_file
 
 
-def incremental_update(force: bool = False, specific_slug: str = None, top_k: int = 3):
+def incremental_update(
+    force: bool = False,
+    specific_slug: str = None,
+    top_k: int = 3,
+    workers: int = EMBEDDING_MAX_WORKERS
+):
     """
     Main incremental update pipeline.
     
@@ -150,6 +229,7 @@ def incremental_update(force: bool = False, specific_slug: str = None, top_k: in
         force: If True, reprocess ALL blogs
         specific_slug: If provided, only process this specific blog
         top_k: Number of recommendations per blog
+        workers: Maximum number of blogs embedded concurrently
     """
     start_time = datetime.now()
     
@@ -168,55 +248,87 @@ def incremental_update(force: bool = False, specific_slug: str = None, top_k: in
         if stats['total_vectors'] > 0:
             delete_all_vectors()
             log("Deleted all existing vectors", "SUCCESS")
-        existing_slugs = set()
+        index_state = ([], np.zeros((0, EMBEDDING_DIMENSION), dtype=np.float32), {})
     else:
-        # Get existing slugs from Pinecone
-        log("Fetching existing blog slugs from Pinecone...")
-        existing_slugs = set(get_existing_slugs())
-        log(f"Found {len(existing_slugs)} existing blogs in index")
+        # Load existing vectors and their change-detection metadata
+        log("Fetching existing vectors from Pinecone...")
+        index_state = fetch_all_vectors()
+        log(f"Found {len(index_state[0])} existing blogs in index")
+    
+    # Step 2 + 3: Stream blogs from MongoDB, keeping full documents only
+    # for the blogs that actually need embedding
+    log("Scanning blogs from MongoDB...")
+    all_slugs = []
+    new_blogs = []
+    edited_blogs = []
+    outdated_blogs = []
     
-    # Step 2: Fetch all blogs from MongoDB
-    log("Fetching blogs from MongoDB...")
-    all_blogs = fetch_published_blogs()
-    log(f"Found {len(all_blogs)} published blogs in MongoDB", "SUCCESS")
+    for chunk in iter_chunks(iter_published_blogs(), MONGODB_BATCH_SIZE):
+        all_slugs.extend(blog['slug'] for blog in chunk)
+        
+        if specific_slug:
+            new_blogs.extend(b for b in chunk if b['slug'] == specific_slug)
+        else:
+            chunk_new, chunk_edited, chunk_outdated = get_changed_blogs(chunk, index_state[2])
+            new_blogs.extend(chunk_new)
+            edited_blogs.extend(chunk_edited)
+            outdated_blogs.extend(chunk_outdated)
+    
+    log(f"Found {len(all_slugs)} published blogs in MongoDB", "SUCCESS")
     
-    if not all_blogs:
+    if not all_slugs:
         log("No blogs found. Exiting.", "WARNING")
         return
     
-    # Step 3: Determine which blogs to process
     if specific_slug:
         # Process specific blog only
-        blogs_to_process = [b for b in all_blogs if b['slug'] == specific_slug]
+        blogs_to_process = new_blogs
         if not blogs_to_process:
             log(f"Blog '{specific_slug}' not found in MongoDB", "ERROR")
             return
         log(f"Processing specific blog: {specific_slug}")
+        removed_slugs = []
     else:
-        # Get new blogs only
-        blogs_to_process = get_new_blogs(all_blogs, existing_slugs)
-    
-    # Step 4: Process new blogs
+        # Get new, edited and outdated blogs only
+        blogs_to_process = new_blogs + edited_blogs + outdated_blogs
+        removed_slugs = get_removed_slugs(all_slugs, index_state[0])
+        log(f"{len(new_blogs)} new, {len(edited_blogs)} edited, "
+            f"{len(outdated_blogs)} from an older preprocessing version or layout, "
+            f"{len(removed_slugs)} unpublished")
+    
+    # Step 4: Process new and edited blogs
     new_count = len(blogs_to_process)
+    embedded_blogs = []
     
     if new_count == 0:
-        log("No new blogs to process!", "SUCCESS")
-        log("Recommendations are already up to date.")
+        log("No new or edited blogs to process!", "SUCCESS")
     else:
-        log(f"Found {new_count} new blog(s) to embed", "NEW")
+        log(f"Found {new_count} blog(s) to embed", "NEW")
         
         print("\n" + "-" * 40)
-        print("🧠 Generating Embeddings (New Blogs Only)")
+        print("🧠 Generating Embeddings (New & Edited Blogs Only)")
         print("-" * 40)
         
-        # Preprocess and embed new blogs
-        embedded_blogs = []
-        for i, blog in enumerate(blogs_to_process):
-            log(f"[{i+1}/{new_count}] Processing: {blog['title'][:50]}...")
-            embedded = process_single_blog(blog)
-            embedded_blogs.append(embedded)
+        # Preprocess and embed blogs concurrently (paced by the shared rate limiter)
+        finished = 0
+        
+        def report(i, blog, error):
+            nonlocal finished
+            finished += 1
+            if error is None:
+                log(f"[{finished}/{new_count}] Embedded: {blog['title'][:50]}...")
+            else:
+                log(f"[{finished}/{new_count}] Failed: {blog['slug']}: {error}", "ERROR")
+        
+        results, failures = map_concurrently(
+            process_single_blog, blogs_to_process, max_workers=workers, on_done=report
+        )
+        embedded_blogs = [result for result in results if result is not None]
         
         log(f"Generated {len(embedded_blogs)} new embeddings", "SUCCESS")
+        if failures:
+            log(f"{len(failures)} blog(s) failed to embed: "
+                f"{', '.join(f['item']['slug'] for f in failures)}", "WARNING")
         
         # Upsert to Pinecone
         print("\n" + "-" * 40)
@@ -224,7 +336,12 @@ def incremental_update(force: bool = False, specific_slug: str = None, top_k: in
         print("-" * 40)
         
         upsert_blogs_batch(embedded_blogs, show_progress=True)
-        log(f"Upserted {len(embedded_blogs)} new blogs to Pinecone", "SUCCESS")
+        log(f"Upserted {len(embedded_blogs)} blogs to Pinecone", "SUCCESS")
+    
+    # Remove vectors for blogs that are no longer published
+    if removed_slugs:
+        delete_vectors(removed_slugs)
+        log(f"Deleted {len(removed_slugs)} unpublished blog(s) from Pinecone", "SUCCESS")
     
     # Step 5: Recompute recommendations for ALL blogs
     # This is necessary because new blogs might be similar to existing ones
@@ -232,8 +349,13 @@ def incremental_update(force: bool = False, specific_slug: str = None, top_k: in
     print("🔍 Updating Recommendations")
     print("-" * 40)
     
-    all_slugs = [blog['slug'] for blog in all_blogs]
-    recommendations = update_recommendations_for_all(all_slugs, top_k=top_k)
+    recommendations = update_recommendations_for_all(
+        all_slugs,
+        top_k=top_k,
+        embedded_blogs=embedded_blogs,
+        index_state=index_state,
+        removed_slugs=removed_slugs
+    )
     
     # Step 6: Export
     print("\n" + "-" * 40)
@@ -252,7 +374,8 @@ def incremental_update(force: bool = False, specific_slug: str = None, top_k: in
     print("\n" + "=" * 60)
     print("✅ Incremental Update Complete!")
     print("=" * 60)
-    print(f"   New blogs processed: {new_count}")
+    print(f"   New/edited blogs processed: {new_count}")
+    print(f"   Unpublished blogs removed: {len(removed_slugs)}")
     print(f"   Total vectors in Pinecone: {final_stats['total_vectors']}")
     print(f"   Recommendations updated: {len(recommendations)}")
     print(f"   Time taken: {duration:.1f} seconds")
@@ -268,7 +391,7 @@ def main():
     parser.add_argument(
         "--force", 
         action="store_true", 
-        help="Force re-index ALL blogs (not just new ones)"
+        help="Force re-index ALL blogs (not just new or edited ones)"
     )
     parser.add_argument(
         "--slug",
@@ -282,20 +405,37 @@ def main():
         default=3,
         help="Number of recommendations per blog (default: 3)"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=EMBEDDING_MAX_WORKERS,
+        help=f"Concurrent embedding requests (default: {EMBEDDING_MAX_WORKERS})"
+    )
     
     args = parser.parse_args()
     
+    started_at = datetime.now()
+    status = "failed"
     try:
-        incremental_update(
-            force=args.force,
-            specific_slug=args.slug,
-            top_k=args.top_k
-        )
+        # One pooled MongoDB connection for the whole run
+        with mongo_connection():
+            incremental_update(
+                force=args.force,
+                specific_slug=args.slug,
+                top_k=args.top_k,
+                workers=args.workers
+            )
+        status = "success"
     except Exception as e:
         log(f"Update failed: {e}", "ERROR")
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    finally:
+        close_index()
+        metrics_path = write_metrics_summary("update", started_at, status=status, extra={"args": vars(args)})
+        if metrics_path:
+            log(f"Metrics summary: {metrics_path}")
 
 
 if __name__ == "__main__":
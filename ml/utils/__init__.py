@@ -7,23 +7,43 @@ from .config import (
     get_pinecone_api_key,
     get_google_api_key,
     PINECONE_INDEX_NAME,
+    EMBEDDING_MODEL,
     EMBEDDING_DIMENSION,
 )
 
 from .database import (
+    get_mongo_client,
+    close_mongo_client,
+    mongo_connection,
+    iter_published_blogs,
     fetch_published_blogs,
     fetch_blog_by_slug,
     get_blog_count,
 )
 
 from .preprocessing import (
+    PREPROCESSING_VERSION,
     preprocess_blog,
     preprocess_blogs,
+    iter_preprocessed_blogs,
+    iter_chunks,
     markdown_to_plain_text,
+    extract_text_from_markdown,
     clean_text,
+    compute_content_hash,
+    has_outdated_preprocessing,
+)
+
+from .chunking import (
+    split_into_chunks,
+    pool_chunk_vectors,
+    get_embedding_layout,
+    has_outdated_embedding,
 )
 
 from .embeddings import (
+    embed_texts,
+    embed_documents,
     generate_embedding,
     generate_query_embedding,
     generate_embeddings_batch,
@@ -31,7 +51,48 @@ from .embeddings import (
     compute_similarity,
 )
 
+from .embedding_cache import (
+    EmbeddingCache,
+    get_embedding_cache,
+)
+
+from .query_cache import (
+    LRUCache,
+    QueryEmbeddingCache,
+    SearchResultCache,
+    get_query_cache,
+    get_search_cache,
+    normalize_query,
+)
+
+from .concurrency import map_concurrently
+
+from .metrics import (
+    MetricsRegistry,
+    get_registry,
+    time_stage,
+    write_metrics_summary,
+)
+
+from .job_queue import (
+    JobQueue,
+    JobWorkerPool,
+    get_job_queue,
+)
+
+from .offline import (
+    HashingEmbedder,
+    InMemoryMongoClient,
+    get_fake_embedder,
+    get_memory_mongo_client,
+    load_blog_fixture,
+)
+
+from .local_index import LocalVectorIndex
+from .ann_index import HnswIndex
+
 from .vector_store import (
+    VectorIndex,
     get_index,
     upsert_blog_embedding,
     upsert_blogs_batch,
@@ -40,4 +101,17 @@ from .vector_store import (
     get_index_stats,
     get_existing_slugs,
     check_slug_exists,
+    fetch_all_vectors,
+    upsert_chunk_vectors,
+    delete_chunk_vectors,
+    find_similar_passages,
+)
+
+from .similarity import (
+    normalize_rows,
+    top_k_neighbours,
+    overlay_vectors,
+    compute_recommendations_from_vectors,
+    insert_neighbour,
+    merge_new_neighbour,
 )
@@ -0,0 +1,175 @@
+"""
+Approximate nearest-neighbour (HNSW) index for the local vector store.
+Wraps hnswlib (optional dependency: pip install hnswlib) behind string IDs,
+with incremental inserts, deletes and on-disk persistence next to the
+namespace's .npy matrix.
+"""
+
+import os
+import json
+from pathlib import Path
+from typing import List, Dict, Optional
+import numpy as np
+from utils.config import HNSW_M, HNSW_EF_CONSTRUCTION, HNSW_EF_SEARCH
+
+
+def _import_hnswlib():
+    """Import hnswlib with a helpful message when it isn't installed."""
+    try:
+        import hnswlib
+    except ImportError as e:
+        raise ImportError(
+            "VECTOR_STORE_INDEX=hnsw needs the optional hnswlib package: pip install hnswlib"
+        ) from e
+    return hnswlib
+
+
+class HnswIndex:
+    """
+    HNSW graph over one namespace, keyed by vector ID.
+
+    Every insert gets a fresh integer label; deleted labels are marked and
+    their slots reused by later inserts, so the graph never needs a rebuild.
+    """
+
+    _INITIAL_CAPACITY = 1024
+
+    def __init__(
+        self,
+        path_stem: Path,
+        dimension: int,
+        m: int = HNSW_M,
+        ef_construction: int = HNSW_EF_CONSTRUCTION,
+        ef_search: int = HNSW_EF_SEARCH
+    ):
+        self.graph_path = Path(f"{path_stem}.hnsw")
+        self.labels_path = Path(f"{path_stem}.hnsw.json")
+        self.dimension = dimension
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+
+        self._hnswlib = _import_hnswlib()
+        self.labels: Dict[str, int] = {}
+        self.ids_by_label: Dict[int, str] = {}
+        self.next_label = 0
+        self.graph = None
+
+    def _new_graph(self, capacity: int):
+        graph = self._hnswlib.Index(space="cosine", dim=self.dimension)
+        graph.init_index(
+            max_elements=capacity,
+            ef_construction=self.ef_construction,
+            M=self.m,
+            allow_replace_deleted=True
+        )
+        return graph
+
+    def load_or_build(self, ids: List[str], matrix: np.ndarray, fingerprint: Optional[str] = None):
+        """
+        Load the persisted graph if it was saved for exactly these vectors
+        (same fingerprint, see _Namespace.fingerprint) with the same M and
+        ef_construction, otherwise rebuild it from the vectors.
+        """
+        if self.graph_path.exists() and self.labels_path.exists():
+            with open(self.labels_path, encoding="utf-8") as f:
+                saved = json.load(f)
+
+            if (
+                saved.get("m") == self.m
+                and saved.get("ef_construction") == self.ef_construction
+                and saved.get("fingerprint") == fingerprint
+                and set(saved["labels"]) == set(ids)
+            ):
+                self.labels = saved["labels"]
+                self.ids_by_label = {label: vector_id for vector_id, label in self.labels.items()}
+                self.next_label = saved["next_label"]
+                self.graph = self._hnswlib.Index(space="cosine", dim=self.dimension)
+                self.graph.load_index(
+                    str(self.graph_path),
+                    max_elements=saved["capacity"],
+                    allow_replace_deleted=True
+                )
+                return
+
+        self.labels, self.ids_by_label, self.next_label = {}, {}, 0
+        self.graph = self._new_graph(max(self._INITIAL_CAPACITY, len(ids)))
+        self.add(ids, matrix)
+
+    def _ensure_capacity(self, extra: int):
+        needed = self.graph.element_count + extra
+        if needed > self.graph.get_max_elements():
+            self.graph.resize_index(max(needed, 2 * self.graph.get_max_elements()))
+
+    def add(self, ids: List[str], vectors: np.ndarray):
+        """Insert new vectors and update existing ones in place."""
+        if not ids:
+            return
+
+        labels = []
+        fresh = 0
+        for vector_id in ids:
+            label = self.labels.get(vector_id)
+            if label is None:
+                label = self.next_label
+                self.next_label += 1
+                self.labels[vector_id] = label
+                self.ids_by_label[label] = vector_id
+                fresh += 1
+            labels.append(label)
+
+        self._ensure_capacity(fresh)
+        self.graph.add_items(
+            np.asarray(vectors, dtype=np.float32),
+            np.asarray(labels, dtype=np.int64),
+            replace_deleted=True
+        )
+
+    def remove(self, ids: List[str]):
+        """Mark vectors deleted; their slots are reused by later inserts."""
+        for vector_id in ids:
+            label = self.labels.pop(vector_id, None)
+            if label is not None:
+                del self.ids_by_label[label]
+                self.graph.mark_deleted(label)
+
+    def clear(self):
+        self.labels, self.ids_by_label, self.next_label = {}, {}, 0
+        self.graph = self._new_graph(self._INITIAL_CAPACITY)
+
+    def search(self, query: np.ndarray, k: int, ef: Optional[int] = None) -> List[str]:
+        """
+        IDs of the (approximately) k nearest vectors, best first.
+
+        Args:
+            query: Query vector
+            k: Number of neighbours (at most the number of stored vectors)
+            ef: Search breadth; larger is slower but more accurate
+        """
+        k = min(k, len(self.labels))
+        if k <= 0:
+            return []
+
+        # ef must be at least k for hnswlib to return k results
+        self.graph.set_ef(max(ef or self.ef_search, k))
+        labels, _ = self.graph.knn_query(np.asarray(query, dtype=np.float32), k=k)
+        return [self.ids_by_label[int(label)] for label in labels[0]]
+
+    def save(self, fingerprint: Optional[str] = None):
+        """Persist the graph and the ID -> label map, tagged with the vectors' fingerprint."""
+        self.graph_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = Path(f"{self.graph_path}.tmp")
+        self.graph.save_index(str(tmp_path))
+        os.replace(tmp_path, self.graph_path)
+
+        tmp_path = Path(f"{self.labels_path}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "m": self.m,
+                "ef_construction": self.ef_construction,
+                "fingerprint": fingerprint,
+                "capacity": self.graph.get_max_elements(),
+                "next_label": self.next_label,
+                "labels": self.labels,
+            }, f)
+        os.replace(tmp_path, self.labels_path)
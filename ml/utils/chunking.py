@@ -0,0 +1,120 @@
+"""
+Token-bounded chunking for long documents.
+Splits processed text into overlapping windows that each stay within the
+embedding model's input limit, and pools the window vectors back into a
+single document vector.
+"""
+
+import re
+from typing import List, Dict, Any, Sequence
+import numpy as np
+from utils.config import (
+    EMBEDDING_CHUNKING,
+    EMBEDDING_CHUNK_TOKENS,
+    EMBEDDING_CHUNK_OVERLAP,
+)
+
+
+# Words and individual punctuation marks. Subword tokenizers produce at
+# least this many tokens, so the chunk size carries a safety margin.
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def get_embedding_layout() -> str:
+    """
+    Describe how document vectors are currently built.
+    Stored in Pinecone metadata so vectors built another way get re-embedded.
+    """
+    if EMBEDDING_CHUNKING:
+        return f"chunked:{EMBEDDING_CHUNK_TOKENS}:{EMBEDDING_CHUNK_OVERLAP}"
+    return "single"
+
+
+def has_outdated_embedding(metadata: Dict[str, Any]) -> bool:
+    """
+    Check whether a stored vector was built with a different embedding layout.
+    Vectors written before layouts were recorded are single-text embeddings.
+    """
+    return metadata.get("embedding_layout", "single") != get_embedding_layout()
+
+
+def count_tokens(text: str) -> int:
+    """Approximate token count (words plus punctuation marks)."""
+    return sum(1 for _ in _TOKEN_RE.finditer(text))
+
+
+def split_into_chunks(
+    text: str,
+    max_tokens: int = EMBEDDING_CHUNK_TOKENS,
+    overlap: int = EMBEDDING_CHUNK_OVERLAP
+) -> List[Dict[str, Any]]:
+    """
+    Split text into overlapping windows of at most max_tokens tokens.
+    
+    Args:
+        text: Text to split (usually a blog's processed_text)
+        max_tokens: Maximum tokens per chunk
+        overlap: Tokens shared by consecutive chunks
+    
+    Returns:
+        List of {text, tokens} dicts in document order. Short texts come
+        back as a single chunk holding the whole text.
+    """
+    spans = [match.span() for match in _TOKEN_RE.finditer(text)]
+    if len(spans) <= max_tokens:
+        return [{"text": text, "tokens": len(spans)}]
+    
+    step = max(1, max_tokens - max(0, overlap))
+    chunks = []
+    
+    for start in range(0, len(spans), step):
+        window = spans[start:start + max_tokens]
+        chunks.append({
+            "text": text[window[0][0]:window[-1][1]],
+            "tokens": len(window),
+        })
+        if start + max_tokens >= len(spans):
+            break
+    
+    return chunks
+
+
+def pool_chunk_vectors(
+    vectors: Sequence[Sequence[float]],
+    weights: Sequence[float]
+) -> List[float]:
+    """
+    Length-weighted mean of L2-normalized chunk vectors, re-normalized.
+    
+    Args:
+        vectors: One embedding per chunk
+        weights: Chunk lengths (token counts)
+    
+    Returns:
+        Document embedding vector
+    """
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix = matrix / norms
+    
+    weights = np.asarray(weights, dtype=np.float32)
+    if weights.sum() <= 0:
+        weights = np.ones(len(matrix), dtype=np.float32)
+    
+    pooled = weights @ matrix / weights.sum()
+    norm = np.linalg.norm(pooled)
+    if norm > 0:
+        pooled = pooled / norm
+    
+    return pooled.tolist()
+
+
+# For testing
+if __name__ == "__main__":
+    sample = " ".join(f"word{i}." for i in range(1200))
+    chunks = split_into_chunks(sample, max_tokens=512, overlap=64)
+    
+    print(f"✅ {count_tokens(sample)} tokens -> {len(chunks)} chunks")
+    for i, chunk in enumerate(chunks):
+        print(f"   {i}: {chunk['tokens']} tokens, starts with '{chunk['text'][:20]}'")
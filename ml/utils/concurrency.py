@@ -0,0 +1,53 @@
+"""
+Bounded concurrency helpers for I/O-bound pipeline stages.
+Runs embedding (and similar) calls on a small thread pool while the shared
+rate limiter in utils.embeddings keeps the total request rate in check.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from utils.config import EMBEDDING_MAX_WORKERS
+
+
+def map_concurrently(
+    fn: Callable[[Any], Any],
+    items: Sequence[Any],
+    max_workers: int = EMBEDDING_MAX_WORKERS,
+    on_done: Optional[Callable[[int, Any, Optional[Exception]], None]] = None
+) -> Tuple[List[Any], List[Dict[str, Any]]]:
+    """
+    Apply fn to every item with at most max_workers calls in flight.
+
+    Args:
+        fn: Function to call for each item
+        items: Inputs to process
+        max_workers: Maximum number of concurrent calls
+        on_done: Optional callback(index, item, error) fired as each call finishes
+
+    Returns:
+        Tuple of (results in input order with None for failures,
+        list of {index, item, error} for each failed item)
+    """
+    results: List[Any] = [None] * len(items)
+    failures: List[Dict[str, Any]] = []
+
+    if not items:
+        return results, failures
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {executor.submit(fn, item): i for i, item in enumerate(items)}
+
+        for future in as_completed(futures):
+            i = futures[future]
+            error = future.exception()
+
+            if error is None:
+                results[i] = future.result()
+            else:
+                failures.append({"index": i, "item": items[i], "error": error})
+
+            if on_done is not None:
+                on_done(i, items[i], error)
+
+    failures.sort(key=lambda failure: failure["index"])
+    return results, failures
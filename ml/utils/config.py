@@ -41,9 +41,92 @@ def get_google_api_key() -> str:
 PINECONE_INDEX_NAME = "portfolio-blog-embedding"
 PINECONE_ENVIRONMENT = os.getenv('PINECONE_ENVIRONMENT', 'gcp-starter')
 
+# Vector store backend: "pinecone", "local" (exact kNN over a memory-mapped
+# .npy matrix in VECTOR_STORE_PATH, no network needed) or "memory" (the same
+# index held in RAM only, for tests and load tests)
+VECTOR_STORE_BACKEND = os.getenv('VECTOR_STORE_BACKEND', 'pinecone').lower()
+VECTOR_STORE_PATH = os.getenv(
+    'VECTOR_STORE_PATH',
+    str(Path(__file__).parent.parent / 'data' / 'vector_store')
+)
+# Local store search: "exact" (brute force) or "hnsw" (approximate, needs hnswlib)
+VECTOR_STORE_INDEX = os.getenv('VECTOR_STORE_INDEX', 'exact').lower()
+# Local store: save the sidecar (and HNSW graph) at most this often while upserting; 0 = every call
+VECTOR_STORE_FLUSH_SECONDS = float(os.getenv('VECTOR_STORE_FLUSH_SECONDS', '5'))
+HNSW_M = int(os.getenv('HNSW_M', '16'))  # Graph links per node (memory vs recall)
+HNSW_EF_CONSTRUCTION = int(os.getenv('HNSW_EF_CONSTRUCTION', '200'))  # Build-time search breadth
+HNSW_EF_SEARCH = int(os.getenv('HNSW_EF_SEARCH', '64'))  # Query-time search breadth (latency vs recall)
+
 # Embedding configuration
+EMBEDDING_MODEL = "gemini-embedding-001"
 EMBEDDING_DIMENSION = 768  # Google's text-embedding model dimension
+EMBEDDING_MAX_CHARS = 25000  # Safe per-text limit for token constraints
+EMBEDDING_BATCH_SIZE = 100  # Max texts per embed_content request
+EMBEDDING_REQUESTS_PER_MINUTE = float(os.getenv('EMBEDDING_REQUESTS_PER_MINUTE', '100'))
+EMBEDDING_MAX_RETRIES = int(os.getenv('EMBEDDING_MAX_RETRIES', '5'))
+EMBEDDING_MAX_WORKERS = int(os.getenv('EMBEDDING_MAX_WORKERS', '4'))  # Concurrent embedding calls
+# Embedding provider: "google" (Gemini API) or "fake" (deterministic feature
+# hashing, no API key; see utils/offline.py)
+EMBEDDING_PROVIDER = os.getenv('EMBEDDING_PROVIDER', 'google').lower()
+FAKE_EMBEDDING_SEED = os.getenv('FAKE_EMBEDDING_SEED', '0')
+
+# Chunked embeddings: split long texts into overlapping token windows and
+# mean-pool the window vectors (weighted by length) into one document vector
+EMBEDDING_CHUNKING = os.getenv('EMBEDDING_CHUNKING', 'off').lower() in ('1', 'true', 'on', 'yes')
+EMBEDDING_CHUNK_TOKENS = int(os.getenv('EMBEDDING_CHUNK_TOKENS', '512'))
+EMBEDDING_CHUNK_OVERLAP = int(os.getenv('EMBEDDING_CHUNK_OVERLAP', '64'))
+# Pinecone namespace for per-chunk vectors (passage search); empty disables
+EMBEDDING_CHUNK_NAMESPACE = os.getenv('EMBEDDING_CHUNK_NAMESPACE', '')
+
+# On-disk embedding cache (set to "off" to disable)
+EMBEDDING_CACHE_PATH = os.getenv(
+    'EMBEDDING_CACHE_PATH',
+    str(Path(__file__).parent.parent / 'data' / 'embedding_cache.sqlite')
+)
+
+# In-memory LRU cache of search query embeddings (API /search)
+QUERY_CACHE_SIZE = int(os.getenv('QUERY_CACHE_SIZE', '1024'))
+QUERY_CACHE_TTL_SECONDS = float(os.getenv('QUERY_CACHE_TTL_SECONDS', '3600'))
+# Also keep query embeddings in the on-disk embedding cache across restarts
+QUERY_CACHE_PERSIST = os.getenv('QUERY_CACHE_PERSIST', 'off').lower() in ('1', 'true', 'on', 'yes')
+# Ranked /search results, dropped whenever the API writes to the index
+SEARCH_CACHE_SIZE = int(os.getenv('SEARCH_CACHE_SIZE', '512'))
+SEARCH_CACHE_TTL_SECONDS = float(os.getenv('SEARCH_CACHE_TTL_SECONDS', '300'))
+
+# Durable background jobs for the API (/embed-blog)
+JOB_QUEUE_PATH = os.getenv(
+    'JOB_QUEUE_PATH',
+    str(Path(__file__).parent.parent / 'data' / 'jobs.sqlite')
+)
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '1'))  # Worker threads per process; processes may share JOB_QUEUE_PATH
+JOB_LEASE_SECONDS = float(os.getenv('JOB_LEASE_SECONDS', '60'))  # A running job whose process stops renewing this is re-queued
+JOB_RETENTION_DAYS = float(os.getenv('JOB_RETENTION_DAYS', '7'))  # Finished jobs older than this are pruned
+
+# Metrics summary JSON written at the end of each script run ("off" disables)
+METRICS_SUMMARY_DIR = os.getenv(
+    'METRICS_SUMMARY_DIR',
+    str(Path(__file__).parent.parent / 'data' / 'metrics')
+)
+
+# Markdown -> text extraction: "fast" (element tree walk) or "bs4" (HTML + BeautifulSoup)
+TEXT_EXTRACTOR = os.getenv('TEXT_EXTRACTOR', 'fast').lower()
+
+# Parallel preprocessing for full rebuilds (worker processes, blogs per task)
+PREPROCESS_WORKERS = int(os.getenv('PREPROCESS_WORKERS', str(os.cpu_count() or 1)))
+PREPROCESS_CHUNK_SIZE = int(os.getenv('PREPROCESS_CHUNK_SIZE', '8'))
 
 # MongoDB configuration
+# Backend: "mongodb" (MONGODB_URI) or "memory" (in-process collections,
+# optionally seeded with blog documents from a JSON file)
+MONGODB_BACKEND = os.getenv('MONGODB_BACKEND', 'mongodb').lower()
+MONGODB_FIXTURE_PATH = os.getenv('MONGODB_FIXTURE_PATH', '')
 MONGODB_DATABASE = "portfolio-blogs"
 MONGODB_COLLECTION = "blogs"
+MONGODB_BATCH_SIZE = int(os.getenv('MONGODB_BATCH_SIZE', '100'))  # Documents per cursor batch
+
+# MongoDB connection pool (shared client, see utils/database.py)
+MONGODB_MAX_POOL_SIZE = int(os.getenv('MONGODB_MAX_POOL_SIZE', '10'))
+MONGODB_MIN_POOL_SIZE = int(os.getenv('MONGODB_MIN_POOL_SIZE', '0'))
+MONGODB_CONNECT_TIMEOUT_MS = int(os.getenv('MONGODB_CONNECT_TIMEOUT_MS', '10000'))
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGODB_SERVER_SELECTION_TIMEOUT_MS', '10000'))
+MONGODB_SOCKET_TIMEOUT_MS = int(os.getenv('MONGODB_SOCKET_TIMEOUT_MS', '60000'))
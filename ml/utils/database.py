@@ -1,59 +1,142 @@
 """
 Database utilities for fetching blogs from MongoDB.
+All helpers share one lazily created, pooled MongoClient per process
+(or the in-memory client from utils.offline when MONGODB_BACKEND=memory).
 """
 
-from typing import List, Dict, Any, Optional
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Iterator
 from pymongo import MongoClient
-from utils.config import get_mongodb_uri, MONGODB_DATABASE, MONGODB_COLLECTION
+from utils.config import (
+    get_mongodb_uri,
+    MONGODB_BACKEND,
+    MONGODB_DATABASE,
+    MONGODB_COLLECTION,
+    MONGODB_BATCH_SIZE,
+    MONGODB_MAX_POOL_SIZE,
+    MONGODB_MIN_POOL_SIZE,
+    MONGODB_CONNECT_TIMEOUT_MS,
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+    MONGODB_SOCKET_TIMEOUT_MS,
+)
+from utils.offline import get_memory_mongo_client
+
+
+# Fields needed to preprocess and embed a blog
+BLOG_PROJECTION = {
+    '_id': 0,
+    'title': 1,
+    'slug': 1,
+    'description': 1,
+    'content': 1,
+    'tags': 1,
+    'isStarred': 1,
+    'published': 1,
+    'createdAt': 1,
+    'updatedAt': 1,
+}
+
+
+_client: Optional[MongoClient] = None
+_client_lock = threading.Lock()
+
+
+def create_mongo_client() -> MongoClient:
+    """Create a new pooled MongoDB client using the configured limits."""
+    if MONGODB_BACKEND == "memory":
+        return get_memory_mongo_client()
+    
+    return MongoClient(
+        get_mongodb_uri(),
+        maxPoolSize=MONGODB_MAX_POOL_SIZE,
+        minPoolSize=MONGODB_MIN_POOL_SIZE,
+        connectTimeoutMS=MONGODB_CONNECT_TIMEOUT_MS,
+        serverSelectionTimeoutMS=MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        socketTimeoutMS=MONGODB_SOCKET_TIMEOUT_MS,
+    )
 
 
 def get_mongo_client() -> MongoClient:
-    """Create and return a MongoDB client."""
-    uri = get_mongodb_uri()
-    return MongoClient(uri)
+    """
+    Get the process-wide MongoDB client, creating it on first use.
+    The client is thread-safe and pools connections, so callers should
+    not close it; use close_mongo_client() or mongo_connection() instead.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = create_mongo_client()
+    return _client
+
+
+def close_mongo_client():
+    """Close the shared client. The next call to get_mongo_client() reconnects."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+@contextmanager
+def mongo_connection() -> Iterator[MongoClient]:
+    """
+    Hold one shared connection for the duration of a script run.
+    
+    Usage:
+        with mongo_connection() as client:
+            blogs = fetch_published_blogs(client)
+    """
+    try:
+        yield get_mongo_client()
+    finally:
+        close_mongo_client()
+
+
+def iter_published_blogs(
+    client: Optional[MongoClient] = None,
+    batch_size: int = MONGODB_BATCH_SIZE,
+    projection: Optional[Dict[str, Any]] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream published blogs from MongoDB one cursor batch at a time.
+    Only `batch_size` documents are held in memory, so downstream stages
+    can start before the last document is read.
+    
+    Args:
+        client: Optional MongoDB client. Defaults to the shared client.
+        batch_size: Documents per cursor round trip
+        projection: Fields to return (defaults to BLOG_PROJECTION)
+    
+    Yields:
+        Blog documents
+    """
+    client = client or get_mongo_client()
+    collection = client[MONGODB_DATABASE][MONGODB_COLLECTION]
+    
+    cursor = collection.find(
+        {'published': True},
+        projection or BLOG_PROJECTION
+    ).batch_size(batch_size)
+    
+    with cursor:
+        for blog in cursor:
+            yield blog
 
 
 def fetch_published_blogs(client: Optional[MongoClient] = None) -> List[Dict[str, Any]]:
     """
     Fetch all published blogs from MongoDB.
+    Prefer iter_published_blogs for large corpora.
     
     Args:
-        client: Optional MongoDB client. If not provided, creates a new one.
+        client: Optional MongoDB client. Defaults to the shared client.
     
     Returns:
         List of blog documents
     """
-    should_close = False
-    if client is None:
-        client = get_mongo_client()
-        should_close = True
-    
-    try:
-        db = client[MONGODB_DATABASE]
-        collection = db[MONGODB_COLLECTION]
-        
-        # Fetch only published blogs with required fields
-        blogs = list(collection.find(
-            {'published': True},
-            {
-                '_id': 0,
-                'title': 1,
-                'slug': 1,
-                'description': 1,
-                'content': 1,
-                'tags': 1,
-                'isStarred': 1,
-                'published': 1,
-                'createdAt': 1,
-                'updatedAt': 1,
-            }
-        ))
-        
-        return blogs
-    
-    finally:
-        if should_close:
-            client.close()
+    return list(iter_published_blogs(client=client))
 
 
 def fetch_blog_by_slug(slug: str, client: Optional[MongoClient] = None) -> Optional[Dict[str, Any]]:
@@ -62,30 +145,18 @@ def fetch_blog_by_slug(slug: str, client: Optional[MongoClient] = None) -> Optio
     
     Args:
         slug: The blog's unique slug
-        client: Optional MongoDB client
+        client: Optional MongoDB client. Defaults to the shared client.
     
     Returns:
         Blog document or None if not found
     """
-    should_close = False
-    if client is None:
-        client = get_mongo_client()
-        should_close = True
-    
-    try:
-        db = client[MONGODB_DATABASE]
-        collection = db[MONGODB_COLLECTION]
-        
-        blog = collection.find_one(
-            {'slug': slug, 'published': True},
-            {'_id': 0}
-        )
-        
-        return blog
+    client = client or get_mongo_client()
+    collection = client[MONGODB_DATABASE][MONGODB_COLLECTION]
     
-    finally:
-        if should_close:
-            client.close()
+    return collection.find_one(
+        {'slug': slug, 'published': True},
+        {'_id': 0}
+    )
 
 
 def get_blog_count(client: Optional[MongoClient] = None) -> int:
@@ -93,25 +164,15 @@ def get_blog_count(client: Optional[MongoClient] = None) -> int:
     Get the count of published blogs.
     
     Args:
-        client: Optional MongoDB client
+        client: Optional MongoDB client. Defaults to the shared client.
     
     Returns:
         Number of published blogs
     """
-    should_close = False
-    if client is None:
-        client = get_mongo_client()
-        should_close = True
+    client = client or get_mongo_client()
+    collection = client[MONGODB_DATABASE][MONGODB_COLLECTION]
     
-    try:
-        db = client[MONGODB_DATABASE]
-        collection = db[MONGODB_COLLECTION]
-        
-        return collection.count_documents({'published': True})
-    
-    finally:
-        if should_close:
-            client.close()
+    return collection.count_documents({'published': True})
 
 
 # For testing
@@ -119,15 +180,16 @@ if __name__ == "__main__":
     print("Testing MongoDB connection...")
     
     try:
-        count = get_blog_count()
-        print(f"✅ Connected! Found {count} published blogs")
-        
-        blogs = fetch_published_blogs()
-        for blog in blogs[:3]:  # Show first 3
-            print(f"  - {blog.get('title', 'Untitled')} ({blog.get('slug', 'no-slug')})")
-        
-        if count > 3:
-            print(f"  ... and {count - 3} more")
+        with mongo_connection() as client:
+            count = get_blog_count(client)
+            print(f"✅ Connected! Found {count} published blogs")
+            
+            blogs = fetch_published_blogs(client)
+            for blog in blogs[:3]:  # Show first 3
+                print(f"  - {blog.get('title', 'Untitled')} ({blog.get('slug', 'no-slug')})")
+            
+            if count > 3:
+                print(f"  ... and {count - 3} more")
             
     except Exception as e:
         print(f"❌ Error: {e}")
@@ -0,0 +1,115 @@
+"""
+Persistent on-disk embedding cache.
+Stores vectors in SQLite keyed by a hash of the embedded text and the
+model settings, so unchanged blogs never hit the embedding API twice.
+"""
+
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Dict, Optional
+import numpy as np
+from utils.config import EMBEDDING_CACHE_PATH
+
+
+class EmbeddingCache:
+    """SQLite-backed map of content hash -> float32 embedding vector."""
+
+    # SQLite limits the number of bound parameters per statement
+    _LOOKUP_CHUNK = 500
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                task_type TEXT NOT NULL,
+                dimension INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(text: str, model: str, task_type: str, dimension: int) -> str:
+        """Hash the exact text sent to the API together with the model settings."""
+        digest = hashlib.sha256()
+        for part in (model, task_type, str(dimension), text):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Look up many keys at once. Missing keys are simply absent."""
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+
+        with self._lock:
+            for i in range(0, len(unique_keys), self._LOOKUP_CHUNK):
+                chunk = unique_keys[i:i + self._LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    chunk
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+
+        return found
+
+    def put_many(
+        self,
+        vectors: Dict[str, List[float]],
+        model: str,
+        task_type: str,
+        dimension: int
+    ):
+        """Store many vectors in one transaction."""
+        rows = [
+            (key, model, task_type, dimension, np.asarray(vector, dtype=np.float32).tobytes())
+            for key, vector in vectors.items()
+        ]
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, task_type, dimension, vector) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Get the process-wide embedding cache.
+    Returns None when disabled via EMBEDDING_CACHE_PATH=off.
+    """
+    global _cache
+    if EMBEDDING_CACHE_PATH.lower() in ("", "off", "none"):
+        return None
+
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache(EMBEDDING_CACHE_PATH)
+    return _cache
@@ -1,18 +1,54 @@
 """
 Embedding generation using Google AI.
-Generates vector embeddings for blog content.
+Generates vector embeddings for blog content (or deterministic offline
+ones with EMBEDDING_PROVIDER=fake).
 """
 
 import time
-from typing import List, Dict, Any
+import random
+from typing import List, Dict, Any, Optional
 from google import genai
 from google.genai import types
-from utils.config import get_google_api_key, EMBEDDING_DIMENSION
+from google.genai import errors
+from utils.config import (
+    get_google_api_key,
+    EMBEDDING_MODEL,
+    EMBEDDING_DIMENSION,
+    EMBEDDING_MAX_CHARS,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_REQUESTS_PER_MINUTE,
+    EMBEDDING_MAX_RETRIES,
+    EMBEDDING_PROVIDER,
+    FAKE_EMBEDDING_SEED,
+    EMBEDDING_CHUNKING,
+    QUERY_CACHE_PERSIST,
+)
+from utils.chunking import split_into_chunks, pool_chunk_vectors, get_embedding_layout
+from utils.rate_limiter import TokenBucket
+from utils.embedding_cache import EmbeddingCache, get_embedding_cache
+from utils.query_cache import get_query_cache, normalize_query
+from utils.offline import get_fake_embedder
+from utils.metrics import (
+    STAGE_SECONDS,
+    FAILURES,
+    EMBEDDING_RETRIES,
+    EMBEDDING_RATE_LIMITED,
+    record_cache_lookups,
+)
 
 
 # Global client
 _client = None
 
+# Model name for embedding cache keys; fake vectors must never be served as real ones
+_CACHE_MODEL = f"fake-hashing:{FAKE_EMBEDDING_SEED}" if EMBEDDING_PROVIDER == "fake" else EMBEDDING_MODEL
+
+# Shared limiter for every embed_content request made by this process
+_limiter = TokenBucket(
+    rate_per_second=EMBEDDING_REQUESTS_PER_MINUTE / 60,
+    capacity=max(1.0, EMBEDDING_REQUESTS_PER_MINUTE / 60)
+)
+
 
 def get_client() -> genai.Client:
     """Get or create Google AI client."""
@@ -23,133 +59,278 @@ def get_client() -> genai.Client:
     return _client
 
 
-def generate_embedding(text: str) -> List[float]:
+def get_rate_limiter() -> TokenBucket:
+    """Get the shared embedding rate limiter."""
+    return _limiter
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Rate limits (429) and server errors (5xx) are worth retrying."""
+    return isinstance(error, errors.APIError) and (error.code == 429 or error.code >= 500)
+
+
+def _embed_request(texts: List[str], task_type: str) -> List[List[float]]:
     """
-    Generate embedding for a single text using Google AI.
+    Send one embed_content request for up to EMBEDDING_BATCH_SIZE texts.
+    Waits on the shared rate limiter and retries 429/5xx responses with
+    exponential backoff and full jitter.
+    """
+    if EMBEDDING_PROVIDER == "fake":
+        with STAGE_SECONDS.time(stage="embed"):
+            return get_fake_embedder().embed_request(texts, task_type)
+    
+    client = get_client()
+    
+    for attempt in range(EMBEDDING_MAX_RETRIES + 1):
+        _limiter.acquire()
+        
+        try:
+            with STAGE_SECONDS.time(stage="embed"):
+                result = client.models.embed_content(
+                    model=EMBEDDING_MODEL,
+                    contents=texts,
+                    config=types.EmbedContentConfig(
+                        task_type=task_type,
+                        output_dimensionality=EMBEDDING_DIMENSION,  # Match Pinecone index (768)
+                    )
+                )
+            _limiter.on_success()
+            return [list(embedding.values) for embedding in result.embeddings]
+        
+        except Exception as e:
+            retryable = _is_retryable(e)
+            if retryable and e.code == 429:
+                EMBEDDING_RATE_LIMITED.inc()
+            
+            if not retryable or attempt == EMBEDDING_MAX_RETRIES:
+                FAILURES.inc(stage="embed")
+                raise
+            
+            if e.code == 429:
+                _limiter.on_rate_limited()
+            EMBEDDING_RETRIES.inc(code=e.code)
+            
+            delay = random.uniform(0, min(60.0, 2 ** attempt))
+            print(f"  ⚠️ Embedding request failed ({e.code}), retrying in {delay:.1f}s...")
+            time.sleep(delay)
+
+
+def embed_texts(
+    texts: List[str],
+    task_type: str = "RETRIEVAL_DOCUMENT",
+    batch_size: int = EMBEDDING_BATCH_SIZE,
+    use_cache: bool = True
+) -> List[List[float]]:
+    """
+    Generate embeddings for many texts, packing several into each request.
+    Texts already in the on-disk embedding cache are not sent to the API.
     
     Args:
-        text: The text to embed
+        texts: Texts to embed
+        task_type: Gemini task type (RETRIEVAL_DOCUMENT or RETRIEVAL_QUERY)
+        batch_size: Texts per request (capped at the API limit)
+        use_cache: Whether to read from and write to the embedding cache
     
     Returns:
-        List of floats representing the embedding vector
+        List of embedding vectors in the same order as texts
     """
     # Truncate text if too long (Google AI has token limits)
-    max_chars = 25000  # Safe limit for token constraints
-    if len(text) > max_chars:
-        text = text[:max_chars]
+    texts = [text[:EMBEDDING_MAX_CHARS] for text in texts]
+    batch_size = max(1, min(batch_size, EMBEDDING_BATCH_SIZE))
     
-    client = get_client()
+    cache = get_embedding_cache() if use_cache else None
+    keys = [
+        EmbeddingCache.make_key(text, _CACHE_MODEL, task_type, EMBEDDING_DIMENSION)
+        for text in texts
+    ]
+    found = cache.get_many(keys) if cache is not None else {}
+    if cache is not None:
+        hits = sum(1 for key in keys if key in found)
+        record_cache_lookups("embedding", hits=hits, misses=len(keys) - hits)
+    
+    # Only embed texts the cache doesn't have (each distinct text once)
+    missing = list(dict.fromkeys(
+        (key, text) for key, text in zip(keys, texts) if key not in found
+    ))
+    
+    for i in range(0, len(missing), batch_size):
+        batch = missing[i:i + batch_size]
+        vectors = _embed_request([text for _, text in batch], task_type)
+        fresh = {key: vector for (key, _), vector in zip(batch, vectors)}
+        
+        if cache is not None:
+            cache.put_many(fresh, _CACHE_MODEL, task_type, EMBEDDING_DIMENSION)
+        found.update(fresh)
+    
+    return [found[key] for key in keys]
+
+
+def embed_documents(
+    texts: List[str],
+    chunked: Optional[bool] = None
+) -> List[Dict[str, Any]]:
+    """
+    Generate document embeddings, chunking long texts when enabled.
+    In chunked mode each text is split into overlapping token windows, the
+    windows of all texts are embedded together in batched requests, and each
+    document vector is the length-weighted mean of its window vectors.
+    
+    Args:
+        texts: Document texts to embed
+        chunked: Override EMBEDDING_CHUNKING
+    
+    Returns:
+        List of {embedding, chunks} dicts in the same order as texts, where
+        chunks holds {text, tokens, embedding} per window (empty when not chunked)
+    """
+    chunked = EMBEDDING_CHUNKING if chunked is None else chunked
     
-    result = client.models.embed_content(
-        model="gemini-embedding-001",
-        contents=text,
-        config=types.EmbedContentConfig(
-            task_type="RETRIEVAL_DOCUMENT",
-            output_dimensionality=EMBEDDING_DIMENSION,  # Match Pinecone index (768)
-        )
-    )
+    if not chunked:
+        return [{'embedding': vector, 'chunks': []} for vector in embed_texts(texts)]
     
-    return list(result.embeddings[0].values)
+    chunked_texts = [split_into_chunks(text) for text in texts]
+    vectors = embed_texts([chunk['text'] for chunks in chunked_texts for chunk in chunks])
+    
+    documents = []
+    position = 0
+    for chunks in chunked_texts:
+        chunk_vectors = vectors[position:position + len(chunks)]
+        position += len(chunks)
+        
+        documents.append({
+            'embedding': pool_chunk_vectors(chunk_vectors, [chunk['tokens'] for chunk in chunks]),
+            'chunks': [
+                {**chunk, 'embedding': vector}
+                for chunk, vector in zip(chunks, chunk_vectors)
+            ],
+        })
+    
+    return documents
 
 
-def generate_query_embedding(text: str) -> List[float]:
+def generate_embedding(text: str) -> List[float]:
+    """
+    Generate embedding for a single text using Google AI.
+    Long texts are chunked and pooled when EMBEDDING_CHUNKING is enabled.
+    
+    Args:
+        text: The text to embed
+    
+    Returns:
+        List of floats representing the embedding vector
+    """
+    return embed_documents([text])[0]['embedding']
+
+
+def generate_query_embedding(text: str, use_cache: bool = True) -> List[float]:
     """
     Generate embedding for a search query.
-    Uses RETRIEVAL_QUERY task type for better search results.
+    Uses RETRIEVAL_QUERY task type for better search results. Queries are
+    normalized (case, whitespace) and served from the in-memory LRU cache;
+    they only reach the on-disk cache when QUERY_CACHE_PERSIST is enabled.
     
     Args:
         text: The query text
+        use_cache: Whether to use the query embedding cache
     
     Returns:
         List of floats representing the embedding vector
     """
-    client = get_client()
+    task_type = "RETRIEVAL_QUERY"
+    query = normalize_query(text)
     
-    result = client.models.embed_content(
-        model="gemini-embedding-001",
-        contents=text,
-        config=types.EmbedContentConfig(
-            task_type="RETRIEVAL_QUERY",
-            output_dimensionality=EMBEDDING_DIMENSION,  # Match Pinecone index (768)
-        )
-    )
+    if not use_cache:
+        return embed_texts([query], task_type=task_type, use_cache=False)[0]
     
-    return list(result.embeddings[0].values)
+    cache = get_query_cache()
+    embedding = cache.get(query, task_type)
+    if embedding is None:
+        embedding = embed_texts([query], task_type=task_type, use_cache=QUERY_CACHE_PERSIST)[0]
+        cache.put(query, task_type, embedding)
+    
+    return embedding
 
 
 def generate_embeddings_batch(
     texts: List[str], 
-    delay_seconds: float = 0.5
+    batch_size: int = EMBEDDING_BATCH_SIZE
 ) -> List[List[float]]:
     """
     Generate embeddings for multiple texts.
-    Includes delay to respect rate limits.
+    Texts are sent in batched requests paced by the shared rate limiter.
     
     Args:
         texts: List of texts to embed
-        delay_seconds: Delay between API calls to avoid rate limiting
+        batch_size: Number of texts per API request
     
     Returns:
         List of embedding vectors
     """
     embeddings = []
     
-    for i, text in enumerate(texts):
+    for i in range(0, len(texts), batch_size):
+        batch = texts[i:i + batch_size]
         try:
-            embedding = generate_embedding(text)
-            embeddings.append(embedding)
-            
-            # Rate limiting delay (skip on last item)
-            if i < len(texts) - 1:
-                time.sleep(delay_seconds)
-                
+            embeddings.extend(embed_texts(batch, batch_size=batch_size))
         except Exception as e:
-            print(f"Error generating embedding for text {i}: {e}")
-            # Return zero vector on error to maintain order
-            embeddings.append([0.0] * EMBEDDING_DIMENSION)
+            print(f"Error generating embeddings for texts {i}-{i + len(batch) - 1}: {e}")
+            # Return zero vectors on error to maintain order
+            embeddings.extend([[0.0] * EMBEDDING_DIMENSION for _ in batch])
     
     return embeddings
 
 
 def embed_preprocessed_blogs(
     processed_blogs: List[Dict[str, Any]],
-    show_progress: bool = True
+    show_progress: bool = True,
+    batch_size: int = EMBEDDING_BATCH_SIZE
 ) -> List[Dict[str, Any]]:
     """
     Generate embeddings for preprocessed blogs.
+    Chunks are embedded and pooled when EMBEDDING_CHUNKING is enabled.
     
     Args:
         processed_blogs: List of preprocessed blog dicts with 'processed_text' field
         show_progress: Whether to print progress updates
+        batch_size: Number of blogs embedded per API request
     
     Returns:
-        List of blog dicts with 'embedding' field added
+        List of blog dicts with 'embedding', 'chunks' and 'embedding_layout' added
     """
     total = len(processed_blogs)
     embedded_blogs = []
+    layout = get_embedding_layout()
     
-    for i, blog in enumerate(processed_blogs):
+    for start in range(0, total, batch_size):
+        batch = processed_blogs[start:start + batch_size]
+        
         try:
-            # Generate embedding
-            embedding = generate_embedding(blog['processed_text'])
+            documents = embed_documents([blog['processed_text'] for blog in batch])
+        except Exception as e:
+            # Fall back to one request per blog so one bad text doesn't sink the batch
+            print(f"  ⚠️ Batch request failed ({e}), embedding individually...")
+            documents = []
+            for blog in batch:
+                try:
+                    documents.append(embed_documents([blog['processed_text']])[0])
+                except Exception as item_error:
+                    print(f"  ❌ Error embedding '{blog.get('slug', 'unknown')}': {item_error}")
+                    documents.append(None)
+        
+        for offset, (blog, document) in enumerate(zip(batch, documents)):
+            if document is None:
+                continue
             
             # Add embedding to blog dict
-            blog_with_embedding = {
+            embedded_blogs.append({
                 **blog,
-                'embedding': embedding
-            }
-            embedded_blogs.append(blog_with_embedding)
+                'embedding': document['embedding'],
+                'chunks': document['chunks'],
+                'embedding_layout': layout,
+            })
             
             if show_progress:
-                print(f"  [{i+1}/{total}] Embedded: {blog['title'][:50]}...")
-            
-            # Rate limiting (skip on last item)
-            if i < total - 1:
-                time.sleep(0.5)
-                
-        except Exception as e:
-            print(f"  ❌ Error embedding '{blog.get('slug', 'unknown')}': {e}")
-            continue
+                print(f"  [{start + offset + 1}/{total}] Embedded: {blog['title'][:50]}...")
     
     return embedded_blogs
 
@@ -199,11 +380,7 @@ if __name__ == "__main__":
         text2 = "Building ML-powered recommendation engines"
         text3 = "Cooking recipes and food preparation"
         
-        emb1 = generate_embedding(text1)
-        time.sleep(0.5)
-        emb2 = generate_embedding(text2)
-        time.sleep(0.5)
-        emb3 = generate_embedding(text3)
+        emb1, emb2, emb3 = embed_texts([text1, text2, text3])
         
         sim_related = compute_similarity(emb1, emb2)
         sim_unrelated = compute_similarity(emb1, emb3)
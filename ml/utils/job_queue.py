@@ -0,0 +1,393 @@
+"""
+Durable background job queue.
+Jobs live in SQLite so they survive restarts, and are run by a small pool
+of worker threads. Submitting a job for a key that already has one waiting
+(e.g. the same blog slug) replaces its payload instead of queueing twice.
+
+Several processes may share one queue file: every write runs in a
+BEGIN IMMEDIATE transaction, and a running job holds a lease that its
+worker pool renews. Only jobs whose lease has lapsed (their process died)
+are put back in the queue.
+"""
+
+import os
+import json
+import uuid
+import socket
+import sqlite3
+import threading
+import traceback
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from utils.config import JOB_QUEUE_PATH, JOB_WORKERS, JOB_RETENTION_DAYS, JOB_LEASE_SECONDS
+
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+def _lease_expiry(lease_seconds: float) -> str:
+    return (datetime.utcnow() + timedelta(seconds=lease_seconds)).isoformat()
+
+
+class JobQueue:
+    """SQLite-backed FIFO of jobs, coalesced per (kind, key)."""
+
+    def __init__(self, path: str, lease_seconds: float = JOB_LEASE_SECONDS):
+        """
+        Args:
+            path: SQLite file (may be shared by several processes)
+            lease_seconds: How long a claimed job stays owned by this queue
+                           without renew_leases() before others may re-run it
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.lease_seconds = lease_seconds
+        # Identifies this queue's claims in the owner column
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        # Autocommit mode: writes open their own BEGIN IMMEDIATE transaction
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._lock, self._transaction():
+            self._create_schema()
+
+    @contextmanager
+    def _transaction(self):
+        """Hold SQLite's write lock for the block, so other processes see all or nothing."""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def _create_schema(self):
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                submissions INTEGER NOT NULL DEFAULT 1,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                started_at TEXT,
+                finished_at TEXT,
+                owner TEXT,
+                lease_expires_at TEXT
+            )
+            """
+        )
+        # Queue files created before leases existed
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column in ("owner", "lease_expires_at"):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_key ON jobs (kind, key, status)")
+
+    def enqueue(self, kind: str, key: str, payload: Dict[str, Any]) -> Tuple[str, bool]:
+        """
+        Queue a job, or fold it into a job for the same key that hasn't started yet.
+
+        Args:
+            kind: Handler name the worker dispatches on
+            key: Coalescing key (e.g. the blog slug)
+            payload: JSON-serializable job arguments
+
+        Returns:
+            (job_id, coalesced) - coalesced is True when an existing queued
+            job was updated with the newer payload instead
+        """
+        now = _now()
+        body = json.dumps(payload)
+
+        with self._wakeup:
+            with self._transaction():
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE kind = ? AND key = ? AND status = ? "
+                    "ORDER BY created_at LIMIT 1",
+                    (kind, key, JOB_QUEUED)
+                ).fetchone()
+
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET payload = ?, submissions = submissions + 1, updated_at = ? "
+                        "WHERE id = ?",
+                        (body, now, row["id"])
+                    )
+                    return row["id"], True
+
+                job_id = uuid.uuid4().hex
+                self._conn.execute(
+                    "INSERT INTO jobs (id, kind, key, payload, status, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, kind, key, body, JOB_QUEUED, now, now)
+                )
+            self._wakeup.notify()
+            return job_id, False
+
+    def claim(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Take the oldest queued job and mark it running, waiting up to
+        `timeout` seconds for one. Jobs whose key is already running are
+        skipped so the same blog is never processed twice at once. Jobs
+        queued by other processes are only seen on the next poll.
+        """
+        with self._wakeup:
+            job = self._claim_locked()
+            if job is None and timeout:
+                self._wakeup.wait(timeout)
+                job = self._claim_locked()
+            return job
+
+    def _claim_locked(self) -> Optional[Dict[str, Any]]:
+        now = _now()
+        lease_expires_at = _lease_expiry(self.lease_seconds)
+
+        with self._transaction():
+            self._requeue_expired(now)
+            row = self._conn.execute(
+                """
+                SELECT * FROM jobs AS q
+                WHERE q.status = ? AND NOT EXISTS (
+                    SELECT 1 FROM jobs AS r
+                    WHERE r.kind = q.kind AND r.key = q.key AND r.status = ?
+                )
+                ORDER BY q.created_at LIMIT 1
+                """,
+                (JOB_QUEUED, JOB_RUNNING)
+            ).fetchone()
+            if row is None:
+                return None
+
+            claimed = self._conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, started_at = ?, updated_at = ?, "
+                "owner = ?, lease_expires_at = ? WHERE id = ? AND status = ?",
+                (JOB_RUNNING, now, now, self.owner, lease_expires_at, row["id"], JOB_QUEUED)
+            ).rowcount
+        if not claimed:
+            # Another process took it first; the caller polls again
+            return None
+
+        job = self._to_dict(row)
+        job.update(
+            status=JOB_RUNNING,
+            attempts=row["attempts"] + 1,
+            started_at=now,
+            owner=self.owner,
+            lease_expires_at=lease_expires_at,
+        )
+        return job
+
+    def renew_leases(self) -> int:
+        """Extend the lease of every job this queue is running; returns how many."""
+        with self._lock, self._transaction():
+            return self._conn.execute(
+                "UPDATE jobs SET lease_expires_at = ? WHERE status = ? AND owner = ?",
+                (_lease_expiry(self.lease_seconds), JOB_RUNNING, self.owner)
+            ).rowcount
+
+    def finish(self, job_id: str, result: Any = None, error: Optional[str] = None) -> bool:
+        """
+        Record a job's outcome; an error marks it failed.
+
+        Returns:
+            False if the job's lease had lapsed and it was handed to another
+            worker, in which case the outcome is dropped
+        """
+        now = _now()
+        with self._wakeup:
+            with self._transaction():
+                updated = self._conn.execute(
+                    "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, updated_at = ?, "
+                    "lease_expires_at = NULL WHERE id = ? AND status = ? AND owner = ?",
+                    (
+                        JOB_FAILED if error else JOB_SUCCEEDED,
+                        None if error else json.dumps(result),
+                        error,
+                        now,
+                        now,
+                        job_id,
+                        JOB_RUNNING,
+                        self.owner,
+                    )
+                ).rowcount
+            # A job for the same key may have been waiting on this one
+            self._wakeup.notify_all()
+            return bool(updated)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Look up a job by ID (without its payload)."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = self._to_dict(row)
+        del job["payload"]
+        return job
+
+    def requeue_interrupted(self) -> int:
+        """
+        Put jobs whose worker is gone back in the queue: running jobs whose
+        lease has expired, or that were claimed before leases existed.
+        Jobs other live processes are running keep renewing their lease and
+        are left alone. claim() does the same on every call.
+        """
+        with self._wakeup:
+            with self._transaction():
+                count = self._requeue_expired(_now())
+            self._wakeup.notify_all()
+            return count
+
+    def _requeue_expired(self, now: str) -> int:
+        return self._conn.execute(
+            "UPDATE jobs SET status = ?, updated_at = ?, owner = NULL, lease_expires_at = NULL "
+            "WHERE status = ? AND (lease_expires_at IS NULL OR lease_expires_at < ?)",
+            (JOB_QUEUED, now, JOB_RUNNING, now)
+        ).rowcount
+
+    def prune(self, older_than_days: float) -> int:
+        """Delete finished jobs older than the retention window."""
+        cutoff = (datetime.utcnow() - timedelta(days=older_than_days)).isoformat()
+        with self._lock, self._transaction():
+            return self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (JOB_SUCCEEDED, JOB_FAILED, cutoff)
+            ).rowcount
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per status."""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {status: 0 for status in (JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, JOB_FAILED)}
+        counts.update({status: count for status, count in rows})
+        return counts
+
+    def notify_all(self):
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+
+class JobWorkerPool:
+    """
+    Worker threads that pull jobs from a JobQueue and run their handler,
+    plus a heartbeat thread that keeps the leases of running jobs alive.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handlers: Dict[str, Callable[[Dict[str, Any]], Any]],
+        workers: int = JOB_WORKERS,
+        poll_seconds: float = 1.0
+    ):
+        """
+        Args:
+            queue: Queue to consume
+            handlers: Job kind -> function called with the payload; its
+                      return value is stored as the job result
+            workers: Number of worker threads
+            poll_seconds: Longest a worker sleeps before re-checking the queue
+        """
+        self.queue = queue
+        self.handlers = handlers
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        requeued = self.queue.requeue_interrupted()
+        if requeued:
+            print(f"⚠️ Re-queued {requeued} interrupted job(s)")
+
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        heartbeat = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+        heartbeat.start()
+        self._threads.append(heartbeat)
+
+    def stop(self, timeout: float = 10.0):
+        """Signal the workers to exit once their current job is done."""
+        self._stop.set()
+        self.queue.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self):
+        while not self._stop.is_set():
+            job = self.queue.claim(timeout=self.poll_seconds)
+            if job is None:
+                continue
+
+            handler = self.handlers.get(job["kind"])
+            try:
+                if handler is None:
+                    raise ValueError(f"No handler for job kind '{job['kind']}'")
+                result = handler(job["payload"])
+            except Exception as e:
+                print(f"❌ Job {job['id']} ({job['kind']} {job['key']}) failed: {e}")
+                traceback.print_exc()
+                recorded = self.queue.finish(job["id"], error=str(e))
+            else:
+                recorded = self.queue.finish(job["id"], result=result)
+
+            if not recorded:
+                print(f"⚠️ Job {job['id']} lost its lease while running; its outcome was dropped")
+
+    def _heartbeat(self):
+        # Renew well before expiry so a slow renewal never lets a lease lapse
+        interval = self.queue.lease_seconds / 3
+        while not self._stop.wait(interval):
+            try:
+                self.queue.renew_leases()
+            except sqlite3.Error as e:
+                print(f"⚠️ Could not renew job leases: {e}")
+
+
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Get the process-wide job queue, pruning old finished jobs on first use."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue(JOB_QUEUE_PATH)
+            _queue.prune(JOB_RETENTION_DAYS)
+    return _queue
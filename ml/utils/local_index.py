@@ -0,0 +1,483 @@
+"""
+Local kNN vector index.
+Keeps each namespace's vectors in a memory-mapped float32 .npy matrix with
+a JSON sidecar (row order ids + metadata), or in RAM only when no path is
+given, and answers queries with one vectorized cosine top-k, or through an
+optional HNSW graph for large corpora. Implements the subset of the Pinecone Index API used by
+utils.vector_store, so the two are interchangeable.
+
+New vectors are persisted at most once per VECTOR_STORE_FLUSH_SECONDS (and
+on flush/close/exit) instead of rewriting the sidecar on every upsert.
+"""
+
+import os
+import json
+import time
+import atexit
+import hashlib
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+from typing import List, Dict, Any, Optional, Iterator
+import numpy as np
+from numpy.lib.format import open_memmap
+from utils.ann_index import HnswIndex
+from utils.config import VECTOR_STORE_FLUSH_SECONDS
+
+
+_COMPARISONS = {
+    "$eq": lambda value, target: value == target,
+    "$ne": lambda value, target: value != target,
+    "$gt": lambda value, target: value > target,
+    "$gte": lambda value, target: value >= target,
+    "$lt": lambda value, target: value < target,
+    "$lte": lambda value, target: value <= target,
+    "$in": lambda value, target: value in target,
+    "$nin": lambda value, target: value not in target,
+}
+
+
+def matches_filter(metadata: Dict[str, Any], filter: Dict[str, Any]) -> bool:
+    """
+    Evaluate a Pinecone-style metadata filter, e.g.
+    {"tags": {"$in": ["python"]}, "is_starred": True}.
+    List-valued fields (tags) match $eq/$in when any element matches, and
+    $ne/$nin when no element does.
+    """
+    for field, condition in filter.items():
+        if field == "$and":
+            if not all(matches_filter(metadata, clause) for clause in condition):
+                return False
+            continue
+        if field == "$or":
+            if not any(matches_filter(metadata, clause) for clause in condition):
+                return False
+            continue
+
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+
+        for operator, target in condition.items():
+            if operator == "$exists":
+                if (field in metadata) != bool(target):
+                    return False
+                continue
+            if field not in metadata:
+                return False
+
+            compare = _COMPARISONS.get(operator)
+            if compare is None:
+                raise ValueError(f"Unsupported filter operator '{operator}'")
+
+            value = metadata[field]
+            if isinstance(value, list):
+                negated = operator in ("$ne", "$nin")
+                hits = [compare(item, target) for item in value]
+                if not (all(hits) if negated else any(hits)):
+                    return False
+            else:
+                try:
+                    if not compare(value, target):
+                        return False
+                except TypeError:
+                    return False
+
+    return True
+
+
+class _Namespace:
+    """Vectors of one namespace: rows [0, count) of a growable memmap (or array)."""
+
+    _INITIAL_CAPACITY = 256
+
+    def __init__(
+        self,
+        directory: Optional[Path],
+        name: str,
+        dimension: int,
+        index_type: str = "exact",
+        hnsw_params: Optional[Dict[str, int]] = None
+    ):
+        stem = name or "__default__"
+        self.in_memory = directory is None
+        self.matrix_path = None if self.in_memory else directory / f"{stem}.npy"
+        self.sidecar_path = None if self.in_memory else directory / f"{stem}.json"
+        self.dimension = dimension
+
+        self.ids: List[str] = []
+        self.metadata: Dict[str, Dict[str, Any]] = {}
+        self.rows: Dict[str, int] = {}
+        self.matrix = None
+        # Changes not yet in the sidecar, when it was last written and how many rows it covers
+        self.dirty = False
+        self.saved_at = float("-inf")
+        self.saved_count = 0
+
+        if not self.in_memory and self.sidecar_path.exists() and self.matrix_path.exists():
+            with open(self.sidecar_path, encoding="utf-8") as f:
+                sidecar = json.load(f)
+            self.ids = sidecar["ids"]
+            self.metadata = sidecar["metadata"]
+            self.rows = {vector_id: row for row, vector_id in enumerate(self.ids)}
+            self.matrix = open_memmap(self.matrix_path, mode="r+")
+            self.saved_count = len(self.ids)
+
+        self.norms = self._compute_norms(0, len(self.ids))
+
+        self.ann: Optional[HnswIndex] = None
+        self.ann_stem = None if self.in_memory else directory / stem
+        if index_type == "hnsw":
+            self.ann = HnswIndex(self.ann_stem, dimension, **(hnsw_params or {}))
+            self.ann.load_or_build(self.ids, self._rows(), self.fingerprint())
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _rows(self) -> np.ndarray:
+        if self.matrix is None:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        return self.matrix[:len(self.ids)]
+
+    def fingerprint(self) -> str:
+        """Checksum of the ids (in row order) and their vectors."""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(json.dumps(self.ids).encode("utf-8"))
+        digest.update(np.ascontiguousarray(self._rows(), dtype=np.float32))
+        return digest.hexdigest()
+
+    def _compute_norms(self, start: int, stop: int) -> np.ndarray:
+        if self.matrix is None or stop <= start:
+            return np.zeros(0, dtype=np.float32)
+        return np.linalg.norm(self.matrix[start:stop], axis=1).astype(np.float32)
+
+    def _ensure_capacity(self, needed: int):
+        """Grow the memmap (doubling) so it can hold `needed` rows."""
+        capacity = 0 if self.matrix is None else self.matrix.shape[0]
+        if needed <= capacity:
+            return
+
+        new_capacity = max(self._INITIAL_CAPACITY, capacity)
+        while new_capacity < needed:
+            new_capacity *= 2
+
+        if self.in_memory:
+            grown = np.zeros((new_capacity, self.dimension), dtype=np.float32)
+            if self.matrix is not None:
+                grown[:len(self.ids)] = self.matrix[:len(self.ids)]
+            self.matrix = grown
+            return
+
+        self.matrix_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.matrix_path.with_suffix(".npy.tmp")
+        grown = open_memmap(tmp_path, mode="w+", dtype=np.float32,
+                            shape=(new_capacity, self.dimension))
+        if self.matrix is not None:
+            grown[:len(self.ids)] = self.matrix[:len(self.ids)]
+        grown.flush()
+
+        # Release both maps before swapping files (required on Windows)
+        self.matrix = None
+        del grown
+        os.replace(tmp_path, self.matrix_path)
+        self.matrix = open_memmap(self.matrix_path, mode="r+")
+
+    def save(self):
+        """Flush vectors and the ANN graph, then atomically rewrite the sidecar."""
+        if self.in_memory:
+            return
+        if self.matrix is not None:
+            self.matrix.flush()
+        if self.ann is not None:
+            self.ann.save(self.fingerprint())
+        else:
+            # A graph left from an earlier HNSW run no longer matches the vectors
+            Path(f"{self.ann_stem}.hnsw").unlink(missing_ok=True)
+            Path(f"{self.ann_stem}.hnsw.json").unlink(missing_ok=True)
+
+        self.sidecar_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.sidecar_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"ids": self.ids, "metadata": self.metadata}, f)
+        os.replace(tmp_path, self.sidecar_path)
+        self.dirty = False
+        self.saved_at = time.monotonic()
+        self.saved_count = len(self.ids)
+
+    def upsert(self, vectors: List[Dict[str, Any]]) -> bool:
+        """Write vectors into their rows; return whether a row the sidecar already covers changed."""
+        overwrote_saved = any(self.rows.get(v["id"], self.saved_count) < self.saved_count for v in vectors)
+        new_ids = list(dict.fromkeys(v["id"] for v in vectors if v["id"] not in self.rows))
+        self._ensure_capacity(len(self.ids) + len(new_ids))
+        self.norms = np.concatenate([self.norms, np.zeros(len(new_ids), dtype=np.float32)])
+
+        for vector in vectors:
+            vector_id = vector["id"]
+            row = self.rows.get(vector_id)
+            if row is None:
+                row = len(self.ids)
+                self.ids.append(vector_id)
+                self.rows[vector_id] = row
+
+            values = np.asarray(vector["values"], dtype=np.float32)
+            self.matrix[row] = values
+            self.norms[row] = np.linalg.norm(values)
+            self.metadata[vector_id] = dict(vector.get("metadata") or {})
+
+        if self.ann is not None:
+            ids = list(dict.fromkeys(v["id"] for v in vectors))
+            self.ann.add(ids, self.matrix[[self.rows[vector_id] for vector_id in ids]])
+        return overwrote_saved
+
+    def delete(self, ids: List[str]):
+        """Remove rows by moving the last row into each hole."""
+        for vector_id in ids:
+            row = self.rows.pop(vector_id, None)
+            if row is None:
+                continue
+            self.metadata.pop(vector_id, None)
+
+            last = len(self.ids) - 1
+            if row != last:
+                moved_id = self.ids[last]
+                self.matrix[row] = self.matrix[last]
+                self.norms[row] = self.norms[last]
+                self.ids[row] = moved_id
+                self.rows[moved_id] = row
+            self.ids.pop()
+            self.norms = self.norms[:last]
+
+        if self.ann is not None:
+            self.ann.remove(ids)
+
+    def clear(self):
+        self.ids, self.metadata, self.rows = [], {}, {}
+        self.norms = np.zeros(0, dtype=np.float32)
+        if self.ann is not None:
+            self.ann.clear()
+
+    def scores(self, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Cosine similarity of the query to the given rows (default: all rows)."""
+        matrix = self.matrix[:len(self.ids)] if rows is None else self.matrix[rows]
+        norms = self.norms if rows is None else self.norms[rows]
+
+        denominators = norms * np.linalg.norm(query)
+        denominators[denominators == 0] = np.inf
+        return (matrix @ query) / denominators
+
+
+class LocalVectorIndex:
+    """
+    Cosine-similarity index stored under one directory.
+
+    Supports the calls utils.vector_store and the API make on a Pinecone
+    index: upsert, fetch, query, list, delete and describe_index_stats.
+    Queries are exact by default; with index_type="hnsw" they go through an
+    HNSW graph and only the candidates are scored exactly. With path=None
+    nothing is written to disk (exact search only). Safe to share between
+    threads.
+
+    Upserts of new ids only append rows to the memmap; the sidecar and graph
+    are saved when the last save is older than flush_seconds (0 = every
+    call), on flush()/close() and at interpreter exit. Deletes and upserts
+    that overwrite already saved rows save immediately, since the memmap
+    changes in place and a stale sidecar would mislabel those rows. A crash
+    can lose at most flush_seconds of new vectors.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str],
+        dimension: int,
+        index_type: str = "exact",
+        hnsw_params: Optional[Dict[str, int]] = None,
+        flush_seconds: float = VECTOR_STORE_FLUSH_SECONDS
+    ):
+        if index_type not in ("exact", "hnsw"):
+            raise ValueError(f"Unknown index type '{index_type}', expected 'exact' or 'hnsw'")
+        if path is None and index_type != "exact":
+            raise ValueError("An in-memory index (path=None) only supports index_type='exact'")
+
+        self.path = Path(path) if path is not None else None
+        self.dimension = dimension
+        self.index_type = index_type
+        self.hnsw_params = hnsw_params
+        self.flush_seconds = flush_seconds
+        self._lock = threading.RLock()
+        self._namespaces: Dict[str, _Namespace] = {}
+        if self.path is not None:
+            atexit.register(self.flush)
+
+    def _namespace(self, name: str) -> _Namespace:
+        if name not in self._namespaces:
+            self._namespaces[name] = _Namespace(
+                self.path, name, self.dimension, self.index_type, self.hnsw_params
+            )
+        return self._namespaces[name]
+
+    def _stored_namespaces(self) -> List[str]:
+        """Namespaces on disk plus any opened in this process."""
+        names = set(self._namespaces)
+        if self.path is not None and self.path.exists():
+            for matrix_path in self.path.glob("*.npy"):
+                names.add("" if matrix_path.stem == "__default__" else matrix_path.stem)
+        return sorted(names)
+
+    def upsert(self, vectors: List[Dict[str, Any]], namespace: str = ""):
+        """Insert or overwrite vectors given as {id, values, metadata} dicts."""
+        for vector in vectors:
+            if len(vector["values"]) != self.dimension:
+                raise ValueError(
+                    f"Vector '{vector['id']}' has dimension {len(vector['values'])}, "
+                    f"expected {self.dimension}"
+                )
+
+        with self._lock:
+            store = self._namespace(namespace)
+            overwrote_saved = store.upsert(vectors)
+            store.dirty = True
+            if overwrote_saved or time.monotonic() - store.saved_at >= self.flush_seconds:
+                store.save()
+
+        return SimpleNamespace(upserted_count=len(vectors))
+
+    def flush(self):
+        """Persist every namespace with upserts not yet saved."""
+        with self._lock:
+            for store in self._namespaces.values():
+                if store.dirty:
+                    store.save()
+
+    def close(self):
+        """Persist pending writes (the index stays usable)."""
+        self.flush()
+
+    def fetch(self, ids: List[str], namespace: str = ""):
+        """Look up vectors by ID. Unknown IDs are simply absent."""
+        with self._lock:
+            store = self._namespace(namespace)
+            vectors = {}
+            for vector_id in ids:
+                row = store.rows.get(vector_id)
+                if row is not None:
+                    vectors[vector_id] = SimpleNamespace(
+                        id=vector_id,
+                        values=store.matrix[row].tolist(),
+                        metadata=store.metadata.get(vector_id, {})
+                    )
+
+        return SimpleNamespace(vectors=vectors, namespace=namespace)
+
+    def query(
+        self,
+        vector: List[float],
+        top_k: int = 10,
+        namespace: str = "",
+        include_metadata: bool = False,
+        include_values: bool = False,
+        filter: Optional[Dict[str, Any]] = None,
+        ef: Optional[int] = None,
+        **kwargs
+    ):
+        """
+        Return the top_k stored vectors by cosine similarity, best first.
+        filter restricts results to matching metadata (searched exactly);
+        ef overrides the HNSW search breadth for this query.
+        """
+        query = np.asarray(vector, dtype=np.float32)
+
+        with self._lock:
+            store = self._namespace(namespace)
+            count = len(store)
+            if count == 0 or top_k <= 0:
+                return SimpleNamespace(matches=[], namespace=namespace)
+
+            allowed = None
+            if filter:
+                allowed = np.array([
+                    row for row, vector_id in enumerate(store.ids)
+                    if matches_filter(store.metadata.get(vector_id, {}), filter)
+                ], dtype=np.int64)
+                count = len(allowed)
+                if count == 0:
+                    return SimpleNamespace(matches=[], namespace=namespace)
+
+            k = min(top_k, count)
+            best = None
+            if store.ann is not None and allowed is None and k < count:
+                try:
+                    candidates = store.ann.search(query, k, ef=ef)
+                    best = np.array([store.rows[vector_id] for vector_id in candidates], dtype=np.int64)
+                except RuntimeError:
+                    # hnswlib can come up short after many deletes; answer exactly
+                    best = None
+
+            if best is None:
+                scores = store.scores(query, allowed)
+                best = np.argpartition(-scores, k - 1)[:k] if k < count else np.arange(count)
+                best_scores = scores[best]
+                if allowed is not None:
+                    best = allowed[best]
+            else:
+                best_scores = store.scores(query, best)
+
+            order = np.argsort(-best_scores, kind="stable")
+
+            matches = []
+            for row, score in zip(best[order], best_scores[order]):
+                vector_id = store.ids[row]
+                matches.append(SimpleNamespace(
+                    id=vector_id,
+                    score=float(score),
+                    values=store.matrix[row].tolist() if include_values else [],
+                    metadata=store.metadata.get(vector_id, {}) if include_metadata else None
+                ))
+
+        return SimpleNamespace(matches=matches, namespace=namespace)
+
+    def list(
+        self,
+        prefix: Optional[str] = None,
+        namespace: str = "",
+        limit: int = 100
+    ) -> Iterator[List[str]]:
+        """Yield pages of vector IDs, optionally only those starting with prefix."""
+        with self._lock:
+            ids = [
+                vector_id for vector_id in self._namespace(namespace).ids
+                if prefix is None or vector_id.startswith(prefix)
+            ]
+
+        for i in range(0, len(ids), limit):
+            yield ids[i:i + limit]
+
+    def delete(
+        self,
+        ids: Optional[List[str]] = None,
+        delete_all: bool = False,
+        namespace: str = "",
+        **kwargs
+    ):
+        """Delete vectors by ID, or every vector in the namespace."""
+        with self._lock:
+            store = self._namespace(namespace)
+            if delete_all:
+                store.clear()
+            else:
+                store.delete(ids or [])
+            store.save()
+
+        return {}
+
+    def describe_index_stats(self):
+        """Vector counts per namespace, shaped like Pinecone's stats."""
+        with self._lock:
+            namespaces = {
+                name: SimpleNamespace(vector_count=len(self._namespace(name)))
+                for name in self._stored_namespaces()
+            }
+
+        return SimpleNamespace(
+            dimension=self.dimension,
+            total_vector_count=sum(ns.vector_count for ns in namespaces.values()),
+            namespaces=namespaces
+        )
@@ -0,0 +1,330 @@
+"""
+In-process metrics registry.
+Counters and latency histograms shared by the API (exposed on /metrics in
+the Prometheus text format) and the training scripts (written out as a
+JSON summary at the end of each run).
+"""
+
+import json
+import math
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from utils.config import METRICS_SUMMARY_DIR
+
+
+# Seconds; spans sub-millisecond local work up to retried embedding calls
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+
+def _label_key(labelnames: Sequence[str], labels: Dict[str, Any]) -> Tuple[str, ...]:
+    if set(labels) != set(labelnames):
+        raise ValueError(f"Expected labels {list(labelnames)}, got {sorted(labels)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: Sequence[str], key: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, key)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Monotonic count per label set."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_label_key(self.labelnames, labels), 0.0)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        if not values and not self.labelnames:
+            values = [((), 0.0)]
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in values
+        ]
+
+    def summary(self) -> Dict[str, float]:
+        with self._lock:
+            return {",".join(key) or "total": value for key, value in sorted(self._values.items())}
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram per label set."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # key -> [per-bucket counts, sum, count, max]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+            series[3] = max(series[3], value)
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the wall time of the with-block (also when it raises)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def _quantile(self, counts: List[int], total: int, q: float, max_value: float) -> float:
+        """Estimate a quantile by linear interpolation inside its bucket (capped at the max seen)."""
+        rank = q * total
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, counts):
+            if count and seen + count >= rank:
+                upper = min(bound, max_value)
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        return max_value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, [list(s[0]), s[1], s[2]]) for key, s in self._series.items())
+        lines = []
+        for key, (counts, total_sum, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total_sum)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            series = sorted((key, [list(s[0]), s[1], s[2], s[3]]) for key, s in self._series.items())
+        return {
+            ",".join(key) or "total": {
+                "count": count,
+                "sum_seconds": round(total_sum, 6),
+                "mean_ms": round(total_sum / count * 1000, 3),
+                "p50_ms": round(self._quantile(counts, count, 0.50, max_value) * 1000, 3),
+                "p95_ms": round(self._quantile(counts, count, 0.95, max_value) * 1000, 3),
+                "p99_ms": round(self._quantile(counts, count, 0.99, max_value) * 1000, 3),
+                "max_ms": round(max_value * 1000, 3),
+            }
+            for key, (counts, total_sum, count, max_value) in series
+        }
+
+
+class MetricsRegistry:
+    """Named counters and histograms; re-registering a name returns the existing metric."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric '{name}' is already registered as a {metric.type_name}")
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, help_text, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram, name, help_text, labelnames, buckets)
+
+    def reset(self):
+        """Zero every metric (names stay registered)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.reset()
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format (0.0.4)."""
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        lines = []
+        for name, metric in metrics:
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.type_name}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> Dict[str, Any]:
+        """JSON-friendly view: counter values and histogram count/mean/percentiles."""
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        return {
+            "counters": {name: m.summary() for name, m in metrics if isinstance(m, Counter) and m.summary()},
+            "histograms": {name: m.summary() for name, m in metrics if isinstance(m, Histogram) and m.summary()},
+        }
+
+
+_registry = MetricsRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    """Get the process-wide metrics registry."""
+    return _registry
+
+
+# Shared instrumentation, used by utils, the API and the scripts
+STAGE_SECONDS = _registry.histogram(
+    "ml_stage_duration_seconds",
+    "Latency of pipeline stages (preprocess, embed, vector_upsert, vector_query, mongo_write)",
+    ("stage",)
+)
+FAILURES = _registry.counter(
+    "ml_failures_total",
+    "Pipeline stage calls that raised",
+    ("stage",)
+)
+CACHE_LOOKUPS = _registry.counter(
+    "ml_cache_lookups_total",
+    "Cache lookups by cache and result (hit or miss)",
+    ("cache", "result")
+)
+EMBEDDING_RETRIES = _registry.counter(
+    "ml_embedding_retries_total",
+    "Embedding requests retried, by HTTP status code",
+    ("code",)
+)
+EMBEDDING_RATE_LIMITED = _registry.counter(
+    "ml_embedding_rate_limited_total",
+    "Embedding requests rejected with 429"
+)
+
+
+@contextmanager
+def time_stage(stage: str) -> Iterator[None]:
+    """Record a stage's latency, and count a failure if the block raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        FAILURES.inc(stage=stage)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+
+def record_cache_lookups(cache: str, hits: int, misses: int):
+    """Count a batch of cache lookups."""
+    if hits:
+        CACHE_LOOKUPS.inc(hits, cache=cache, result="hit")
+    if misses:
+        CACHE_LOOKUPS.inc(misses, cache=cache, result="miss")
+
+
+def write_metrics_summary(
+    run_name: str,
+    started_at: datetime,
+    status: str = "success",
+    extra: Optional[Dict[str, Any]] = None,
+    output_dir: Optional[str] = None
+) -> Optional[Path]:
+    """
+    Write the registry summary for a script run as JSON.
+
+    Args:
+        run_name: Script name, used in the file name (e.g. "train")
+        started_at: When the run started
+        status: "success" or "failed"
+        extra: Additional run details to include (counts, arguments)
+        output_dir: Target directory (default METRICS_SUMMARY_DIR; "off" disables)
+
+    Returns:
+        Path of the written file, or None when disabled
+    """
+    output_dir = output_dir or METRICS_SUMMARY_DIR
+    if output_dir.lower() in ("", "off", "none"):
+        return None
+
+    finished_at = datetime.now()
+    path = Path(output_dir) / f"{run_name}_{started_at.strftime('%Y%m%d-%H%M%S')}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "run": run_name,
+            "status": status,
+            "started_at": started_at.isoformat(),
+            "finished_at": finished_at.isoformat(),
+            "duration_seconds": round((finished_at - started_at).total_seconds(), 3),
+            **(extra or {}),
+            **_registry.summary(),
+        }, f, indent=2)
+
+    return path
@@ -0,0 +1,330 @@
+"""
+Offline stand-ins for the external services.
+A deterministic hashing embedder (EMBEDDING_PROVIDER=fake) and in-process
+MongoDB collections (MONGODB_BACKEND=memory) that answer the subset of the
+pymongo API used by utils.database, the scripts and the API. Together with
+VECTOR_STORE_BACKEND=memory they let the whole pipeline run without keys.
+"""
+
+import re
+import copy
+import json
+import hashlib
+import threading
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional
+import numpy as np
+from bson import ObjectId
+from pymongo import UpdateOne
+from utils.config import (
+    EMBEDDING_DIMENSION,
+    FAKE_EMBEDDING_SEED,
+    MONGODB_DATABASE,
+    MONGODB_COLLECTION,
+    MONGODB_FIXTURE_PATH,
+)
+from utils.local_index import matches_filter
+
+
+# ============================================================
+# Embeddings
+# ============================================================
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+class HashingEmbedder:
+    """
+    Deterministic embedder: each lowercase token is hashed (keyed by `seed`)
+    to one of `dimension` buckets with a +/-1 sign, and the summed vector is
+    L2-normalized. Texts sharing words get similar vectors, so search and
+    recommendations still behave sensibly. Safe to share between threads.
+    """
+
+    _MAX_CACHED_TOKENS = 500_000
+
+    def __init__(self, dimension: int = EMBEDDING_DIMENSION, seed: str = FAKE_EMBEDDING_SEED):
+        self.dimension = dimension
+        self._key = str(seed).encode("utf-8")[:64]
+        self._buckets: Dict[str, tuple] = {}
+
+    def _bucket(self, token: str) -> tuple:
+        bucket = self._buckets.get(token)
+        if bucket is None:
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8, key=self._key).digest()
+            value = int.from_bytes(digest, "little")
+            bucket = (value % self.dimension, 1.0 if value >> 63 else -1.0)
+            if len(self._buckets) >= self._MAX_CACHED_TOKENS:
+                self._buckets.clear()
+            self._buckets[token] = bucket
+        return bucket
+
+    def embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        buckets = [self._bucket(token) for token in _TOKEN_RE.findall(text.lower())]
+        if buckets:
+            indices, signs = zip(*buckets)
+            np.add.at(vector, np.array(indices), np.array(signs, dtype=np.float32))
+
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            # Empty or symbol-only text: any fixed unit vector will do
+            vector[0] = norm = 1.0
+        return (vector / norm).tolist()
+
+    def embed_request(self, texts: List[str], task_type: str) -> List[List[float]]:
+        """Same contract as utils.embeddings._embed_request (task_type is ignored)."""
+        return [self.embed(text) for text in texts]
+
+
+_embedder: Optional[HashingEmbedder] = None
+
+
+def get_fake_embedder() -> HashingEmbedder:
+    """Get the process-wide fake embedder."""
+    global _embedder
+    if _embedder is None:
+        _embedder = HashingEmbedder()
+    return _embedder
+
+
+# ============================================================
+# MongoDB
+# ============================================================
+
+def _project(doc: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Apply a MongoDB inclusion or exclusion projection to a copy of doc."""
+    if not projection:
+        return copy.deepcopy(doc)
+
+    included = [field for field, keep in projection.items() if keep and field != "_id"]
+    if included:
+        fields = included + (["_id"] if projection.get("_id", 1) else [])
+        return {field: copy.deepcopy(doc[field]) for field in fields if field in doc}
+
+    excluded = {field for field, keep in projection.items() if not keep}
+    return {field: copy.deepcopy(value) for field, value in doc.items() if field not in excluded}
+
+
+def _apply_update(doc: Dict[str, Any], update: Dict[str, Any], inserting: bool = False) -> bool:
+    """Apply $set/$setOnInsert/$unset/$inc to doc in place; return whether it changed."""
+    before = copy.deepcopy(doc)
+    for operator, fields in update.items():
+        if operator == "$set" or (operator == "$setOnInsert" and inserting):
+            doc.update(copy.deepcopy(fields))
+        elif operator == "$setOnInsert":
+            continue
+        elif operator == "$unset":
+            for field in fields:
+                doc.pop(field, None)
+        elif operator == "$inc":
+            for field, amount in fields.items():
+                doc[field] = doc.get(field, 0) + amount
+        else:
+            raise ValueError(f"Unsupported update operator '{operator}'")
+    return doc != before
+
+
+class InMemoryCursor:
+    """Result of find(): iterable, and accepts the cursor options callers chain."""
+
+    def __init__(self, docs: List[Dict[str, Any]]):
+        self._docs = docs
+
+    def batch_size(self, batch_size: int) -> "InMemoryCursor":
+        return self
+
+    def sort(self, key: str, direction: int = 1) -> "InMemoryCursor":
+        self._docs.sort(key=lambda doc: (doc.get(key) is None, doc.get(key)), reverse=direction < 0)
+        return self
+
+    def limit(self, limit: int) -> "InMemoryCursor":
+        if limit:
+            self._docs = self._docs[:limit]
+        return self
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._docs)
+
+    def close(self):
+        self._docs = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class InMemoryCollection:
+    """
+    A list of documents with pymongo's find/update/bulk_write surface.
+    Filters use the same operators as the local vector index ($in, $ne,
+    $exists, $and, ...). Documents are copied in and out, like a server.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._docs: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def insert_one(self, document: Dict[str, Any]):
+        doc = copy.deepcopy(document)
+        doc.setdefault("_id", ObjectId())
+        with self._lock:
+            self._docs.append(doc)
+        return SimpleNamespace(inserted_id=doc["_id"])
+
+    def insert_many(self, documents: List[Dict[str, Any]], ordered: bool = True):
+        return SimpleNamespace(inserted_ids=[self.insert_one(doc).inserted_id for doc in documents])
+
+    def find(self, filter: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None) -> InMemoryCursor:
+        with self._lock:
+            docs = [_project(doc, projection) for doc in self._docs if matches_filter(doc, filter or {})]
+        return InMemoryCursor(docs)
+
+    def find_one(self, filter: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None):
+        with self._lock:
+            for doc in self._docs:
+                if matches_filter(doc, filter or {}):
+                    return _project(doc, projection)
+        return None
+
+    def count_documents(self, filter: Dict[str, Any]) -> int:
+        with self._lock:
+            return sum(1 for doc in self._docs if matches_filter(doc, filter))
+
+    def _update_one_locked(self, filter: Dict[str, Any], update: Dict[str, Any], upsert: bool):
+        for doc in self._docs:
+            if matches_filter(doc, filter):
+                modified = _apply_update(doc, update)
+                return SimpleNamespace(matched_count=1, modified_count=int(modified), upserted_id=None)
+
+        if not upsert:
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+
+        # New document: equality conditions of the filter plus the update
+        doc = {field: value for field, value in filter.items()
+               if not field.startswith("$") and not isinstance(value, dict)}
+        _apply_update(doc, update, inserting=True)
+        doc.setdefault("_id", ObjectId())
+        self._docs.append(doc)
+        return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=doc["_id"])
+
+    def update_one(self, filter: Dict[str, Any], update: Dict[str, Any], upsert: bool = False):
+        with self._lock:
+            return self._update_one_locked(filter, update, upsert)
+
+    def bulk_write(self, requests: List[UpdateOne], ordered: bool = True):
+        """Apply UpdateOne operations; counts are shaped like pymongo's BulkWriteResult."""
+        matched = modified = upserted = 0
+        with self._lock:
+            for request in requests:
+                if not isinstance(request, UpdateOne):
+                    raise ValueError(f"Unsupported bulk operation {type(request).__name__}")
+                result = self._update_one_locked(request._filter, request._doc, request._upsert)
+                matched += result.matched_count
+                modified += result.modified_count
+                upserted += result.upserted_id is not None
+
+        return SimpleNamespace(matched_count=matched, modified_count=modified, upserted_count=upserted)
+
+    def delete_many(self, filter: Dict[str, Any]):
+        with self._lock:
+            kept = [doc for doc in self._docs if not matches_filter(doc, filter)]
+            deleted = len(self._docs) - len(kept)
+            self._docs = kept
+        return SimpleNamespace(deleted_count=deleted)
+
+    def delete_one(self, filter: Dict[str, Any]):
+        with self._lock:
+            for i, doc in enumerate(self._docs):
+                if matches_filter(doc, filter):
+                    del self._docs[i]
+                    return SimpleNamespace(deleted_count=1)
+        return SimpleNamespace(deleted_count=0)
+
+
+class InMemoryDatabase:
+    """Collections by name, via db["blogs"] or db.blogs."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._collections: Dict[str, InMemoryCollection] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name: str) -> InMemoryCollection:
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = InMemoryCollection(name)
+            return self._collections[name]
+
+    def __getattr__(self, name: str) -> InMemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def list_collection_names(self) -> List[str]:
+        with self._lock:
+            return sorted(self._collections)
+
+
+class InMemoryMongoClient:
+    """
+    Databases by name. close() is a no-op so the data lives as long as the
+    process, across the scripts' mongo_connection() blocks.
+    """
+
+    def __init__(self):
+        self._databases: Dict[str, InMemoryDatabase] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name: str) -> InMemoryDatabase:
+        with self._lock:
+            if name not in self._databases:
+                self._databases[name] = InMemoryDatabase(name)
+            return self._databases[name]
+
+    def close(self):
+        pass
+
+
+def load_blog_fixture(path: str) -> List[Dict[str, Any]]:
+    """
+    Read blog documents from a JSON array or JSON-lines file.
+    createdAt/updatedAt ISO strings become datetimes, as MongoDB returns them.
+    """
+    text = Path(path).read_text(encoding="utf-8").strip()
+    if text.startswith("["):
+        blogs = json.loads(text)
+    else:
+        blogs = [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    for blog in blogs:
+        for field in ("createdAt", "updatedAt"):
+            if isinstance(blog.get(field), str):
+                blog[field] = datetime.fromisoformat(blog[field].replace("Z", "+00:00"))
+    return blogs
+
+
+_mongo_client: Optional[InMemoryMongoClient] = None
+_mongo_lock = threading.Lock()
+
+
+def get_memory_mongo_client() -> InMemoryMongoClient:
+    """
+    Get the process-wide in-memory client, seeding the blogs collection
+    from MONGODB_FIXTURE_PATH (if set) on first use.
+    """
+    global _mongo_client
+    with _mongo_lock:
+        if _mongo_client is None:
+            _mongo_client = InMemoryMongoClient()
+            if MONGODB_FIXTURE_PATH:
+                blogs = load_blog_fixture(MONGODB_FIXTURE_PATH)
+                _mongo_client[MONGODB_DATABASE][MONGODB_COLLECTION].insert_many(blogs)
+                print(f"✅ Loaded {len(blogs)} blogs from {MONGODB_FIXTURE_PATH}")
+    return _mongo_client
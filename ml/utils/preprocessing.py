@@ -4,19 +4,55 @@ Cleans and prepares blog text for embedding generation.
 """
 
 import re
-from typing import Dict, Any, List
-from markdown import markdown
+import json
+import time
+import hashlib
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Iterable, Iterator, Tuple
+from itertools import islice
+from markdown import Markdown, markdown
+from markdown.serializers import HTML_EMPTY
 from bs4 import BeautifulSoup
+from utils.config import TEXT_EXTRACTOR, PREPROCESS_CHUNK_SIZE
+from utils.metrics import STAGE_SECONDS, FAILURES, time_stage
 
 
-def markdown_to_plain_text(md_content: str) -> str:
+# Stamped into vector metadata. Bump whenever preprocess_blog produces
+# different text for the same blog, so stale vectors can be re-embedded.
+PREPROCESSING_VERSION = "1"
+
+
+def markdown_to_plain_text(
+    md_content: str,
+    extractor: Optional[str] = None,
+    strip: bool = False
+) -> str:
     """
     Convert markdown content to plain text.
     Removes HTML tags and normalizes whitespace.
+    
+    Args:
+        md_content: Markdown source
+        extractor: "fast" walks the markdown element tree directly,
+                   "bs4" renders HTML and parses it with BeautifulSoup.
+                   Defaults to TEXT_EXTRACTOR. Both give the same output.
+        strip: Strip each text fragment and drop empty ones
+               (BeautifulSoup's get_text(strip=True))
     """
+    if (extractor or TEXT_EXTRACTOR) == 'fast':
+        return extract_text_from_markdown(md_content, strip=strip)
+    
     # Convert markdown to HTML
     html = markdown(md_content)
     
+    return _html_to_text(html, strip=strip)
+
+
+def _html_to_text(html: str, separator: str = ' ', strip: bool = False) -> str:
+    """Extract the text of rendered HTML with BeautifulSoup."""
     # Parse HTML and extract text
     soup = BeautifulSoup(html, 'html.parser')
     
@@ -25,21 +61,200 @@ def markdown_to_plain_text(md_content: str) -> str:
         script.decompose()
     
     # Get text content
-    text = soup.get_text(separator=' ')
+    return soup.get_text(separator=separator, strip=strip)
+
+
+# ============================================================
+# Fast markdown -> text extraction
+# ============================================================
+
+_markdown_local = threading.local()
+
+# Entity references the HTML serializer leaves untouched (and BeautifulSoup
+# later decodes); only the ones code_escape produces are handled here
+_ENTITY_RE = re.compile(r'&(?:#[0-9]+|#x[0-9a-f]+|[0-9a-z]+);', re.I)
+_BASIC_ENTITIES = {'&amp;': '&', '&lt;': '<', '&gt;': '>'}
+# Whitespace BeautifulSoup collapses to a single space or newline
+_ASCII_SPACES = frozenset('\x20\x0a\x09\x0c\x0d')
+_PRESERVE_WHITESPACE_TAGS = ('pre', 'textarea')
+
+
+def _get_markdown() -> Markdown:
+    """Reuse one Markdown instance per thread instead of building one per call."""
+    md = getattr(_markdown_local, 'md', None)
+    if md is None:
+        md = _markdown_local.md = Markdown()
+    md.reset()
+    return md
+
+
+def _collect_strings(root) -> Optional[List[Tuple[str, bool]]]:
+    """
+    List the text nodes the HTML serializer would write, in document order,
+    as (text, inside <pre>) pairs. Returns None for node types it would not
+    serialize as plain text.
+    """
+    strings = []
+    if root.text:
+        strings.append((root.text, False))
+    
+    stack = [(child, False) for child in reversed(root)]
+    while stack:
+        item, preserve = stack.pop()
+        if isinstance(item, str):
+            strings.append((item, preserve))
+            continue
+        
+        tag = item.tag
+        if not isinstance(tag, str):
+            return None  # Comment, processing instruction or bare text node
+        
+        if item.tail:
+            stack.append((item.tail, preserve))
+        
+        if tag.lower() in HTML_EMPTY:
+            continue  # Serialized as <tag />, without text or children
+        
+        inner_preserve = preserve or tag.lower() in _PRESERVE_WHITESPACE_TAGS
+        for child in reversed(item):
+            stack.append((child, inner_preserve))
+        if item.text:
+            strings.append((item.text, inner_preserve))
+    
+    # Markdown strips whitespace around the serialized document body
+    if root.text:
+        strings[0] = (strings[0][0].lstrip(), False)
+    if (root[-1].tail if len(root) else root.text):
+        strings[-1] = (strings[-1][0].rstrip(), False)
+    
+    return strings
+
+
+def _decode_entities(text: str) -> Optional[str]:
+    """Decode &amp;/&lt;/&gt; the way the HTML round trip would, else None."""
+    matches = _ENTITY_RE.findall(text)
+    if any(match not in _BASIC_ENTITIES for match in matches):
+        return None
+    return _ENTITY_RE.sub(lambda m: _BASIC_ENTITIES[m.group(0)], text)
+
+
+def _tree_to_text(root, separator: str, strip: bool) -> Optional[str]:
+    """
+    Join the text nodes of a rendered markdown tree the way BeautifulSoup's
+    get_text would after an HTML round trip. Returns None when the tree holds
+    raw HTML, HTML entities or escapes that only the round trip resolves.
+    """
+    strings = _collect_strings(root)
+    if strings is None:
+        return None
+    
+    parts = []
+    for text, preserve in strings:
+        if not text:
+            continue
+        
+        # Stash placeholders (raw HTML, entities) are resolved by postprocessors
+        if '\x02' in text or '\x03' in text:
+            return None
+        
+        if '&' in text:
+            text = _decode_entities(text)
+            if text is None:
+                return None
+        
+        if strip:
+            text = text.strip()
+            if not text:
+                continue
+        elif not preserve and _ASCII_SPACES.issuperset(text):
+            text = '\n' if '\n' in text else ' '
+        
+        parts.append(text)
+    
+    return separator.join(parts)
+
+
+def _tree_to_html(md: Markdown, root) -> str:
+    """Finish Markdown.convert on an already rendered tree."""
+    output = md.serializer(root)
+    start = output.index(f'<{md.doc_tag}>') + len(md.doc_tag) + 2
+    end = output.rindex(f'</{md.doc_tag}>')
+    output = output[start:end].strip()
+    
+    for postprocessor in md.postprocessors:
+        output = postprocessor.run(output)
+    
+    return output.strip()
+
+
+def extract_text_from_markdown(
+    md_content: str,
+    separator: str = ' ',
+    strip: bool = False,
+    fallback: bool = True
+) -> Optional[str]:
+    """
+    Extract plain text by walking the markdown element tree directly.
+    Produces the same text as rendering to HTML and calling
+    BeautifulSoup(html, 'html.parser').get_text(separator, strip), without
+    serializing and re-parsing the HTML in the common case.
+    
+    Args:
+        md_content: Markdown source
+        separator: String placed between text fragments
+        strip: Strip each text fragment and drop empty ones
+        fallback: For documents with raw HTML or entities, serialize the
+                  already rendered tree and use BeautifulSoup. If False,
+                  return None for those documents instead.
+    """
+    if not md_content.strip():
+        return ''
+    
+    md = _get_markdown()
+    
+    # Same steps as Markdown.convert, minus serialization
+    lines = md_content.split('\n')
+    for preprocessor in md.preprocessors:
+        lines = preprocessor.run(lines)
+    
+    root = md.parser.parseDocument(lines).getroot()
+    for treeprocessor in md.treeprocessors:
+        new_root = treeprocessor.run(root)
+        if new_root is not None:
+            root = new_root
+    
+    text = _tree_to_text(root, separator, strip)
+    if text is None and fallback:
+        text = _html_to_text(_tree_to_html(md, root), separator, strip)
     
     return text
 
 
+# Precompiled patterns for remove_code_blocks and clean_text
+_FENCED_CODE_RE = re.compile(r'```[\s\S]*?```')
+_INLINE_CODE_RE = re.compile(r'`[^`]+`')
+_URL_RE = re.compile(r'http[s]?://\S+')
+# A match always starts at the beginning of a whitespace-delimited token, so
+# anchoring there skips hopeless retries from inside long tokens
+_EMAIL_RE = re.compile(r'(?<!\S)\S+@\S+')
+# Any run of whitespace and/or characters outside word chars and basic
+# punctuation collapses to a single space (special-char + whitespace pass fused)
+_NON_TEXT_RUN_RE = re.compile(r'[^\w.,!?;:\-\'"]+')
+
+
 def remove_code_blocks(content: str) -> str:
     """
     Remove code blocks from markdown content.
     Keeps the context but removes actual code snippets.
     """
+    if '`' not in content:
+        return content
+    
     # Remove fenced code blocks (```...```)
-    content = re.sub(r'```[\s\S]*?```', ' [code block] ', content)
+    content = _FENCED_CODE_RE.sub(' [code block] ', content)
     
     # Remove inline code (`...`)
-    content = re.sub(r'`[^`]+`', ' [code] ', content)
+    content = _INLINE_CODE_RE.sub(' [code] ', content)
     
     return content
 
@@ -47,23 +262,21 @@ def remove_code_blocks(content: str) -> str:
 def clean_text(text: str) -> str:
     """
     Clean text by removing URLs, extra whitespace, and special characters.
+    
+    The URL and email passes only run when the text could contain a match,
+    and special-character stripping and whitespace normalization share one
+    pass. The output is identical to applying the five steps one by one.
     """
-    # Remove URLs
-    text = re.sub(r'http[s]?://\S+', '', text)
+    # Remove URLs (must run before the email pass, e.g. "http://a@b")
+    if 'http' in text:
+        text = _URL_RE.sub('', text)
     
     # Remove email addresses
-    text = re.sub(r'\S+@\S+', '', text)
-    
-    # Remove special characters but keep basic punctuation
-    text = re.sub(r'[^\w\s.,!?;:\-\'"]', ' ', text)
+    if '@' in text:
+        text = _EMAIL_RE.sub('', text)
     
-    # Normalize whitespace
-    text = re.sub(r'\s+', ' ', text)
-    
-    # Strip leading/trailing whitespace
-    text = text.strip()
-    
-    return text
+    # Replace special characters and whitespace runs with one space, then strip
+    return _NON_TEXT_RUN_RE.sub(' ', text).strip()
 
 
 def extract_keywords_from_tags(tags: List[str]) -> str:
@@ -79,6 +292,37 @@ def extract_keywords_from_tags(tags: List[str]) -> str:
     return f"Topics: {tag_string}. Keywords: {tag_string}"
 
 
+def compute_content_hash(blog: Dict[str, Any]) -> str:
+    """
+    Fingerprint the fields that end up in a blog's vector or its metadata.
+    Used to detect edited blogs without re-embedding them.
+    """
+    fields = [
+        blog.get('title', ''),
+        blog.get('description', ''),
+        list(blog.get('tags', [])),
+        blog.get('content', ''),
+        bool(blog.get('isStarred', blog.get('is_starred', False))),
+    ]
+    payload = json.dumps(fields, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def has_outdated_preprocessing(metadata: Dict[str, Any]) -> bool:
+    """True if a vector was embedded from text built by another pipeline version."""
+    return metadata.get('preprocessing_version') != PREPROCESSING_VERSION
+
+
+def format_updated_at(value: Any) -> Optional[str]:
+    """Normalize a MongoDB updatedAt value to an ISO string for vector metadata."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+@time_stage("preprocess")
 def preprocess_blog(blog: Dict[str, Any]) -> Dict[str, Any]:
     """
     Main preprocessing function for a single blog.
@@ -106,18 +350,21 @@ def preprocess_blog(blog: Dict[str, Any]) -> Dict[str, Any]:
     
     # Combine all text with weighted importance
     # Title and description are given more weight by appearing first
-    combined_text = f"""
+    header_text = f"""
     Title: {title}
     
     Summary: {description}
     
     {tag_text}
     
-    Content: {clean_content}
-    """.strip()
+    Content:"""
     
-    # Clean the final combined text
-    processed_text = clean_text(combined_text)
+    # clean_content is already clean and whitespace-separated from the
+    # header, so only the header needs cleaning; this matches cleaning the
+    # whole combined text a second time
+    processed_text = clean_text(header_text)
+    if clean_content:
+        processed_text = f"{processed_text} {clean_content}"
     
     return {
         'slug': slug,
@@ -127,30 +374,119 @@ def preprocess_blog(blog: Dict[str, Any]) -> Dict[str, Any]:
         'processed_text': processed_text,
         'is_starred': blog.get('isStarred', False),
         'published': blog.get('published', True),
+        'content_hash': compute_content_hash(blog),
+        'updated_at': format_updated_at(blog.get('updatedAt')),
+        'preprocessing_version': PREPROCESSING_VERSION,
     }
 
 
-def preprocess_blogs(blogs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def _preprocess_chunk(
+    blogs: List[Dict[str, Any]]
+) -> List[Tuple[Optional[Dict[str, Any]], Optional[str], float]]:
     """
-    Preprocess multiple blogs.
+    Preprocess a chunk of blogs in a worker process.
+    Errors are returned instead of raised so one bad blog doesn't fail the chunk.
+    Each result carries its duration, since the worker's metrics don't reach
+    the parent process.
+    """
+    results = []
+    for blog in blogs:
+        start = time.perf_counter()
+        try:
+            results.append((preprocess_blog(blog), None, time.perf_counter() - start))
+        except Exception as e:
+            results.append((None, str(e), time.perf_counter() - start))
+    return results
+
+
+def _iter_preprocessed_parallel(
+    blogs: Iterable[Dict[str, Any]],
+    workers: int,
+    chunk_size: int
+) -> Iterator[Dict[str, Any]]:
+    """Fan chunks out over a process pool, yielding results in input order."""
+    # Bound the chunks in flight so a streamed input is never read ahead fully
+    max_pending = workers * 2
+    pending = deque()
+    
+    def drain(chunk, future):
+        for blog, (processed, error, seconds) in zip(chunk, future.result()):
+            STAGE_SECONDS.observe(seconds, stage="preprocess")
+            if error is None:
+                yield processed
+            else:
+                FAILURES.inc(stage="preprocess")
+                print(f"Error processing blog {blog.get('slug', 'unknown')}: {error}")
+    
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        for chunk in iter_chunks(blogs, chunk_size):
+            pending.append((chunk, executor.submit(_preprocess_chunk, chunk)))
+            if len(pending) >= max_pending:
+                yield from drain(*pending.popleft())
+        
+        while pending:
+            yield from drain(*pending.popleft())
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_preprocessed_blogs(
+    blogs: Iterable[Dict[str, Any]],
+    workers: int = 1,
+    chunk_size: int = PREPROCESS_CHUNK_SIZE
+) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily preprocess a stream of blogs.
+    Blogs that fail to preprocess are reported and skipped.
     
     Args:
-        blogs: List of MongoDB blog documents
+        blogs: Iterable of MongoDB blog documents
+        workers: Number of worker processes. 1 preprocesses in this process.
+        chunk_size: Blogs sent to a worker process per task
     
-    Returns:
-        List of preprocessed blog dicts
+    Yields:
+        Preprocessed blog dicts, in input order
     """
-    processed = []
+    if workers > 1:
+        yield from _iter_preprocessed_parallel(blogs, workers, chunk_size)
+        return
     
     for blog in blogs:
         try:
-            processed_blog = preprocess_blog(blog)
-            processed.append(processed_blog)
+            yield preprocess_blog(blog)
         except Exception as e:
             print(f"Error processing blog {blog.get('slug', 'unknown')}: {e}")
             continue
+
+
+def preprocess_blogs(
+    blogs: List[Dict[str, Any]],
+    workers: int = 1,
+    chunk_size: int = PREPROCESS_CHUNK_SIZE
+) -> List[Dict[str, Any]]:
+    """
+    Preprocess multiple blogs.
+    
+    Args:
+        blogs: List of MongoDB blog documents
+        workers: Number of worker processes (markdown parsing is CPU bound)
+        chunk_size: Blogs sent to a worker process per task
     
-    return processed
+    Returns:
+        List of preprocessed blog dicts, in input order
+    """
+    return list(iter_preprocessed_blogs(blogs, workers=workers, chunk_size=chunk_size))
+
+
+def iter_chunks(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Group a stream into lists of at most `size` items."""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
 
 
 # For testing
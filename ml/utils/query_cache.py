@@ -0,0 +1,183 @@
+"""
+In-process caches for search.
+Thread-safe LRUs with a per-entry TTL: one for query embeddings (keyed by
+the normalized query text and task type) so repeated searches skip the
+embedding API, and one for ranked result lists that is invalidated by a
+generation counter whenever the index is written.
+"""
+
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, List, Dict, Optional, Hashable
+from utils.config import (
+    QUERY_CACHE_SIZE,
+    QUERY_CACHE_TTL_SECONDS,
+    SEARCH_CACHE_SIZE,
+    SEARCH_CACHE_TTL_SECONDS,
+)
+from utils.metrics import record_cache_lookups
+
+
+def normalize_query(text: str) -> str:
+    """Case- and whitespace-insensitive form of a query, used as the cache key."""
+    return " ".join(text.lower().split())
+
+
+class LRUCache:
+    """Thread-safe LRU map with per-entry expiry and hit/miss counters."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float, name: Optional[str] = None):
+        """
+        Args:
+            max_entries: Entries kept before the least recently used is evicted
+            ttl_seconds: Seconds an entry stays valid (0 disables expiry)
+            name: Label for lookups in the metrics registry (None: not recorded)
+        """
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None (counted as a miss)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_seconds and entry[1] <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                if self.name:
+                    record_cache_lookups(self.name, hits=0, misses=1)
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            if self.name:
+                record_cache_lookups(self.name, hits=1, misses=0)
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any):
+        """Store a value, evicting the least recently used entries if full."""
+        if self.max_entries <= 0:
+            return
+
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else float("inf")
+
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self) -> Dict[str, float]:
+        """Counters for monitoring (exposed on the API's /stats)."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class QueryEmbeddingCache(LRUCache):
+    """LRU map of (task type, normalized query) -> embedding, with expiry."""
+
+    def __init__(self, max_entries: int = QUERY_CACHE_SIZE, ttl_seconds: float = QUERY_CACHE_TTL_SECONDS):
+        super().__init__(max_entries, ttl_seconds, name="query_embedding")
+
+    def get(self, query: str, task_type: str) -> Optional[List[float]]:
+        """Return the cached embedding, or None (counted as a miss)."""
+        return super().get((task_type, normalize_query(query)))
+
+    def put(self, query: str, task_type: str, embedding: List[float]):
+        """Store an embedding for the normalized query."""
+        super().put((task_type, normalize_query(query)), embedding)
+
+
+class SearchResultCache(LRUCache):
+    """
+    LRU map of (normalized query, top_k, filter) -> ranked results.
+
+    Every write to the index calls invalidate(), which bumps the generation
+    and drops all entries. Results computed while a write was in flight are
+    discarded: callers read `generation` before searching and pass it to put().
+    """
+
+    def __init__(self, max_entries: int = SEARCH_CACHE_SIZE, ttl_seconds: float = SEARCH_CACHE_TTL_SECONDS):
+        super().__init__(max_entries, ttl_seconds, name="search_results")
+        self.generation = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(query: str, top_k: int, filters: Optional[Dict[str, Any]] = None) -> tuple:
+        return (normalize_query(query), top_k, json.dumps(filters or {}, sort_keys=True))
+
+    def get(self, query: str, top_k: int, filters: Optional[Dict[str, Any]] = None) -> Optional[Any]:
+        """Return cached results for this search, or None (counted as a miss)."""
+        return super().get(self.make_key(query, top_k, filters))
+
+    def put(
+        self,
+        query: str,
+        top_k: int,
+        filters: Optional[Dict[str, Any]],
+        results: Any,
+        generation: int
+    ):
+        """Store results computed at `generation`; dropped if the index changed since."""
+        with self._lock:
+            if generation == self.generation:
+                super().put(self.make_key(query, top_k, filters), results)
+
+    def invalidate(self):
+        """Bump the generation and drop every cached result."""
+        with self._lock:
+            self.generation += 1
+            self.invalidations += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        stats = super().stats()
+        with self._lock:
+            stats["generation"] = self.generation
+            stats["invalidations"] = self.invalidations
+        return stats
+
+
+_cache = QueryEmbeddingCache()
+_search_cache = SearchResultCache()
+
+
+def get_query_cache() -> QueryEmbeddingCache:
+    """Get the process-wide query embedding cache."""
+    return _cache
+
+
+def get_search_cache() -> SearchResultCache:
+    """Get the process-wide search result cache."""
+    return _search_cache
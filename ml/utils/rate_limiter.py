@@ -0,0 +1,80 @@
+"""
+Adaptive rate limiting for external API calls.
+A thread-safe token bucket that slows down when the API returns 429s
+and speeds back up as requests succeed.
+"""
+
+import time
+import threading
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter with AIMD (additive increase, multiplicative
+    decrease) adaptation.
+
+    Each call to acquire() reserves tokens and sleeps only as long as needed
+    for the bucket to cover them, so concurrent callers are spaced out
+    instead of all sleeping a fixed delay.
+    """
+
+    def __init__(
+        self,
+        rate_per_second: float,
+        capacity: float = 1.0,
+        min_rate_per_second: float = None,
+        backoff_factor: float = 0.5,
+        recovery_step: float = None
+    ):
+        """
+        Args:
+            rate_per_second: Target (and maximum) refill rate
+            capacity: Maximum burst size in tokens
+            min_rate_per_second: Floor for the rate after repeated 429s
+            backoff_factor: Rate multiplier applied on each 429
+            recovery_step: Rate added back after each success
+        """
+        self.max_rate = rate_per_second
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self.min_rate = min_rate_per_second or rate_per_second / 20
+        self.backoff_factor = backoff_factor
+        self.recovery_step = recovery_step or rate_per_second / 20
+
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated_at
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated_at = now
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Reserve tokens, blocking until the bucket can cover them.
+
+        Returns:
+            Seconds spent waiting
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def on_rate_limited(self):
+        """Cut the rate after a 429 response."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = max(self.min_rate, self.rate * self.backoff_factor)
+
+    def on_success(self):
+        """Creep the rate back towards its target after a successful call."""
+        with self._lock:
+            if self.rate < self.max_rate:
+                self._refill(time.monotonic())
+                self.rate = min(self.max_rate, self.rate + self.recovery_step)
@@ -1,16 +1,49 @@
 """
-Pinecone vector database operations.
-Stores and retrieves blog embeddings for similarity search.
+Vector database operations.
+Stores and retrieves blog embeddings for similarity search, in Pinecone or
+in a local memory-mapped index (VECTOR_STORE_BACKEND=local), searched
+exactly or through HNSW (VECTOR_STORE_INDEX=hnsw), or in RAM only
+(VECTOR_STORE_BACKEND=memory).
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Iterator, Protocol
+import numpy as np
 from pinecone import Pinecone, ServerlessSpec
-from utils.config import get_pinecone_api_key, PINECONE_INDEX_NAME, EMBEDDING_DIMENSION
+from utils.config import (
+    get_pinecone_api_key,
+    PINECONE_INDEX_NAME,
+    EMBEDDING_DIMENSION,
+    EMBEDDING_CHUNK_NAMESPACE,
+    VECTOR_STORE_BACKEND,
+    VECTOR_STORE_PATH,
+    VECTOR_STORE_INDEX,
+)
+from utils.local_index import LocalVectorIndex
+from utils.metrics import time_stage
+
+
+class VectorIndex(Protocol):
+    """
+    The index operations this module relies on. Implemented by Pinecone's
+    Index and by LocalVectorIndex; any other backend only needs these.
+    """
+
+    def upsert(self, vectors: List[Dict[str, Any]], namespace: str = ...) -> Any: ...
+
+    def fetch(self, ids: List[str], namespace: str = ...) -> Any: ...
+
+    def query(self, vector: List[float], top_k: int, **kwargs) -> Any: ...
+
+    def list(self, prefix: Optional[str] = ..., namespace: str = ...) -> Iterator[List[str]]: ...
+
+    def delete(self, ids: Optional[List[str]] = ..., delete_all: bool = ..., namespace: str = ...) -> Any: ...
+
+    def describe_index_stats(self) -> Any: ...
 
 
 # Global Pinecone client
 _client: Optional[Pinecone] = None
-_index = None
+_index: Optional[VectorIndex] = None
 
 
 def get_pinecone_client() -> Pinecone:
@@ -22,12 +55,20 @@ def get_pinecone_client() -> Pinecone:
     return _client
 
 
-def get_index():
-    """Get or create Pinecone index."""
+def get_index() -> VectorIndex:
+    """Get or create the vector index for the configured backend."""
     global _index
     if _index is not None:
         return _index
     
+    if VECTOR_STORE_BACKEND == "local":
+        _index = LocalVectorIndex(VECTOR_STORE_PATH, EMBEDDING_DIMENSION, index_type=VECTOR_STORE_INDEX)
+        return _index
+    
+    if VECTOR_STORE_BACKEND == "memory":
+        _index = LocalVectorIndex(None, EMBEDDING_DIMENSION)
+        return _index
+    
     client = get_pinecone_client()
     
     # Check if index exists
@@ -50,6 +91,32 @@ def get_index():
     return _index
 
 
+def close_index():
+    """Persist pending writes of the local index (no-op for Pinecone)."""
+    if isinstance(_index, LocalVectorIndex):
+        _index.close()
+
+
+def build_metadata(blog: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Prepare vector metadata (Pinecone has restrictions on metadata values).
+    Change-detection fields are only included when known, since Pinecone
+    rejects null metadata values.
+    """
+    metadata = {
+        "title": str(blog.get("title", "")),
+        "description": str(blog.get("description", ""))[:500],  # Limit length
+        "tags": blog.get("tags", []),
+        "is_starred": bool(blog.get("is_starred", False)),
+    }
+    
+    for field in ("content_hash", "updated_at", "preprocessing_version", "embedding_layout"):
+        if blog.get(field):
+            metadata[field] = str(blog[field])
+    
+    return metadata
+
+
 def upsert_blog_embedding(
     slug: str,
     embedding: List[float],
@@ -67,23 +134,17 @@ def upsert_blog_embedding(
         True if successful
     """
     index = get_index()
-    
-    # Prepare metadata (Pinecone has restrictions on metadata values)
-    clean_metadata = {
-        "title": str(metadata.get("title", "")),
-        "description": str(metadata.get("description", ""))[:500],  # Limit length
-        "tags": metadata.get("tags", []),
-        "is_starred": bool(metadata.get("is_starred", False)),
-    }
+    clean_metadata = build_metadata(metadata)
     
     # Upsert to Pinecone
-    index.upsert(
-        vectors=[{
-            "id": slug,
-            "values": embedding,
-            "metadata": clean_metadata
-        }]
-    )
+    with time_stage("vector_upsert"):
+        index.upsert(
+            vectors=[{
+                "id": slug,
+                "values": embedding,
+                "metadata": clean_metadata
+            }]
+        )
     
     return True
 
@@ -114,28 +175,157 @@ def upsert_blogs_batch(
         
         vectors = []
         for blog in batch:
-            clean_metadata = {
-                "title": str(blog.get("title", "")),
-                "description": str(blog.get("description", ""))[:500],
-                "tags": blog.get("tags", []),
-                "is_starred": bool(blog.get("is_starred", False)),
-            }
-            
             vectors.append({
                 "id": blog["slug"],
                 "values": blog["embedding"],
-                "metadata": clean_metadata
+                "metadata": build_metadata(blog)
             })
         
-        index.upsert(vectors=vectors)
+        with time_stage("vector_upsert"):
+            index.upsert(vectors=vectors)
         upserted += len(vectors)
         
         if show_progress:
             print(f"  Upserted {upserted}/{total} blogs")
     
+    chunk_count = upsert_chunk_vectors(embedded_blogs, index=index)
+    if show_progress and chunk_count:
+        print(f"  Upserted {chunk_count} passage chunks")
+    
     return upserted
 
 
+def chunk_vector_id(slug: str, position: int) -> str:
+    """Vector ID of one passage chunk; the slug prefix allows listing by blog."""
+    return f"{slug}#{position}"
+
+
+def upsert_chunk_vectors(
+    embedded_blogs: List[Dict[str, Any]],
+    namespace: str = EMBEDDING_CHUNK_NAMESPACE,
+    index=None,
+    batch_size: int = 100
+) -> int:
+    """
+    Store per-chunk vectors for passage-level search.
+    Old chunks of each blog are removed first, so a shorter edit doesn't
+    leave stale passages behind. No-op when no chunk namespace is configured.
+    
+    Args:
+        embedded_blogs: Blog dicts with 'slug' and 'chunks' from embed_documents
+        namespace: Pinecone namespace holding chunk vectors
+        index: Optional Pinecone index. If not provided, uses the default index.
+        batch_size: Number of vectors to upsert at once
+    
+    Returns:
+        Number of chunk vectors upserted
+    """
+    blogs = [blog for blog in embedded_blogs if blog.get("chunks")]
+    if not namespace or not blogs:
+        return 0
+    
+    index = index if index is not None else get_index()
+    delete_chunk_vectors([blog["slug"] for blog in blogs], namespace=namespace, index=index)
+    
+    vectors = []
+    for blog in blogs:
+        for position, chunk in enumerate(blog["chunks"]):
+            vectors.append({
+                "id": chunk_vector_id(blog["slug"], position),
+                "values": chunk["embedding"],
+                "metadata": {
+                    "slug": blog["slug"],
+                    "chunk": position,
+                    "title": str(blog.get("title", "")),
+                    "text": chunk["text"][:1000],  # Limit length
+                }
+            })
+    
+    for i in range(0, len(vectors), batch_size):
+        with time_stage("vector_upsert"):
+            index.upsert(vectors=vectors[i:i + batch_size], namespace=namespace)
+    
+    return len(vectors)
+
+
+def delete_chunk_vectors(
+    slugs: List[str],
+    namespace: str = EMBEDDING_CHUNK_NAMESPACE,
+    index=None,
+    batch_size: int = 1000
+) -> int:
+    """
+    Delete every chunk vector belonging to the given blogs.
+    
+    Args:
+        slugs: Blog slugs whose chunks should be removed
+        namespace: Pinecone namespace holding chunk vectors
+        index: Optional Pinecone index. If not provided, uses the default index.
+        batch_size: IDs per delete request
+    
+    Returns:
+        Number of chunk vectors deleted
+    """
+    if not namespace or not slugs:
+        return 0
+    
+    index = index if index is not None else get_index()
+    
+    chunk_ids = []
+    for slug in slugs:
+        for ids_batch in index.list(prefix=f"{slug}#", namespace=namespace):
+            chunk_ids.extend(ids_batch)
+    
+    for i in range(0, len(chunk_ids), batch_size):
+        index.delete(ids=chunk_ids[i:i + batch_size], namespace=namespace)
+    
+    return len(chunk_ids)
+
+
+def find_similar_passages(
+    embedding: List[float],
+    top_k: int = 5,
+    namespace: str = EMBEDDING_CHUNK_NAMESPACE,
+    index=None
+) -> List[Dict[str, Any]]:
+    """
+    Find the passages (chunks) closest to an embedding.
+    
+    Args:
+        embedding: The embedding vector to search with
+        top_k: Number of passages to return
+        namespace: Pinecone namespace holding chunk vectors
+        index: Optional Pinecone index. If not provided, uses the default index.
+    
+    Returns:
+        List of {slug, chunk, title, text, score}, best first
+    """
+    if not namespace:
+        return []
+    
+    index = index if index is not None else get_index()
+    with time_stage("vector_query"):
+        results = index.query(
+            vector=embedding,
+            top_k=top_k,
+            namespace=namespace,
+            include_metadata=True
+        )
+    
+    passages = []
+    for match in results.matches:
+        metadata = dict(match.metadata or {})
+        passages.append({
+            "slug": metadata.get("slug", match.id.rsplit("#", 1)[0]),
+            "chunk": int(metadata.get("chunk", 0)),
+            "title": metadata.get("title", ""),
+            "text": metadata.get("text", ""),
+            "score": float(match.score),
+        })
+    
+    return passages
+
+
 def find_similar_blogs(
     slug: str,
     top_k: int = 3,
@@ -164,11 +354,12 @@ def find_similar_blogs(
     query_embedding = fetch_result.vectors[slug].values
     
     # Query for similar blogs (top_k + 1 to exclude self)
-    results = index.query(
-        vector=query_embedding,
-        top_k=top_k + 1,
-        include_metadata=include_metadata
-    )
+    with time_stage("vector_query"):
+        results = index.query(
+            vector=query_embedding,
+            top_k=top_k + 1,
+            include_metadata=include_metadata
+        )
     
     # Filter out the query blog itself and format results
     similar_blogs = []
@@ -206,11 +397,12 @@ def find_similar_by_embedding(
     exclude_slugs = exclude_slugs or []
     
     # Query for similar blogs
-    results = index.query(
-        vector=embedding,
-        top_k=top_k + len(exclude_slugs),
-        include_metadata=include_metadata
-    )
+    with time_stage("vector_query"):
+        results = index.query(
+            vector=embedding,
+            top_k=top_k + len(exclude_slugs),
+            include_metadata=include_metadata
+        )
     
     # Filter and format results
     similar_blogs = []
@@ -226,14 +418,26 @@ def find_similar_by_embedding(
 
 
 def get_index_stats() -> Dict[str, Any]:
-    """Get statistics about the Pinecone index."""
+    """Get statistics about the vector index."""
     index = get_index()
     stats = index.describe_index_stats()
+    total_vectors = stats.total_vector_count
+    chunk_vectors = 0
+    
+    # Blog vectors live in the default namespace, passage chunks in their own
+    namespaces = stats.namespaces or {}
+    if EMBEDDING_CHUNK_NAMESPACE and EMBEDDING_CHUNK_NAMESPACE in namespaces:
+        chunk_vectors = namespaces[EMBEDDING_CHUNK_NAMESPACE].vector_count
+        total_vectors -= chunk_vectors
     
     return {
-        "total_vectors": stats.total_vector_count,
+        "total_vectors": total_vectors,
+        "chunk_vectors": chunk_vectors,
         "dimension": stats.dimension,
-        "index_name": PINECONE_INDEX_NAME
+        "index_name": {"local": VECTOR_STORE_PATH, "memory": "in-memory"}.get(
+            VECTOR_STORE_BACKEND, PINECONE_INDEX_NAME
+        ),
+        "backend": VECTOR_STORE_BACKEND
     }
 
 
@@ -263,6 +467,44 @@ def get_existing_slugs() -> List[str]:
     return existing_slugs
 
 
+def fetch_all_vectors(
+    index=None,
+    batch_size: int = 100
+) -> Tuple[List[str], np.ndarray, Dict[str, Dict[str, Any]]]:
+    """
+    Pull every vector in the index into memory in as few requests as possible.
+    Used to compute all recommendations locally instead of one query per slug.
+
+    Args:
+        index: Optional Pinecone index. If not provided, uses the default index.
+        batch_size: Number of IDs per fetch request
+
+    Returns:
+        Tuple of (ids, float32 matrix with one row per id, slug -> metadata)
+    """
+    index = index if index is not None else get_index()
+
+    all_ids = []
+    for ids_batch in index.list():
+        all_ids.extend(ids_batch)
+
+    ids = []
+    rows = []
+    metadata = {}
+
+    for i in range(0, len(all_ids), batch_size):
+        result = index.fetch(ids=all_ids[i:i + batch_size])
+        for vector_id, vector in result.vectors.items():
+            ids.append(vector_id)
+            rows.append(vector.values)
+            metadata[vector_id] = dict(vector.metadata or {})
+
+    if not rows:
+        return ids, np.zeros((0, EMBEDDING_DIMENSION), dtype=np.float32), metadata
+
+    return ids, np.array(rows, dtype=np.float32), metadata
+
+
 def check_slug_exists(slug: str) -> bool:
     """
     Check if a specific slug exists in Pinecone.
@@ -282,10 +524,39 @@ def check_slug_exists(slug: str) -> bool:
         return False
 
 
+def delete_vectors(slugs: List[str], batch_size: int = 1000) -> int:
+    """
+    Delete specific vectors from the index.
+    
+    Args:
+        slugs: Vector IDs to delete
+        batch_size: IDs per delete request
+    
+    Returns:
+        Number of IDs deleted
+    """
+    index = get_index()
+    
+    for i in range(0, len(slugs), batch_size):
+        index.delete(ids=slugs[i:i + batch_size])
+    
+    delete_chunk_vectors(slugs, index=index)
+    
+    return len(slugs)
+
+
 def delete_all_vectors() -> bool:
-    """Delete all vectors from the index. Use with caution!"""
+    """Delete all vectors (and passage chunks) from the index. Use with caution!"""
     index = get_index()
     index.delete(delete_all=True)
+    
+    if EMBEDDING_CHUNK_NAMESPACE:
+        try:
+            index.delete(delete_all=True, namespace=EMBEDDING_CHUNK_NAMESPACE)
+        except Exception as e:
+            # Deleting a namespace that was never written to fails on serverless
+            print(f"Warning: Could not clear chunk namespace: {e}")
+    
     return True
 
 